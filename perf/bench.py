@@ -0,0 +1,325 @@
+"""Offline micro-benchmarks for the poll-and-deliver hot path.
+
+Run from the repo root (``make bench`` does this)::
+
+    PYTHONPATH=.:src:models python perf/bench.py            # compare
+    PYTHONPATH=.:src:models python perf/bench.py --save     # new baseline
+    PYTHONPATH=.:src:models python perf/bench.py -k render  # a subset
+
+With ``-k``, ``--save`` re-records only the benchmarks that ran and keeps
+the other baselines.
+
+Each benchmark is a factory: it does its setup once and returns the
+callable that is timed. Timing follows ``timeit``: the loop count is
+calibrated with ``autorange`` and the best of several repeats is kept, as
+the least noisy estimate of the code's own cost. Results are compared with
+``perf/baseline.json``; a benchmark slower than the baseline by more than
+``--tolerance`` fails the run. Baselines are only meaningful on the
+machine that recorded them, so record one before and after a change on
+the same host.
+"""
+
+from argparse import ArgumentParser
+from asyncio import new_event_loop
+from itertools import takewhile
+from json import dump as json_dump, load as json_load
+from pathlib import Path
+from platform import machine, python_version
+from subprocess import run
+from sys import executable, exit as sys_exit
+from tempfile import TemporaryDirectory
+from timeit import Timer
+from typing import Any, Callable
+
+from disk_io import DiskExecutor
+from enrich import Enricher
+from models import Entry, ItemResponse, LogItem
+from resolver import (
+    CachingResolver,
+    Profile,
+    ProfileCache,
+    RateLimiter,
+)
+from service import item_key
+from state import FileStateStore
+
+BASELINE = Path(__file__).with_name("baseline.json")
+REPEAT = 5
+# Palgate returns the newest entries of the gate log; a busy gate fills a
+# page of this size between two polls after an outage.
+LOG_SIZE = 500
+CACHE_SIZE = 100_000
+DAY = 86400.0
+
+Benchmark = Callable[[], Callable[[], Any]]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(factory: Benchmark) -> Benchmark:
+    BENCHMARKS[factory.__name__] = factory
+    return factory
+
+
+def log_document(size: int = LOG_SIZE) -> dict[str, Any]:
+    return {
+        "log": [
+            {
+                "userId": str(10000 + n),
+                "operation": "call",
+                "time": 1708675200 - n * 60,
+                "firstname": "Name%d" % n,
+                "lastname": "Surname%d" % n,
+                "image": n % 2 == 0,
+                "reason": n % 3,
+                "type": 1 if n % 4 else 100,
+                "sn": "7900%07d" % n,
+            }
+            for n in range(size)
+        ],
+        "err": False,
+        "msg": "Success",
+        "status": "ok",
+    }
+
+
+def log_page(size: int = LOG_SIZE) -> list[LogItem]:
+    return list(ItemResponse.model_validate(log_document(size)).log or [])
+
+
+def log_items(size: int = LOG_SIZE) -> list[Entry]:
+    return [Entry.from_log_item(item) for item in log_page(size)]
+
+
+class _NoLookups:
+    async def resolve(self, phone: str) -> Profile | None:
+        raise AssertionError("benchmarks must stay offline")
+
+
+@benchmark
+def validate_log() -> Callable[[], Any]:
+    document = log_document()
+    # Every entry: what a cycle pays when the marker left the page.
+    return lambda: list(ItemResponse.model_validate(document).log or [])
+
+
+@benchmark
+def validate_log_head() -> Callable[[], Any]:
+    document = log_document()
+    # The usual cycle: a few new entries above the marker.
+    return lambda: (ItemResponse.model_validate(document).log or [])[:3]
+
+
+@benchmark
+def dedup_scan() -> Callable[[], Any]:
+    items = log_page()
+    # Worst case: the marker is the oldest visible entry.
+    marker = item_key(items[-1])
+    return lambda: tuple(
+        takewhile(lambda item: item_key(item) != marker, items)
+    )
+
+
+@benchmark
+def build_entries() -> Callable[[], Any]:
+    log = log_page()
+    # A catch-up batch turned into entries, lines rendered included.
+    return lambda: [Entry.from_log_item(item) for item in log]
+
+
+@benchmark
+def item_str() -> Callable[[], Any]:
+    items = log_items()
+    # Lines are rendered with the entries: this times a batch joined again.
+    return lambda: "\n".join(str(item) for item in items)
+
+
+@benchmark
+def enricher_render() -> Callable[[], Any]:
+    items = log_items()
+    now = 1708675200.0
+    cache = ProfileCache(positive_ttl=DAY, negative_ttl=DAY)
+    for n, item in enumerate(items[::2]):
+        cache.put(item.pn, Profile(n, "user%d" % n, "First", "Last"), now)
+    resolver = CachingResolver(
+        raw=_NoLookups(),
+        cache=cache,
+        limiter=RateLimiter(min_interval=0, per_hour=1, per_day=1),
+        clock=lambda: now,
+    )
+    enricher = Enricher(resolver, clock=lambda: now)
+    # Memoized per cache version: a flush round re-rendering a queued batch.
+    return lambda: enricher.render(items)
+
+
+@benchmark
+def state_get_marker() -> Callable[[], Any]:
+    loop = new_event_loop()
+    directory = TemporaryDirectory()
+    store = FileStateStore(
+        Path(directory.name) / "state.json", disk=DiskExecutor()
+    )
+    loop.run_until_complete(store.advance("gate", "telegram", None, "k0"))
+
+    def run() -> Any:
+        # Keeps the temporary directory alive as long as the benchmark.
+        assert directory
+        return loop.run_until_complete(store.get_marker("gate", "telegram"))
+
+    return run
+
+
+@benchmark
+def state_advance() -> Callable[[], Any]:
+    loop = new_event_loop()
+    directory = TemporaryDirectory()
+    store = FileStateStore(
+        Path(directory.name) / "state.json", disk=DiskExecutor()
+    )
+    markers = {"current": None, "n": 0}
+
+    def run() -> Any:
+        assert directory
+        markers["n"] += 1
+        new = "k%d" % markers["n"]
+        moved = loop.run_until_complete(
+            store.advance("gate", "telegram", markers["current"], new)
+        )
+        markers["current"] = new
+        return moved
+
+    return run
+
+
+@benchmark
+def rate_limiter_full_day() -> Callable[[], Any]:
+    now = DAY * 10
+    limiter = RateLimiter(min_interval=0, per_hour=10**6, per_day=10**6)
+    # One call every 10 s over the last day.
+    limiter.restore(
+        {"calls": [now - DAY + 10 * n for n in range(1, 8640)]}, now
+    )
+    return lambda: limiter.allowed(now)
+
+
+@benchmark
+def profile_cache_snapshot() -> Callable[[], Any]:
+    now = 1708675200.0
+    cache = ProfileCache(positive_ttl=DAY, negative_ttl=DAY)
+    for n in range(CACHE_SIZE):
+        profile = Profile(n, "user%d" % n, "First", "Last") if n % 4 else None
+        cache.put("7900%07d" % n, profile, now)
+    return lambda: cache.snapshot(now)
+
+
+@benchmark
+def import_main() -> Callable[[], Any]:
+    # Most of the time to first poll is a fresh interpreter importing
+    # main (``python src/main.py --startup-report`` shows the rest, which
+    # needs the live services). Optional subsystems must stay out of it.
+    command = [executable, "-c", "import main"]
+    return lambda: run(command, check=True)
+
+
+def measure(factory: Benchmark) -> float:
+    """Best seconds per call over ``REPEAT`` calibrated runs."""
+    timer = Timer(factory())
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+
+def environment() -> dict[str, str]:
+    return {"python": python_version(), "machine": machine()}
+
+
+def load_baseline(path: Path) -> dict[str, Any] | None:
+    try:
+        with open(path) as fp:
+            document: dict[str, Any] = json_load(fp)
+    except FileNotFoundError:
+        return None
+    return document
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return "%.2f %s" % (seconds / scale, unit)
+    return "%.0f ns" % (seconds / 1e-9)
+
+
+def main() -> int:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-k", dest="pattern", default="", help="run benchmarks matching this"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE, help="baseline file"
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="record results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown against the baseline (0.25 = 25%%)",
+    )
+    args = parser.parse_args()
+
+    results = {
+        name: measure(factory)
+        for name, factory in BENCHMARKS.items()
+        if args.pattern in name
+    }
+
+    if args.save:
+        kept = {}
+        if args.pattern:
+            previous = load_baseline(args.baseline)
+            kept = previous["results"] if previous is not None else {}
+        with open(args.baseline, "w") as fp:
+            json_dump(
+                {**environment(), "results": {**kept, **results}},
+                fp,
+                indent=2,
+            )
+            fp.write("\n")
+        for name, seconds in results.items():
+            print("%-24s %12s" % (name, format_time(seconds)))
+        print("Baseline saved to %s" % args.baseline)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    recorded = baseline["results"] if baseline is not None else {}
+    recorded_on = {key: (baseline or {}).get(key) for key in environment()}
+    if baseline is not None and recorded_on != environment():
+        print(
+            "Baseline was recorded on Python %s/%s; comparisons are rough"
+            % (baseline.get("python"), baseline.get("machine"))
+        )
+    regressions = []
+    for name, seconds in results.items():
+        before = recorded.get(name)
+        if before is None:
+            print("%-24s %12s" % (name, format_time(seconds)))
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > args.tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            "%-24s %12s  %+6.1f%% vs %s%s"
+            % (
+                name,
+                format_time(seconds),
+                change * 100,
+                format_time(before),
+                flag,
+            )
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys_exit(main())
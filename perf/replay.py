@@ -0,0 +1,114 @@
+"""Replay a Palgate capture through the real watcher and report.
+
+Record production traffic with ``PALGATE_CAPTURE_FILE``, then, from the repo
+root::
+
+    PYTHONPATH=.:src:models python perf/replay.py capture.jsonl.gz --speed 60
+
+The capture is served by ``ReplayTransport`` on a virtual clock ``--speed``
+times faster than real time; the poll interval (``--cron-delay``, the
+production ``CRON_DELAY``) is scaled by the same factor, so the watcher
+sees the capture's traffic pattern as it would have in production.
+``--speed 0`` serves one recorded response per poll, as fast as possible.
+Messages go to the local Bot API stand-in. The report gives the number of
+messages and the gate-to-chat lag measured on the virtual clock, i.e. the
+lag production would have had with the code under test.
+"""
+
+from argparse import ArgumentParser, Namespace
+from asyncio import Event, create_task, run, sleep
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import monotonic
+
+from httpx import AsyncClient
+from pylgate.types import TokenType
+
+from lag import LagTracker
+from notify import TelegramNotifier
+from palgate import PalgateClient
+from perf.standin import BotApiStandIn, Faults, RedirectTransport
+from recording import ReplayTransport, read_capture
+from service import GateWatcher
+from state import FileStateStore
+
+DEVICE_ID = "replay"
+
+
+async def replay(args: Namespace) -> str:
+    speed = args.speed or None
+    transport = ReplayTransport(list(read_capture(args.capture)), speed)
+    bot = BotApiStandIn(Faults(latency=args.bot_latency))
+    await bot.start()
+    started = monotonic()
+    with TemporaryDirectory() as data:
+        async with (
+            AsyncClient(transport=transport) as gate_http,
+            AsyncClient(
+                transport=RedirectTransport({"api.telegram.org": bot.port})
+            ) as bot_http,
+        ):
+            watcher = GateWatcher(
+                source=DEVICE_ID,
+                client=PalgateClient(
+                    http=gate_http,
+                    url="https://palgate.invalid/log",
+                    session_token=bytes(16),
+                    user_id=1,
+                    token_type=TokenType.SMS,
+                    delay=0,
+                ),
+                store=FileStateStore(Path(data) / "state.json"),
+                notifiers=(
+                    TelegramNotifier(http=bot_http, token="replay", chat_id=1),
+                ),
+                cron_delay=args.cron_delay / speed if speed else 0,
+                lag=LagTracker(window=float("inf"), clock=transport.now),
+            )
+            stop = Event()
+            task = create_task(watcher.run(stop))
+            while not transport.exhausted:
+                await sleep(0.05)
+            # One more cycle delivers whatever the last frame added.
+            served = transport.served
+            while transport.served == served and not task.done():
+                await sleep(0.05)
+            stop.set()
+            await task
+    await bot.close()
+
+    lines = [
+        "Replayed %d response(s) in %.1fs (%s)"
+        % (
+            transport.served,
+            monotonic() - started,
+            "x%g" % speed if speed else "one per poll",
+        ),
+        "  messages: %d, edits: %d" % (bot.stats.messages, bot.stats.edits),
+    ]
+    for stats in watcher.status().lag:
+        lines.append(
+            "  %s %s: p50 %.1fs, p95 %.1fs, p99 %.1fs (%d entries)"
+            % (
+                stats.stage,
+                stats.channel,
+                stats.p50,
+                stats.p95,
+                stats.p99,
+                stats.samples,
+            )
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--speed", type=float, default=60)
+    parser.add_argument("--cron-delay", type=float, default=30)
+    parser.add_argument("--bot-latency", type=float, default=0.05)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    print(run(replay(parse_args())))
@@ -0,0 +1,356 @@
+"""Soak runner: the real watcher, notifier and enricher against stand-ins.
+
+Run from the repo root::
+
+    PYTHONPATH=.:src:models python perf/soak.py --duration 3600 --rate 2
+
+``GateWatcher`` polls a ``GateStandIn`` with the production
+``PalgateClient`` and delivers through a ``TelegramNotifier`` whose Bot API
+calls are redirected to a ``BotApiStandIn``; state goes to a real
+``FileStateStore`` in a temporary directory. ``--enrich`` adds the
+``Enricher`` with an in-process resolver, so message edits are part of
+the load too. Progress is printed every ``--report-every`` seconds; at the
+end (after ``--duration`` seconds, or once the gate produced ``--entries``
+entries) the gate stops producing, the service gets ``--drain`` seconds to
+catch up, and the final report lists:
+
+- throughput (entries and messages per second),
+- gate-arrival → Bot API acceptance latency percentiles,
+- resident memory at start, end and peak,
+- duplicates (an entry delivered twice) and losses (never delivered),
+  with the entries that scrolled off the gate's page before any
+  successful fetch counted separately: those are lost upstream.
+"""
+
+from argparse import ArgumentParser, Namespace
+from asyncio import Event, create_task, gather, run, sleep, wait_for
+from dataclasses import dataclass
+from logging import WARNING, basicConfig
+from os import sysconf
+from pathlib import Path
+from random import Random
+from resource import RUSAGE_SELF, getrusage
+from tempfile import TemporaryDirectory
+from time import monotonic
+
+from httpx import AsyncClient
+from pylgate.types import TokenType
+
+from enrich import Enricher
+from notify import TelegramNotifier
+from palgate import PalgateClient
+from perf.standin import (
+    BotApiStandIn,
+    Faults,
+    GateStandIn,
+    RedirectTransport,
+)
+from resolver import (
+    CachingResolver,
+    FloodError,
+    Profile,
+    ProfileCache,
+    RateLimiter,
+)
+from service import GateWatcher
+from state import FileStateStore
+
+DEVICE_ID = "soak"
+SESSION_TOKEN = bytes(16)
+
+
+@dataclass(frozen=True)
+class SoakReport:
+    seconds: float
+    generated: int
+    delivered: int
+    duplicates: int
+    lost: int
+    unseen: int
+    messages: int
+    edits: int
+    gate_responses: dict[int, int]
+    bot_responses: dict[int, int]
+    # Seconds from gate arrival to the Bot API accepting the message.
+    latency: dict[str, float]
+    rss_start: int
+    rss_end: int
+    rss_peak: int
+
+
+class SimulatedResolver:
+    """Raw ``PhoneResolver`` with a fixed latency and a FloodWait share."""
+
+    def __init__(self, latency: float, flood_rate: float, seed: int = 2):
+        self._latency = latency
+        self._flood_rate = flood_rate
+        self._random = Random(seed)
+
+    async def resolve(self, phone: str) -> Profile | None:
+        await sleep(self._latency)
+        if self._random.random() < self._flood_rate:
+            raise FloodError(5)
+        return Profile(int(phone), "user%s" % phone, "Soak", phone[-4:])
+
+
+async def soak(args: Namespace) -> SoakReport:
+    gate = GateStandIn(
+        args.rate,
+        page_size=args.page_size,
+        faults=Faults(
+            latency=args.gate_latency,
+            jitter=args.gate_latency,
+            server_errors=args.gate_errors,
+            throttled=args.gate_throttled,
+        ),
+        seed=args.seed,
+    )
+    bot = BotApiStandIn(
+        Faults(
+            latency=args.bot_latency,
+            jitter=args.bot_latency,
+            server_errors=args.bot_errors,
+            throttled=args.bot_throttled,
+            retry_after=args.retry_after,
+        ),
+        seed=args.seed + 1,
+    )
+    await gate.start()
+    await bot.start()
+    transport = RedirectTransport({"api.telegram.org": bot.port})
+    with TemporaryDirectory() as data:
+        async with AsyncClient(transport=transport) as http:
+            enricher = None
+            if args.enrich:
+                enricher = Enricher(
+                    CachingResolver(
+                        raw=SimulatedResolver(
+                            args.resolve_latency, args.flood_rate
+                        ),
+                        cache=ProfileCache(
+                            positive_ttl=86400, negative_ttl=3600
+                        ),
+                        limiter=RateLimiter(
+                            min_interval=args.resolve_latency,
+                            per_hour=10**6,
+                            per_day=10**6,
+                        ),
+                    ),
+                    poll_interval=1,
+                )
+            watcher = GateWatcher(
+                source=DEVICE_ID,
+                client=PalgateClient(
+                    http=http,
+                    url=gate.url.format(device_id=DEVICE_ID),
+                    session_token=SESSION_TOKEN,
+                    user_id=1,
+                    token_type=TokenType.SMS,
+                ),
+                store=FileStateStore(Path(data) / "state.json"),
+                notifiers=(
+                    TelegramNotifier(http=http, token="soak", chat_id=1),
+                ),
+                cron_delay=args.cron_delay,
+                max_backoff=args.max_backoff,
+                heartbeat_path=Path(data) / "heartbeat",
+                enricher=enricher,
+            )
+            report = await _drive(args, gate, bot, watcher, enricher)
+    await gate.close()
+    await bot.close()
+    return report
+
+
+async def _drive(
+    args: Namespace,
+    gate: GateStandIn,
+    bot: BotApiStandIn,
+    watcher: GateWatcher,
+    enricher: Enricher | None,
+) -> SoakReport:
+    producing = Event()
+    stop = Event()
+    rss_start = rss_peak = resident_memory()
+    started = monotonic()
+    # Prime the marker before the first measured entry, so every
+    # generated entry is expected to be delivered.
+    gate.prime()
+    await watcher.poll_once()
+    tasks = [
+        create_task(gate.generate(producing, limit=args.entries)),
+        create_task(watcher.run(stop)),
+    ]
+    if enricher is not None:
+        tasks.append(create_task(enricher.run(stop)))
+
+    if args.entries is not None:
+        # A fixed amount of work: the run's length follows from the rate.
+        await _generated(gate, args.entries)
+    else:
+        deadline = started + args.duration
+        while monotonic() < deadline:
+            await sleep(
+                min(args.report_every, max(0, deadline - monotonic()))
+            )
+            rss_peak = max(rss_peak, resident_memory())
+            print(_progress(monotonic() - started, gate, bot))
+    producing.set()
+    try:
+        await wait_for(_caught_up(gate, bot), args.drain)
+    except TimeoutError:
+        pass
+    stop.set()
+    await gather(*tasks)
+    rss_end = resident_memory()
+    return SoakReport(
+        seconds=monotonic() - started,
+        generated=gate.stats.generated,
+        delivered=len(bot.delivered),
+        duplicates=bot.stats.duplicates,
+        lost=gate.stats.generated - len(bot.delivered),
+        unseen=gate.stats.unseen,
+        messages=bot.stats.messages,
+        edits=bot.stats.edits,
+        gate_responses=dict(gate.stats.responses),
+        bot_responses=dict(bot.stats.responses),
+        latency=_percentiles(
+            [
+                delivered - gate.born[phone]
+                for phone, delivered in bot.delivered.items()
+                if phone in gate.born
+            ]
+        ),
+        rss_start=rss_start,
+        rss_end=rss_end,
+        rss_peak=max(rss_peak, rss_end),
+    )
+
+
+async def _generated(gate: GateStandIn, count: int) -> None:
+    while gate.stats.generated < count:
+        await sleep(0.1)
+
+
+async def _caught_up(gate: GateStandIn, bot: BotApiStandIn) -> None:
+    while len(bot.delivered) + gate.stats.unseen < gate.stats.generated:
+        await sleep(0.1)
+
+
+def _progress(elapsed: float, gate: GateStandIn, bot: BotApiStandIn) -> str:
+    return (
+        "[%6.0fs] generated %d, delivered %d, duplicates %d, "
+        "messages %d, rss %.1f MiB"
+        % (
+            elapsed,
+            gate.stats.generated,
+            len(bot.delivered),
+            bot.stats.duplicates,
+            bot.stats.messages,
+            resident_memory() / 2**20,
+        )
+    )
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return ordered[max(0, min(len(ordered) - 1, int(q * len(ordered))))]
+
+    return {
+        "p50": rank(0.5),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": ordered[-1],
+    }
+
+
+def resident_memory() -> int:
+    """Current RSS in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fp:
+            pages = int(fp.read().split()[1])
+        return pages * sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return getrusage(RUSAGE_SELF).ru_maxrss * 1024
+
+
+def format_report(report: SoakReport) -> str:
+    lines = [
+        "Soak: %.0fs" % report.seconds,
+        "  entries: %d generated, %d delivered (%.2f/s), %d messages, "
+        "%d edits"
+        % (
+            report.generated,
+            report.delivered,
+            report.delivered / report.seconds if report.seconds else 0,
+            report.messages,
+            report.edits,
+        ),
+        "  duplicates: %d, lost: %d (of which %d scrolled off unseen)"
+        % (report.duplicates, report.lost, report.unseen),
+        "  gate responses: %s" % _statuses(report.gate_responses),
+        "  bot responses: %s" % _statuses(report.bot_responses),
+    ]
+    if report.latency:
+        lines.append(
+            "  latency: "
+            + ", ".join(
+                "%s %.2fs" % (name, value)
+                for name, value in report.latency.items()
+            )
+        )
+    lines.append(
+        "  rss: %.1f MiB → %.1f MiB (peak %.1f MiB)"
+        % (
+            report.rss_start / 2**20,
+            report.rss_end / 2**20,
+            report.rss_peak / 2**20,
+        )
+    )
+    return "\n".join(lines)
+
+
+def _statuses(responses: dict[int, int]) -> str:
+    return ", ".join(
+        "%d×%d" % (count, status) for status, count in sorted(responses.items())
+    ) or "none"
+
+
+def parse_args(argv: list[str] | None = None) -> Namespace:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=600)
+    parser.add_argument(
+        "--entries", type=int, help="run for this many entries, not --duration"
+    )
+    parser.add_argument("--rate", type=float, default=1, help="entries/s")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--cron-delay", type=float, default=1)
+    parser.add_argument("--max-backoff", type=float, default=30)
+    parser.add_argument("--gate-latency", type=float, default=0.05)
+    parser.add_argument("--gate-errors", type=float, default=0.0)
+    parser.add_argument("--gate-throttled", type=float, default=0.0)
+    parser.add_argument("--bot-latency", type=float, default=0.05)
+    parser.add_argument("--bot-errors", type=float, default=0.0)
+    parser.add_argument("--bot-throttled", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--enrich", action="store_true")
+    parser.add_argument("--resolve-latency", type=float, default=0.2)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--drain", type=float, default=60)
+    parser.add_argument("--report-every", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    # The service's own warnings (retries, backoff) are part of the signal.
+    basicConfig(level=WARNING, format="%(asctime)s %(name)s %(message)s")
+    print(format_report(run(soak(parse_args()))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Local stand-ins for the Palgate log endpoint and the Telegram Bot API.
+
+Both run on the service's own ``LocalHttpServer``, so the watcher talks to
+them over real sockets with its real clients — token generation, retries,
+validation and rendering included — while the arrival rate, page size,
+latency and error mix are under the harness's control.
+
+Every gate entry carries a unique phone number (its ``sn``); the Bot API
+stand-in finds those numbers in the messages it accepts, which is how the
+soak runner matches deliveries to entries and counts duplicates and losses
+without any cooperation from the code under test.
+"""
+
+from asyncio import Event, sleep, wait_for
+from collections import deque
+from dataclasses import dataclass, field
+from json import dumps as json_dumps, loads as json_loads
+from random import Random
+from re import compile as re_compile
+from time import time
+from typing import Any
+
+from httpx import AsyncBaseTransport, AsyncHTTPTransport, Request, Response
+
+from http_server import HttpRequest, HttpResponse, LocalHttpServer
+
+JSON = "application/json"
+PHONE_LINK = re_compile(r'href="\+(\d+)"')
+FIRST_NAMES = ("John", "Jane", "Bob", "Alice", "Ivan", "Olga", "Petr")
+LAST_NAMES = ("Doe", "Smith", "Johnson", "Williams", "Petrov", "")
+# Outside the "7" + 10-digit counter range of generated entries.
+PRIME_PHONE = "79999999999"
+
+
+@dataclass(frozen=True)
+class Faults:
+    """Share of requests answered with an error instead of the real reply."""
+
+    latency: float = 0.02
+    jitter: float = 0.0
+    server_errors: float = 0.0
+    throttled: float = 0.0
+    retry_after: float = 1.0
+
+
+@dataclass
+class GateStats:
+    generated: int = 0
+    # Entries that scrolled off the page before any successful fetch saw
+    # them: lost upstream of the service, not by it.
+    unseen: int = 0
+    responses: dict[int, int] = field(default_factory=dict)
+
+
+class GateStandIn:
+    """The Palgate user log: entries arrive at ``rate`` per second.
+
+    A fetch returns the newest ``page_size`` entries, newest first, like the
+    real endpoint. ``born`` maps each entry's phone number to the wall
+    time it arrived, for end-to-end latency.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        page_size: int = 50,
+        faults: Faults | None = None,
+        seed: int = 0,
+    ) -> None:
+        self._rate = rate
+        self._faults = faults if faults is not None else Faults()
+        self._random = Random(seed)
+        self._page: deque[dict[str, Any]] = deque(maxlen=page_size)
+        self._served: set[str] = set()
+        self._server = LocalHttpServer(self._handle, "127.0.0.1", 0)
+        self.born: dict[str, float] = {}
+        self.stats = GateStats()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:%d/v1/bt/device/{device_id}/log" % (
+            self._server.port
+        )
+
+    async def start(self) -> None:
+        await self._server.start()
+
+    async def close(self) -> None:
+        await self._server.close()
+
+    async def generate(self, stop: Event, limit: int | None = None) -> None:
+        """Add entries with exponential inter-arrival times until ``stop``,
+        or until ``limit`` entries were generated."""
+        while not stop.is_set():
+            if limit is not None and self.stats.generated >= limit:
+                return
+            gap = self._random.expovariate(self._rate) if self._rate else 1.0
+            try:
+                await wait_for(stop.wait(), gap)
+            except TimeoutError:
+                if self._rate:
+                    self._arrive()
+
+    def prime(self) -> None:
+        """Add one uncounted entry for the watcher's first, silent poll.
+
+        The real endpoint never returns an empty log; this gives the
+        watcher a marker to start from before the measured entries arrive.
+        """
+        self._page.appendleft(self._entry(PRIME_PHONE, -1, time()))
+        self._served.add(PRIME_PHONE)
+
+    def _arrive(self) -> None:
+        number = self.stats.generated
+        self.stats.generated += 1
+        phone = "7%010d" % number
+        now = time()
+        if len(self._page) == self._page.maxlen:
+            oldest = self._page[-1]["sn"]
+            if oldest not in self._served:
+                self.stats.unseen += 1
+            self._served.discard(oldest)
+        self._page.appendleft(self._entry(phone, number, now))
+        self.born[phone] = now
+
+    def _entry(self, phone: str, number: int, now: float) -> dict[str, Any]:
+        return {
+            "userId": str(number),
+            "operation": "call",
+            "time": int(now),
+            "firstname": self._random.choice(FIRST_NAMES),
+            "lastname": self._random.choice(LAST_NAMES),
+            "image": False,
+            "reason": 0,
+            "type": 1,
+            "sn": phone,
+        }
+
+    async def _handle(self, request: HttpRequest) -> HttpResponse:
+        response = await _faulty(self._faults, self._random)
+        if response is None:
+            page = list(self._page)
+            self._served.update(entry["sn"] for entry in page)
+            response = HttpResponse(
+                200,
+                json_dumps(
+                    {"log": page, "err": False, "msg": "", "status": "ok"}
+                ).encode(),
+                JSON,
+            )
+        responses = self.stats.responses
+        responses[response.status] = responses.get(response.status, 0) + 1
+        return response
+
+
+@dataclass
+class BotStats:
+    messages: int = 0
+    edits: int = 0
+    duplicates: int = 0
+    responses: dict[int, int] = field(default_factory=dict)
+
+
+class BotApiStandIn:
+    """``sendMessage`` / ``editMessageText`` of the Telegram Bot API.
+
+    ``delivered`` maps each phone number seen in an accepted message to the
+    wall time of its first delivery; a number seen again is a duplicate.
+    """
+
+    def __init__(self, faults: Faults | None = None, seed: int = 1) -> None:
+        self._faults = faults if faults is not None else Faults()
+        self._random = Random(seed)
+        self._next_id = 1
+        self._server = LocalHttpServer(self._handle, "127.0.0.1", 0)
+        self.delivered: dict[str, float] = {}
+        self.stats = BotStats()
+
+    @property
+    def port(self) -> int:
+        return self._server.port
+
+    async def start(self) -> None:
+        await self._server.start()
+
+    async def close(self) -> None:
+        await self._server.close()
+
+    async def _handle(self, request: HttpRequest) -> HttpResponse:
+        response = await _faulty(self._faults, self._random)
+        if response is None:
+            response = self._accept(request)
+        responses = self.stats.responses
+        responses[response.status] = responses.get(response.status, 0) + 1
+        return response
+
+    def _accept(self, request: HttpRequest) -> HttpResponse:
+        method = request.path.rsplit("/", 1)[-1]
+        try:
+            payload = json_loads(request.body)
+        except ValueError:
+            return _telegram_error(400, "Bad Request: invalid JSON")
+        text = payload.get("text") if isinstance(payload, dict) else None
+        if not isinstance(text, str):
+            return _telegram_error(400, "Bad Request: message text is empty")
+        if method == "editMessageText":
+            self.stats.edits += 1
+            return _telegram_ok(True)
+        if method != "sendMessage":
+            return _telegram_error(404, "Not Found")
+        self.stats.messages += 1
+        now = time()
+        for phone in PHONE_LINK.findall(text):
+            if phone in self.delivered:
+                self.stats.duplicates += 1
+            else:
+                self.delivered[phone] = now
+        message_id = self._next_id
+        self._next_id += 1
+        return _telegram_ok({"message_id": message_id})
+
+
+class RedirectTransport(AsyncBaseTransport):
+    """Sends requests for the given hosts to local ports over plain HTTP.
+
+    Lets production clients with hard-wired API URLs (``TelegramNotifier``)
+    talk to a stand-in without a configuration knob for it.
+    """
+
+    def __init__(self, routes: dict[str, int]) -> None:
+        self._routes = routes
+        self._inner = AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: Request) -> Response:
+        port = self._routes.get(request.url.host)
+        if port is not None:
+            request.url = request.url.copy_with(
+                scheme="http", host="127.0.0.1", port=port
+            )
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+async def _faulty(faults: Faults, random: Random) -> HttpResponse | None:
+    """Sleep the configured latency; maybe return an injected error."""
+    delay = faults.latency + random.uniform(0, faults.jitter)
+    if delay > 0:
+        await sleep(delay)
+    roll = random.random()
+    if roll < faults.throttled:
+        return HttpResponse(
+            429,
+            json_dumps(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": faults.retry_after},
+                }
+            ).encode(),
+            JSON,
+        )
+    if roll < faults.throttled + faults.server_errors:
+        return HttpResponse(502, b"bad gateway")
+    return None
+
+
+def _telegram_ok(result: Any) -> HttpResponse:
+    return HttpResponse(
+        200, json_dumps({"ok": True, "result": result}).encode(), JSON
+    )
+
+
+def _telegram_error(status: int, description: str) -> HttpResponse:
+    return HttpResponse(
+        status,
+        json_dumps(
+            {"ok": False, "error_code": status, "description": description}
+        ).encode(),
+        JSON,
+    )
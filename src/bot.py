@@ -1,26 +1,36 @@
 from asyncio import (
     FIRST_COMPLETED,
     Event,
+    Lock,
+    Semaphore,
     Task,
     create_task,
     gather,
     sleep as asyncio_sleep,
+    timeout as asyncio_timeout,
     wait,
 )
+from dataclasses import dataclass
 from datetime import datetime, tzinfo
+from hmac import compare_digest
 from html import escape
-from json import JSONDecodeError, dumps as json_dumps
+from json import JSONDecodeError, dumps as json_dumps, loads as json_loads
 from logging import getLogger
 from time import time
-from typing import Any, Awaitable, Sequence
+from typing import Any, Awaitable, Callable, Sequence
+from urllib.parse import urlsplit
 
 from httpx import AsyncClient, TransportError
+from pydantic import ValidationError
 
 from github_client import GithubError, Release, ReleaseGateway
+from http_server import HttpRequest, HttpResponse, LocalHttpServer
 from log_item_model import LogItemType
-from models import Item
+from models import Entry, LogItem
 from notify import Notifier, NotifyError
 from palgate import PalgateClient, PalgateError
+from profiler import Profile, profile_loop
+from reload import SettingsReloader
 from resolver import CachingResolver
 from service import GateWatcher
 from state import StateStore
@@ -32,6 +42,45 @@ DEFAULT_LOG_COUNT = 5
 MAX_LOG_COUNT = 20
 MAX_VERSIONS = 10
 RELEASE_NOTES_LIMIT = 1000
+DEFAULT_PROFILE_SECONDS = 10
+# Must stay well under SLOW_COMMAND_TIMEOUT.
+MAX_PROFILE_SECONDS = 45
+
+# Commands run concurrently so a slow one (GitHub, Palgate retries) cannot
+# hold /status or /pause hostage; this many at a time, the rest queue.
+MAX_CONCURRENT_COMMANDS = 4
+COMMAND_TIMEOUT = 15
+# Commands that wait on GitHub or on PalgateClient's retries.
+SLOW_COMMAND_TIMEOUT = 60
+SLOW_COMMANDS = frozenset(
+    (
+        "log",
+        "release",
+        "versions",
+        "rollback",
+        "prestable",
+        "promote",
+        "mock",
+        "profile",
+    )
+)
+# Commands sharing a lane run one at a time in arrival order: /pause then
+# /resume must land in that order, and two deploy dispatches must not race.
+COMMAND_LANES = {
+    "poll": "control",
+    "pause": "control",
+    "resume": "control",
+    "release": "deploy",
+    "rollback": "deploy",
+    "prestable": "deploy",
+    "promote": "deploy",
+    "resolve": "resolver",
+    "reload": "control",
+    # tracemalloc is process-wide: one profile at a time.
+    "profile": "profiler",
+}
+# How long a stopping bot lets in-flight commands finish before cancelling.
+SHUTDOWN_GRACE = 5
 
 HELP_TEXT = (
     "<b>Commands</b>\n"
@@ -48,7 +97,15 @@ HELP_TEXT = (
     "/mock &lt;firstname&gt; &lt;lastname&gt; &lt;phone&gt; — post a mock gate "
     "entry to the prestable chat\n"
     "/resolve [reset] — resolver cache state, or drop the cached names\n"
-    "/help — this message" % (DEFAULT_LOG_COUNT, MAX_LOG_COUNT)
+    "/profile [seconds] — sample the event loop (default %d, max %d)\n"
+    "/reload — re-read the settings and apply what can change live\n"
+    "/help — this message"
+    % (
+        DEFAULT_LOG_COUNT,
+        MAX_LOG_COUNT,
+        DEFAULT_PROFILE_SECONDS,
+        MAX_PROFILE_SECONDS,
+    )
 )
 
 MOCK_USAGE = (
@@ -57,6 +114,26 @@ MOCK_USAGE = (
 )
 
 
+@dataclass(frozen=True)
+class WebhookConfig:
+    """Where Telegram pushes updates instead of being long-polled.
+
+    ``url`` is the public HTTPS address registered with ``setWebhook``
+    (the reverse proxy in front of the container); the local server on
+    ``host:port`` answers on the same path. ``secret`` comes back in the
+    ``X-Telegram-Bot-Api-Secret-Token`` header of every push.
+    """
+
+    url: str
+    secret: str
+    host: str = "0.0.0.0"
+    port: int = 8080
+
+    @property
+    def path(self) -> str:
+        return urlsplit(self.url).path or "/"
+
+
 def _truncate(text: str, limit: int) -> str:
     if len(text) <= limit:
         return text
@@ -80,15 +157,74 @@ def format_duration(seconds: float) -> str:
     return " ".join(parts[:2])
 
 
+def command_timeout(name: str) -> float:
+    return SLOW_COMMAND_TIMEOUT if name in SLOW_COMMANDS else COMMAND_TIMEOUT
+
+
+class CommandExecutor:
+    """Runs submitted jobs concurrently, at most ``limit`` at a time.
+
+    A job submitted with a lane waits for the earlier jobs of that lane to
+    finish first, so the lane keeps arrival order; jobs without one only
+    wait for a free slot. The lane is taken before the slot: a queued
+    ordered job never blocks a slot an unrelated command could use.
+    """
+
+    def __init__(self, limit: int = MAX_CONCURRENT_COMMANDS) -> None:
+        self._slots = Semaphore(limit)
+        self._lanes: dict[str, Lock] = {}
+        self._tasks: set[Task[None]] = set()
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs submitted and not finished yet, queued ones included."""
+        return len(self._tasks)
+
+    def submit(
+        self, job: Callable[[], Awaitable[None]], lane: str | None = None
+    ) -> None:
+        # The lane lock is looked up here, not in the task: tasks start in
+        # submission order, so they queue on it in that order too.
+        lock = None
+        if lane is not None:
+            lock = self._lanes.setdefault(lane, Lock())
+        task = create_task(self._run(job, lock))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self, grace: float) -> None:
+        """Give in-flight jobs ``grace`` seconds, then cancel the rest."""
+        pending = tuple(self._tasks)
+        if not pending:
+            return
+        _, unfinished = await wait(pending, timeout=grace)
+        for task in unfinished:
+            task.cancel()
+        await gather(*unfinished, return_exceptions=True)
+
+    async def _run(
+        self, job: Callable[[], Awaitable[None]], lock: Lock | None
+    ) -> None:
+        if lock is None:
+            async with self._slots:
+                await job()
+            return
+        async with lock, self._slots:
+            await job()
+
+
 class OpsBot:
-    """Serves operator commands from the ops chat via getUpdates polling.
-
-    Only messages from the configured chat are honoured; everything else
-    (other chats, plain text, commands addressed to another bot) is
-    dropped silently. Like the polling loop, this loop never dies:
-    transport failures back off and retry, and one broken update cannot
-    take the others down. Replies go through ``replier`` — a Notifier
-    bound to the same ops chat.
+    """Serves operator commands from the ops chat.
+
+    Updates arrive via getUpdates long polling, or — with a ``webhook`` —
+    are pushed by Telegram to a local HTTP receiver; both feed the same
+    ``_handle`` path, which hands each command to a ``CommandExecutor`` so
+    a slow command never delays the next update. Only messages from the
+    configured chat are honoured; everything else (other chats, plain
+    text, commands addressed to another bot) is dropped silently. Like the
+    polling loop, this loop never dies: transport failures back off and
+    retry, and one broken update cannot take the others down. Replies go
+    through ``replier`` — a Notifier bound to the same ops chat.
     """
 
     def __init__(
@@ -105,6 +241,8 @@ class OpsBot:
         github: ReleaseGateway | None = None,
         mock_notifier: Notifier | None = None,
         resolver: CachingResolver | None = None,
+        reloader: SettingsReloader | None = None,
+        webhook: WebhookConfig | None = None,
     ) -> None:
         self._http = http
         self._base_url = "https://api.telegram.org/bot%s" % token
@@ -118,12 +256,30 @@ class OpsBot:
         self._github = github
         self._mock_notifier = mock_notifier
         self._resolver = resolver
+        self._reloader = reloader
+        self._webhook = webhook
+        self._webhook_port: int | None = None
+        self._executor = CommandExecutor()
         self._offset = 0
         self._username: str | None = None
         self._log = getLogger("log")
         self._local = getLogger("default")
 
+    @property
+    def webhook_port(self) -> int | None:
+        """Port the webhook receiver is bound to, once it is listening."""
+        return self._webhook_port
+
     async def run(self, stop: Event) -> None:
+        try:
+            if self._webhook is not None:
+                await self._run_webhook(stop, self._webhook)
+            else:
+                await self._run_polling(stop)
+        finally:
+            await self._executor.drain(SHUTDOWN_GRACE)
+
+    async def _run_polling(self, stop: Event) -> None:
         while not stop.is_set():
             try:
                 if self._username is None:
@@ -138,10 +294,79 @@ class OpsBot:
                 await self._race(stop, self._backoff())
                 continue
             for update in updates or ():
+                self._handle(update)
+
+    async def _run_webhook(self, stop: Event, webhook: WebhookConfig) -> None:
+        """Receive pushed updates until stopped.
+
+        The receiver listens before ``setWebhook`` is called, so the first
+        push already finds it. Registration is retried like a failed long
+        poll. The webhook stays registered on shutdown: Telegram holds the
+        updates until the next instance is listening.
+        """
+        server = LocalHttpServer(self._receive, webhook.host, webhook.port)
+        await server.start()
+        self._webhook_port = server.port
+        try:
+            while not stop.is_set():
                 try:
-                    await self._handle(update)
-                except Exception:
-                    self._log.exception("Failed to handle bot update")
+                    if self._username is None:
+                        await self._fetch_username()
+                    if await self._register_webhook(webhook):
+                        break
+                except TransportError as err:
+                    self._local.warning("Bot API request failed: %s" % err)
+                except Exception:  # the loop must survive anything
+                    self._log.exception("Unexpected error in bot loop")
+                await self._race(stop, self._backoff())
+            await stop.wait()
+        finally:
+            await server.close()
+            self._webhook_port = None
+
+    async def _register_webhook(self, webhook: WebhookConfig) -> bool:
+        response = await self._http.post(
+            self._base_url + "/setWebhook",
+            json={
+                "url": webhook.url,
+                "secret_token": webhook.secret,
+                "allowed_updates": ["message"],
+            },
+            timeout=ERROR_BACKOFF * 2.0,
+        )
+        if self._api_payload(response) is None:
+            return False
+        self._local.info("Bot commands pushed via webhook %s" % webhook.url)
+        return True
+
+    async def _receive(self, request: HttpRequest) -> HttpResponse:
+        """Webhook entry point: validate the push, hand it to ``_handle``.
+
+        Answers right away and leaves the command to the executor, so a
+        slow command never makes Telegram time out and redeliver the push.
+        """
+        assert self._webhook is not None
+        if request.path != self._webhook.path:
+            return HttpResponse(404, b"not found")
+        if request.method != "POST":
+            return HttpResponse(405, b"method not allowed")
+        secret = request.headers.get("x-telegram-bot-api-secret-token", "")
+        if not compare_digest(secret.encode(), self._webhook.secret.encode()):
+            self._local.warning("Webhook push with a bad secret token")
+            return HttpResponse(403, b"forbidden")
+        try:
+            update = json_loads(request.body)
+        except (JSONDecodeError, UnicodeDecodeError):
+            return HttpResponse(400, b"invalid json")
+        if not isinstance(update, dict):
+            return HttpResponse(400, b"unexpected payload")
+        update_id = update.get("update_id")
+        if isinstance(update_id, int):
+            if update_id < self._offset:
+                return HttpResponse(200, b"duplicate")
+            self._offset = update_id + 1
+        self._handle(update)
+        return HttpResponse(200, b"ok")
 
     async def _backoff(self) -> None:
         await asyncio_sleep(ERROR_BACKOFF)
@@ -186,6 +411,11 @@ class OpsBot:
             },
             timeout=POLL_TIMEOUT + 10.0,
         )
+        if response.status_code == 409 and "webhook" in response.text:
+            # Left over from webhook mode: getUpdates is refused for as
+            # long as a webhook is registered on the token.
+            await self._delete_webhook()
+            return []
         payload = self._api_payload(response)
         if not isinstance(payload, list):
             return []
@@ -198,6 +428,13 @@ class OpsBot:
                 self._offset = max(self._offset, update_id + 1)
         return updates
 
+    async def _delete_webhook(self) -> None:
+        response = await self._http.post(
+            self._base_url + "/deleteWebhook", timeout=ERROR_BACKOFF * 2.0
+        )
+        if self._api_payload(response) is not None:
+            self._local.info("Dropped the webhook, back to long polling")
+
     def _api_payload(self, response: Any) -> Any:
         if response.status_code != 200:
             self._local.warning(
@@ -218,13 +455,36 @@ class OpsBot:
             return None
         return body.get("result")
 
-    async def _handle(self, update: dict[str, Any]) -> None:
-        command = self._parse_command(update)
+    def _handle(self, update: dict[str, Any]) -> None:
+        try:
+            command = self._parse_command(update)
+        except Exception:
+            self._log.exception("Failed to handle bot update")
+            return
         if command is None:
             return
         name, args = command
         self._local.info("Bot command /%s from ops chat" % name)
-        reply = await self._dispatch(name, args)
+        self._executor.submit(
+            lambda: self._execute(name, args), COMMAND_LANES.get(name)
+        )
+
+    async def _execute(self, name: str, args: Sequence[str]) -> None:
+        limit = command_timeout(name)
+        try:
+            async with asyncio_timeout(limit):
+                reply = await self._dispatch(name, args)
+        except TimeoutError:
+            self._log.warning(
+                "Bot command /%s timed out after %ds" % (name, limit)
+            )
+            reply = (
+                "/%s timed out after %ds. It may still have taken effect; "
+                "check /status before retrying." % (escape(name), limit)
+            )
+        except Exception:
+            self._log.exception("Failed to handle bot update")
+            return
         try:
             await self._replier.send(reply)
         except NotifyError as err:
@@ -280,6 +540,10 @@ class OpsBot:
             return await self._mock_text(args)
         if name == "resolve":
             return await self._resolve_text(args)
+        if name == "profile":
+            return await self._profile_text(args)
+        if name == "reload":
+            return self._reload_text()
         if name in ("help", "start"):
             return HELP_TEXT
         return "Unknown command /%s.\n\n%s" % (escape(name), HELP_TEXT)
@@ -367,11 +631,13 @@ class OpsBot:
         firstname, lastname, phone = args
         # The rendered entry rides Telegram's HTML parse mode; escaping the
         # operator-typed fields keeps a stray "<" from turning into a 400.
-        item = Item(
-            firstname=escape(firstname),
-            lastname=escape(lastname),
-            sn=escape(phone),
-            type=LogItemType.CALL,
+        item = Entry.from_log_item(
+            LogItem(
+                firstname=escape(firstname),
+                lastname=escape(lastname),
+                sn=escape(phone),
+                type=LogItemType.CALL,
+            )
         )
         # Ride the watcher's real delivery path (enricher render + identity
         # dogon) so the mock behaves like a polled entry, markers aside.
@@ -403,6 +669,23 @@ class OpsBot:
         lines.append("Usage: /resolve reset — drop the cached names")
         return "\n".join(lines)
 
+    def _reload_text(self) -> str:
+        if self._reloader is None:
+            return "Settings reload is not available."
+        report = self._reloader.reload()
+        # The reply lands in the ops chat already; keep a local record.
+        self._local.info(report.describe())
+        return escape(report.describe()) + "."
+
+    async def _profile_text(self, args: Sequence[str]) -> str:
+        try:
+            seconds = int(args[0]) if args else DEFAULT_PROFILE_SECONDS
+        except ValueError:
+            return "Usage: /profile [seconds] — seconds must be a number."
+        seconds = max(1, min(MAX_PROFILE_SECONDS, seconds))
+        profile = await profile_loop(seconds)
+        return format_profile(profile)
+
     async def _promote_text(self, args: Sequence[str]) -> str:
         if self._github is None:
             return "Promote is not configured (set GITHUB_TOKEN)."
@@ -541,10 +824,24 @@ class OpsBot:
         lines.append("Channels:")
         for channel in status.channels:
             marker = await self._store.get_marker(status.source, channel)
-            lines.append(
-                "  %s: %s"
-                % (escape(channel), escape(marker or "not primed"))
-            )
+            line = "  %s: %s" % (escape(channel), escape(marker or "not primed"))
+            if channel in status.queued:
+                line += " (%d queued)" % status.queued[channel]
+            lines.append(line)
+        if status.lag:
+            lines.append("Lag since the gate event (last hour):")
+            for stats in status.lag:
+                lines.append(
+                    "  %s %s: p50 %s, p95 %s, p99 %s (%d entries)"
+                    % (
+                        stats.stage,
+                        escape(stats.channel),
+                        format_duration(stats.p50),
+                        format_duration(stats.p95),
+                        format_duration(stats.p99),
+                        stats.samples,
+                    )
+                )
         return "\n".join(lines)
 
     async def _log_text(self, args: Sequence[str]) -> str:
@@ -557,13 +854,16 @@ class OpsBot:
             response = await self._client.fetch_log()
         except PalgateError as err:
             return "Cannot fetch the gate log: %s" % escape(str(err))
-        items = (response.log or [])[:count]
+        try:
+            items = (response.log or [])[:count]
+        except ValidationError as err:
+            return "Cannot read the gate log: %s" % escape(str(err))
         lines = ["<b>Last %d log entries</b> (newest first)" % len(items)]
         for item in items:
             timestamp = self._format_time(
                 float(item.time) if item.time else None
             )
-            lines.append("%s — %s" % (timestamp, Item.from_log_item(item)))
+            lines.append("%s — %s" % (timestamp, Entry.from_log_item(item)))
         return "\n".join(lines)
 
     def _format_time(self, timestamp: float | None) -> str:
@@ -573,5 +873,42 @@ class OpsBot:
         return moment.strftime("%Y-%m-%d %H:%M:%S")
 
 
+def format_profile(profile: Profile) -> str:
+    lines = [
+        "<b>Event loop profile</b> (%.0fs, %d samples, busy %.0f%%)"
+        % (profile.seconds, profile.samples, profile.busy * 100)
+    ]
+    busy = profile.samples - profile.idle
+    if not busy:
+        lines.append("The loop was idle the whole time.")
+    else:
+        lines.append("\n<b>Self time</b>")
+        lines.extend(
+            "%3.0f%% %s" % (stat.samples * 100 / busy, escape(stat.name))
+            for stat in profile.top_self
+        )
+        lines.append("\n<b>Total time</b>")
+        lines.extend(
+            "%3.0f%% %s" % (stat.samples * 100 / busy, escape(stat.name))
+            for stat in profile.top_total
+        )
+    if profile.allocations:
+        lines.append("\n<b>Allocations</b> (net growth)")
+        lines.extend(
+            "%s in %d block(s) at %s"
+            % (_format_size(stat.size), stat.count, escape(stat.site))
+            for stat in profile.allocations
+        )
+    return "\n".join(lines)
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return "%.1f MiB" % (size / (1024 * 1024))
+    if size >= 1024:
+        return "%.1f KiB" % (size / 1024)
+    return "%d B" % size
+
+
 async def _await(awaitable: Awaitable[Any]) -> Any:
     return await awaitable
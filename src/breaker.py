@@ -0,0 +1,175 @@
+"""Circuit breakers for the endpoints the service calls out to.
+
+Every notifier call retries with sleeps, and the Palgate client retries
+inside the watcher's own backoff. While an endpoint is down for an hour
+that is a retry storm each cycle, and since the watcher delivers channel
+by channel, a dead channel also delays the healthy ones. A
+``CircuitBreaker`` shared by all callers of one endpoint counts failed
+calls; after ``failures`` in a row it opens and calls fail at once. Once
+``cooldown`` seconds have passed, the next call goes through as the single
+probe (half-open): it succeeds and the circuit closes, or it fails and the
+circuit opens for another ``cooldown``. Calls arriving while the probe is
+in flight fail fast too.
+
+A breaker only sees what its caller reports: a call the endpoint answered,
+even with a rejection, is a success — the endpoint is up.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging import getLogger
+from time import monotonic
+from typing import Callable
+
+from deadline import expired
+from metrics import counter, gauge
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = gauge(
+    "palgate_circuit_state",
+    "Circuit breaker state per endpoint: 0 closed, 1 half-open, 2 open",
+    ("endpoint",),
+)
+CIRCUIT_REJECTED = counter(
+    "palgate_circuit_rejected_total",
+    "Calls failed fast by an open (or probing) circuit",
+    ("endpoint",),
+)
+
+
+class CircuitOpenError(Exception):
+    """The circuit refused the call; ``retry_in`` is the time to the next
+    probe (0 while a probe is in flight)."""
+
+    def __init__(self, endpoint: str, retry_in: float) -> None:
+        super().__init__(
+            "%s circuit open, next probe in %.0fs" % (endpoint, retry_in)
+            if retry_in > 0
+            else "%s circuit open, probe in flight" % endpoint
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed → open after ``failures`` failed calls in a row → one probe
+    after ``cooldown`` seconds.
+
+    A caller runs ``check`` before the call, then reports exactly one of
+    ``succeeded``, ``failed`` or — when the call ended without an answer
+    either way (cancelled) — ``released``.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        failures: int = 3,
+        cooldown: float = 60,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._endpoint = endpoint
+        self._threshold = failures
+        self._cooldown = cooldown
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._log = getLogger("default")
+        CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], endpoint=endpoint)
+
+    @property
+    def endpoint(self) -> str:
+        return self._endpoint
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def retry_in(self) -> float:
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._cooldown - self._clock())
+
+    def check(self) -> bool:
+        """Admit a call or raise ``CircuitOpenError``; True when the call
+        is the probe, which should make a single attempt."""
+        if self._state == CLOSED:
+            return False
+        if self._state == OPEN and self.retry_in() <= 0:
+            self._set(HALF_OPEN)
+            return True
+        CIRCUIT_REJECTED.inc(endpoint=self._endpoint)
+        raise CircuitOpenError(self._endpoint, self.retry_in())
+
+    def succeeded(self) -> None:
+        if self._state != CLOSED:
+            self._log.info("%s circuit closed" % self._endpoint)
+        self._failures = 0
+        self._set(CLOSED)
+
+    def failed(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or (
+            self._state == CLOSED and self._failures >= self._threshold
+        ):
+            self._log.warning(
+                "%s circuit open after %d failed calls, probing in %.0fs"
+                % (self._endpoint, self._failures, self._cooldown)
+            )
+            self._opened_at = self._clock()
+            self._set(OPEN)
+
+    def released(self) -> None:
+        if self._state == HALF_OPEN:
+            # The probe never got an answer; the next call probes again.
+            self._set(OPEN)
+
+    def _set(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state], endpoint=self._endpoint)
+
+
+@contextmanager
+def guarded[E: Exception](
+    breaker: CircuitBreaker | None,
+    errors: type[E],
+    transient: Callable[[E], bool],
+    refused: Callable[[str], Exception],
+) -> Iterator[bool]:
+    """Run one call under ``breaker``; yields True when it is the probe.
+
+    ``errors`` are the caller's own: one of them means the call ran, and it
+    failed if ``transient`` says so, otherwise the endpoint answered. A
+    transient error once the poll cycle's deadline has passed says nothing
+    about the endpoint — the last attempt's timeout was cut to the time
+    left — so, like any other exception (a cancellation), it releases the
+    call. A refused call
+    raises ``refused`` with the circuit's message, so callers handle it as
+    they do an outage.
+    """
+    if breaker is None:
+        yield False
+        return
+    try:
+        probe = breaker.check()
+    except CircuitOpenError as err:
+        raise refused(str(err)) from err
+    try:
+        yield probe
+    except errors as err:
+        if not transient(err):
+            breaker.succeeded()
+        elif expired():
+            breaker.released()
+        else:
+            breaker.failed()
+        raise
+    except BaseException:
+        breaker.released()
+        raise
+    breaker.succeeded()
@@ -1,7 +1,11 @@
-from typing import Literal
+from os import environ
+from typing import Literal, Self
 
-from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings
+from pydantic import Field, field_validator, model_validator
+from pydantic_settings import (
+    BaseSettings,
+    PydanticBaseSettingsSource,
+)
 from pylgate.types import TokenType
 
 
@@ -36,6 +40,16 @@ class Settings(BaseSettings):
     # prod chat. 0 (the default) keeps the command disabled.
     PRESTABLE_TELEGRAM_CHAT_ID: int = 0
 
+    # Optional webhook mode for the ops bot: Telegram pushes updates to
+    # BOT_WEBHOOK_URL (a public HTTPS address proxied to the local receiver
+    # on BOT_WEBHOOK_HOST:BOT_WEBHOOK_PORT) instead of being long-polled.
+    # Empty keeps getUpdates long polling. The secret is echoed back by
+    # Telegram on every push and checked by the receiver.
+    BOT_WEBHOOK_URL: str = ""
+    BOT_WEBHOOK_SECRET: str = Field(default="", pattern=r"^[A-Za-z0-9_-]*$")
+    BOT_WEBHOOK_HOST: str = "0.0.0.0"
+    BOT_WEBHOOK_PORT: int = Field(default=8080, ge=0, le=65535)
+
     # Optional Max messenger channel; enabled only when the token is set.
     MAX_API_TOKEN: str = ""
     MAX_CHAT_ID: int = 0
@@ -45,12 +59,60 @@ class Settings(BaseSettings):
     GITHUB_TOKEN: str = ""
     GITHUB_REPO: str = "m6mok/palgate-tg-notify"
 
+    # Durable per-channel outbox: the poll cycle journals rendered batches
+    # and per-channel workers deliver them, so a broken channel never
+    # stalls polling and a restart resumes pending sends.
+    OUTBOX_ENABLED: bool = False
+    OUTBOX_FILE: str = "data/outbox.json"
+
+    # X-Bt-Tokens are generated ahead of time, one per slot of this many
+    # seconds, and shared by every request in the slot. Keep it well under
+    # the few seconds a token stays valid; 0 generates one per request.
+    PALGATE_TOKEN_SLOT: int = Field(default=2, ge=0, le=4)
+
+    # Validate Palgate log bodies of at least PALGATE_PARSE_THRESHOLD bytes
+    # in this many worker processes instead of on the event loop; 0 (the
+    # default) parses everything inline.
+    PALGATE_PARSE_WORKERS: int = Field(default=0, ge=0)
+    PALGATE_PARSE_THRESHOLD: int = Field(default=256 * 1024, ge=0)
+
+    # Append every raw Palgate response to this gzip capture for offline
+    # replay (perf/replay.py); empty (the default) records nothing.
+    PALGATE_CAPTURE_FILE: str = ""
+
+    # Prometheus-format metrics on http://METRICS_HOST:METRICS_PORT/metrics;
+    # port 0 (the default) leaves the endpoint off.
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = Field(default=0, ge=0, le=65535)
+
+    # Report event loop stalls longer than this many seconds (with the
+    # code that held the loop) to the ops log and metrics; 0 turns the
+    # monitor off.
+    LOOP_STALL_THRESHOLD: float = Field(default=0.5, ge=0)
+
+    # Format of the stdout and file logs: "text" for people, "json" for
+    # one JSON object per line, for log shippers.
+    LOG_FORMAT: Literal["text", "json"] = "text"
+
+    # Ops-chat log records are collected for this many seconds and sent as
+    # one message, repeats folded into "×N"; errors are sent at once.
+    LOG_CHAT_WINDOW: float = Field(default=10, gt=0)
+
     STATE_FILE: str = "data/state.json"
     HEARTBEAT_FILE: str = "data/heartbeat"
     VERSION_FILE: str = "data/version"
+    # Env-file syntax; its values override the environment. Re-read on
+    # SIGHUP and the ops bot's /reload, so the settings that can change
+    # live do so without a restart. A missing file is ignored.
+    SETTINGS_FILE: str = "data/settings.env"
     LOCK_TIMEOUT: float = 60
     MAX_BACKOFF: float = 300
     ALERT_AFTER_FAILURES: int = Field(default=10, ge=1)
+    # Per endpoint (Telegram, Max, Palgate): after this many failed calls
+    # in a row (each after its own retries) calls fail at once, and one
+    # probe goes through every CIRCUIT_COOLDOWN seconds until it succeeds.
+    CIRCUIT_FAILURES: int = Field(default=3, ge=1)
+    CIRCUIT_COOLDOWN: float = Field(default=60, gt=0)
 
     # Optional Telegram identity enrichment: resolve a log entry's phone
     # number to a Telegram profile (via a user account / MTProto) and edit
@@ -75,6 +137,19 @@ class Settings(BaseSettings):
     RESOLVE_NEGATIVE_TTL: float = Field(default=3 * 86400, ge=0)
     RESOLVE_POLL_INTERVAL: float = Field(default=5, ge=1)
 
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> tuple[PydanticBaseSettingsSource, ...]:
+        # The env file is SETTINGS_FILE: the container environment is fixed
+        # at start, so the file has to win for a reload to change anything.
+        return init_settings, dotenv_settings, env_settings, file_secret_settings
+
     @field_validator("SESSION_TOKEN")
     @classmethod
     def session_token_must_be_hex(cls, value: str) -> str:
@@ -95,6 +170,24 @@ class Settings(BaseSettings):
             )
         return value
 
+    @model_validator(mode="after")
+    def webhook_needs_a_secret(self) -> Self:
+        if self.BOT_WEBHOOK_URL and not self.BOT_WEBHOOK_SECRET:
+            raise ValueError(
+                "BOT_WEBHOOK_SECRET is required when BOT_WEBHOOK_URL is set"
+            )
+        return self
+
     @property
     def session_token_bytes(self) -> bytes:
         return bytes.fromhex(self.SESSION_TOKEN)
+
+
+def load_settings() -> Settings:
+    """The environment with ``SETTINGS_FILE`` laid over it."""
+    # Only the path comes from the environment first: a full Settings
+    # from it alone would reject required fields set only in the file.
+    path = environ.get(
+        "SETTINGS_FILE", Settings.model_fields["SETTINGS_FILE"].default
+    )
+    return Settings(_env_file=path)
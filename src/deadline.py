@@ -0,0 +1,72 @@
+"""Time budget of the poll cycle, seen by every retry loop inside it.
+
+One ``GateWatcher.poll_once`` runs the Palgate client's retries and then,
+channel by channel, each notifier's retries with doubling sleeps. Each loop
+is bounded on its own, but together they easily take minutes, while the
+heartbeat only covers ``HEARTBEAT_MARGIN`` past the planned poll. The cycle
+sets a deadline with ``budget``; the client and the notifiers read it from
+a context variable — no signature in between has to carry it — and:
+
+- make no attempt once it has passed (``expired``);
+- cut an attempt's timeout to the time left (``clip_timeout``);
+- retry only when the sleep before the next attempt ends in time
+  (``time_for``).
+
+The call then fails the way an outage does, with a transient error, and
+the cycle ends with what it got through: markers of the channels served
+stay advanced, the rest catch up on the next cycle. Code outside a cycle
+(the outbox workers, the enricher, the ops bot) has no deadline and every
+helper here lets it run as before. Tasks started inside a cycle inherit the
+deadline with the rest of the context.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+
+# Monotonic time the current cycle must be done by; None outside a cycle.
+_DEADLINE: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def budget(seconds: float) -> Iterator[None]:
+    """Give the code in the block ``seconds`` to finish; a budget nested in
+    another never extends it."""
+    deadline = monotonic() + seconds
+    outer = _DEADLINE.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left (negative once passed), or None without a deadline."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return None
+    return deadline - monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clip_timeout(timeout: float) -> float:
+    """``timeout``, cut to the time left."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return max(0.0, min(timeout, left))
+
+
+def time_for(delay: float) -> bool:
+    """Whether another attempt after sleeping ``delay`` still starts in
+    time."""
+    left = remaining()
+    return left is None or delay < left
@@ -0,0 +1,74 @@
+"""Blocking file I/O, kept off the event loop.
+
+The state file, the outbox journal, the resolver snapshot and the
+heartbeat all live on the data volume and are written with an fsync; on a
+slow volume each of those costs the whole loop — polling, ops commands and
+the log bridge — hundreds of milliseconds. ``DiskExecutor`` runs them on
+one dedicated thread instead. A single worker keeps the jobs in submission
+order, so a journal write queued before a marker advance still reaches the
+disk first, and a read-modify-write job (``FileStateStore.advance``) cannot
+interleave with another writer.
+"""
+
+from asyncio import shield, wrap_future
+from concurrent.futures import Future, ThreadPoolExecutor
+from json import dump as json_dump
+from os import fsync, replace
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class DiskExecutor:
+    """Runs blocking file jobs on one worker thread, in submission order.
+
+    ``run`` is for callers that need the result; ``submit`` queues a job
+    and returns at once (the caller owns the error handling via the
+    returned future). A job that was already queued runs to completion even
+    if the awaiting task is cancelled, so an atomic write is never cut in
+    half by a shutdown.
+    """
+
+    def __init__(self, name: str = "disk-io") -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=name
+        )
+
+    def submit(self, job: Callable[..., T], *args: Any) -> "Future[T]":
+        return self._executor.submit(job, *args)
+
+    async def run(self, job: Callable[..., T], *args: Any) -> T:
+        # Without the shield, cancelling the caller cancels a job that is
+        # still queued and it never runs.
+        return await shield(wrap_future(self.submit(job, *args)))
+
+    async def drain(self) -> None:
+        """Wait for every job queued so far."""
+        await self.run(_noop)
+
+    def flush(self) -> None:
+        """Blocking ``drain`` for synchronous callers (startup, tests)."""
+        self.submit(_noop).result()
+
+
+# Shared by every file-backed store, like the logging and metrics
+# registries: one queue means one global write order.
+DISK = DiskExecutor()
+
+
+def write_json_atomic(path: Path, document: Any) -> None:
+    """Replace ``path`` with ``document`` via a fsynced tmp file + rename.
+
+    A crash mid-write leaves the previous version intact.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w") as fp:
+        json_dump(document, fp)
+        fp.flush()
+        fsync(fp.fileno())
+    replace(tmp_path, path)
+
+
+def _noop() -> None:
+    return None
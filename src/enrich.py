@@ -19,6 +19,11 @@ Two paths, both best-effort — enrichment never blocks or fails delivery:
   Only numbers cached as absent (no Telegram) skip the re-check and wait out
   their negative TTL instead.
 
+Rendering is memoized: each line is kept with the resolver cache version it
+was rendered at and re-rendered only once that version moves, and a queued
+batch is not rendered again at all until it does. A round in which nothing
+new resolved costs no string work.
+
 The queue is in-memory: a restart drops pending dogon (those messages stay at
 their last edited state), but the resolver cache is persisted, so future
 messages still benefit. A batch is dropped once every number is known, once
@@ -27,29 +32,37 @@ an edit is permanently rejected, or once it outlives ``batch_ttl``.
 
 from asyncio import FIRST_COMPLETED, Event, create_task, gather, wait
 from dataclasses import dataclass
+from functools import partial
 from html import escape
 from logging import getLogger
 from time import time
 from typing import Callable, Sequence
+from weakref import ReferenceType, ref
 
-from models import Item
+from metrics import gauge
+from models import Entry
 from notify import Notifier, NotifyError
 from resolver import CachingResolver, Profile, ResolveOutcome
 
 
-def _phone(item: Item) -> str | None:
-    try:
-        return item.pn
-    except ValueError:
-        return None
+QUEUE_BATCHES = gauge(
+    "palgate_enrich_queue_batches",
+    "Delivered messages waiting for a profile re-check and edit",
+)
+PENDING_LOOKUPS = gauge(
+    "palgate_enrich_pending_lookups",
+    "Distinct phone numbers the enricher still has to look up",
+)
 
 
 @dataclass
 class _Batch:
     notifier: Notifier
     message_id: int
-    items: tuple[Item, ...]
+    items: tuple[Entry, ...]
     last_text: str
+    # Resolver cache version last_text was rendered at.
+    version: int
     created_at: float
     pending: set[str]  # phones awaiting a fresh lookup for this batch
 
@@ -67,6 +80,10 @@ class Enricher:
         self._batch_ttl = batch_ttl
         self._clock = clock
         self._queue: list[_Batch] = []
+        # id(item) -> (the item, cache version, its line). The weak reference
+        # drops the entry when the item is gone, so an id is never reused
+        # for a stale line.
+        self._lines: dict[int, tuple[ReferenceType[Entry], int, str]] = {}
         self._wake = Event()
         self._log = getLogger("default")
 
@@ -74,12 +91,21 @@ class Enricher:
     def resolver(self) -> CachingResolver:
         return self._resolver
 
-    def render(self, items: Sequence[Item]) -> str:
+    @property
+    def poll_interval(self) -> float:
+        return self._poll_interval
+
+    @poll_interval.setter
+    def poll_interval(self, seconds: float) -> None:
+        # Read on every wait, so the next round already uses it.
+        self._poll_interval = seconds
+
+    def render(self, items: Sequence[Entry]) -> str:
         """The batch text with any cached Telegram identities appended."""
         return "\n".join(self._line(item) for item in items)
 
     def track(
-        self, notifier: Notifier, message_id: int, items: Sequence[Item]
+        self, notifier: Notifier, message_id: int, items: Sequence[Entry]
     ) -> None:
         """Queue a delivered batch for a background profile re-check.
 
@@ -89,23 +115,23 @@ class Enricher:
         are skipped until their negative TTL expires.
         """
         pending = {
-            phone
-            for item in items
-            if (phone := _phone(item)) is not None
-            and self._wants_refresh(phone)
+            item.pn for item in items if self._wants_refresh(item.pn)
         }
         if not pending:
             return
+        version = self._resolver.cache_version
         self._queue.append(
             _Batch(
                 notifier=notifier,
                 message_id=message_id,
                 items=tuple(items),
                 last_text=self.render(items),
+                version=version,
                 created_at=self._clock(),
                 pending=pending,
             )
         )
+        self._report_depth()
         self._wake.set()
 
     def _wants_refresh(self, phone: str) -> bool:
@@ -119,8 +145,13 @@ class Enricher:
                 await self._drain_once()
             except Exception:  # a worker crash must not take the loop down
                 self._log.exception("Enricher round failed")
+            self._report_depth()
             await self._sleep(stop)
 
+    def _report_depth(self) -> None:
+        QUEUE_BATCHES.set(len(self._queue))
+        PENDING_LOOKUPS.set(len(self._pending_lookups()))
+
     async def _drain_once(self) -> None:
         self._expire_stale()
         if not self._queue:
@@ -140,32 +171,31 @@ class Enricher:
         seen: set[str] = set()
         for batch in self._queue:
             for item in batch.items:
-                phone = _phone(item)
-                if (
-                    phone is not None
-                    and phone in batch.pending
-                    and phone not in seen
-                ):
+                phone = item.pn
+                if phone in batch.pending and phone not in seen:
                     seen.add(phone)
                     lookups.append(phone)
         return lookups
 
     async def _flush_edits(self) -> None:
         for batch in list(self._queue):
-            text = self.render(batch.items)
-            if text != batch.last_text:
-                try:
-                    await batch.notifier.edit(batch.message_id, text)
-                except NotifyError as err:
-                    if err.permanent:
-                        self._log.error(
-                            "Enrich edit permanently rejected, dropping: %s" % err
-                        )
-                        self._queue.remove(batch)
-                        continue
-                    self._log.warning("Enrich edit failed, will retry: %s" % err)
-                    continue  # keep last_text so we retry the same edit
-                batch.last_text = text
+            version = self._resolver.cache_version
+            if batch.version != version:
+                text = self.render(batch.items)
+                if text != batch.last_text:
+                    try:
+                        await batch.notifier.edit(batch.message_id, text)
+                    except NotifyError as err:
+                        if err.permanent:
+                            self._log.error(
+                                "Enrich edit permanently rejected, dropping: %s" % err
+                            )
+                            self._queue.remove(batch)
+                            continue
+                        self._log.warning("Enrich edit failed, will retry: %s" % err)
+                        continue  # keep last_text so we retry the same edit
+                    batch.last_text = text
+                batch.version = version
             if self._is_complete(batch):
                 self._queue.remove(batch)
 
@@ -176,11 +206,26 @@ class Enricher:
     def _is_complete(self, batch: _Batch) -> bool:
         return not batch.pending
 
-    def _line(self, item: Item) -> str:
-        base = str(item)
-        phone = _phone(item)
-        if phone is None:
-            return base
+    def _line(self, item: Entry) -> str:
+        version = self._resolver.cache_version
+        key = id(item)
+        memo = self._lines.get(key)
+        if memo is not None and memo[1] == version:
+            return memo[2]
+        line = self._render_line(item)
+        if memo is None:
+            item_ref = ref(item, partial(self._forget_line, key))
+        else:
+            item_ref = memo[0]
+        self._lines[key] = (item_ref, version, line)
+        return line
+
+    def _forget_line(self, key: int, _: ReferenceType[Entry]) -> None:
+        self._lines.pop(key, None)
+
+    def _render_line(self, item: Entry) -> str:
+        base = item.line
+        phone = item.pn
         hit = self._resolver.cached(phone)
         if (
             hit is None
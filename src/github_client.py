@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from json import JSONDecodeError
-from typing import Protocol
+from time import monotonic
+from typing import Callable, Protocol
 
 from httpx import AsyncClient, TransportError
 
@@ -19,6 +20,13 @@ class Release:
     notes: str | None
 
 
+@dataclass
+class _Listing:
+    releases: list[Release]
+    etag: str | None
+    fetched_at: float
+
+
 class ReleaseGateway(Protocol):
     """Lists releases and dispatches the deploy workflows."""
 
@@ -40,6 +48,12 @@ class GithubClient:
 
     Needs a PAT with Actions read+write (workflow dispatch) and Contents
     read (releases list) on the repository.
+
+    Release listings are cached for ``cache_ttl`` seconds: one rollback
+    flow lists releases several times within a minute. Past the TTL the
+    listing is revalidated with ``If-None-Match`` — a 304 reuses it and
+    does not count against GitHub's rate limit. A dispatch expires the
+    cache, so the next listing is revalidated rather than trusted.
     """
 
     def __init__(
@@ -48,6 +62,8 @@ class GithubClient:
         token: str,
         repo: str,
         timeout: float = 10,
+        cache_ttl: float = 30,
+        clock: Callable[[], float] = monotonic,
     ) -> None:
         self._http = http
         self._base_url = "https://api.github.com/repos/%s" % repo
@@ -57,18 +73,34 @@ class GithubClient:
             "X-GitHub-Api-Version": "2022-11-28",
         }
         self._timeout = timeout
+        self._cache_ttl = cache_ttl
+        self._clock = clock
+        # Keyed by page size: the first ``limit`` releases of a longer
+        # fresh listing answer a shorter request too.
+        self._listings: dict[int, _Listing] = {}
 
     async def releases(self, limit: int = 5) -> list[Release]:
         """Releases, newest first."""
+        now = self._clock()
+        for size, listing in self._listings.items():
+            if size >= limit and now - listing.fetched_at < self._cache_ttl:
+                return listing.releases[:limit]
+        cached = self._listings.get(limit)
+        headers = self._headers
+        if cached is not None and cached.etag is not None:
+            headers = {**headers, "If-None-Match": cached.etag}
         try:
             response = await self._http.get(
                 self._base_url + "/releases",
                 params={"per_page": limit},
-                headers=self._headers,
+                headers=headers,
                 timeout=self._timeout,
             )
         except TransportError as err:
             raise GithubError("GitHub unreachable: %s" % err) from err
+        if response.status_code == 304 and cached is not None:
+            cached.fetched_at = now
+            return list(cached.releases)
         if response.status_code != 200:
             raise GithubError("GitHub responded %d" % response.status_code)
         try:
@@ -92,7 +124,17 @@ class GithubClient:
                     notes=_optional_str(entry.get("body")),
                 )
             )
-        return releases
+        self._listings[limit] = _Listing(
+            releases=releases,
+            etag=response.headers.get("ETag"),
+            fetched_at=now,
+        )
+        return list(releases)
+
+    def invalidate(self) -> None:
+        """Expire cached listings; their ETags still allow a cheap 304."""
+        for listing in self._listings.values():
+            listing.fetched_at = float("-inf")
 
     async def release_tags(self, limit: int = 5) -> list[str]:
         """Release tag names, newest first."""
@@ -137,6 +179,9 @@ class GithubClient:
                 "GitHub refused the dispatch: %d %s"
                 % (response.status_code, response.text[:200])
             )
+        # A deploy usually precedes a new release or a /versions check;
+        # don't let a listing from before it answer for the next minute.
+        self.invalidate()
 
 
 def _optional_str(value: object) -> str | None:
@@ -0,0 +1,177 @@
+"""A minimal HTTP/1.1 server on asyncio streams.
+
+Enough for the service's own small endpoints (the ops bot webhook) without
+pulling a web framework into the image: one request per connection, a
+``Content-Length`` body, and a ``Connection: close`` response. Anything
+fancier (chunked bodies, keep-alive, TLS) belongs in the reverse proxy in
+front of it.
+"""
+
+from asyncio import (
+    IncompleteReadError,
+    LimitOverrunError,
+    Server,
+    StreamReader,
+    StreamWriter,
+    TimeoutError as AsyncTimeoutError,
+    start_server,
+    wait_for,
+)
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from logging import getLogger
+from typing import Awaitable, Callable
+
+
+@dataclass(frozen=True)
+class HttpRequest:
+    method: str
+    path: str
+    # Header names are lower-cased; a repeated header keeps its last value.
+    headers: dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+
+@dataclass(frozen=True)
+class HttpResponse:
+    status: int
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+
+
+HttpHandler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+class LocalHttpServer:
+    """Serves ``handler`` on ``host:port``; port 0 picks a free one.
+
+    A malformed request is answered 400 and an oversized body 413 without
+    reaching the handler; a handler exception becomes a 500. Nothing a
+    client sends can take the server down.
+    """
+
+    def __init__(
+        self,
+        handler: HttpHandler,
+        host: str,
+        port: int,
+        max_body: int = 1_000_000,
+        read_timeout: float = 10,
+    ) -> None:
+        self._handler = handler
+        self._host = host
+        self._port = port
+        self._max_body = max_body
+        self._read_timeout = read_timeout
+        self._server: Server | None = None
+        self._log = getLogger("default")
+
+    @property
+    def port(self) -> int:
+        """The bound port — the real one when constructed with 0."""
+        if self._server is None or not self._server.sockets:
+            return self._port
+        return int(self._server.sockets[0].getsockname()[1])
+
+    async def start(self) -> None:
+        self._server = await start_server(
+            self._serve_connection, self._host, self._port
+        )
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _serve_connection(
+        self, reader: StreamReader, writer: StreamWriter
+    ) -> None:
+        try:
+            try:
+                request = await wait_for(
+                    self._read_request(reader), self._read_timeout
+                )
+            except _BadRequest as err:
+                response = HttpResponse(err.status, err.reason.encode())
+            except (
+                AsyncTimeoutError,
+                IncompleteReadError,
+                LimitOverrunError,
+                ConnectionError,
+            ):
+                return
+            else:
+                try:
+                    response = await self._handler(request)
+                except Exception:  # a handler bug must not kill the server
+                    self._log.exception("HTTP handler failed")
+                    response = HttpResponse(500, b"internal error")
+            writer.write(_encode(response))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader: StreamReader) -> HttpRequest:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+            raise _BadRequest(400, "malformed request line")
+        method, target, _ = parts
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise _BadRequest(400, "malformed header")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _BadRequest(400, "bad content-length") from None
+        if length < 0:
+            raise _BadRequest(400, "bad content-length")
+        if length > self._max_body:
+            raise _BadRequest(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        path = target.split("?", 1)[0]
+        return HttpRequest(
+            method=method.upper(), path=path, headers=headers, body=body
+        )
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+def _encode(response: HttpResponse) -> bytes:
+    try:
+        phrase = HTTPStatus(response.status).phrase
+    except ValueError:
+        phrase = ""
+    head = (
+        "HTTP/1.1 %d %s\r\n"
+        "Content-Type: %s\r\n"
+        "Content-Length: %d\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+        % (
+            response.status,
+            phrase,
+            response.content_type,
+            len(response.body),
+        )
+    )
+    return head.encode("latin-1") + response.body
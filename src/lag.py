@@ -0,0 +1,87 @@
+"""Gate-to-chat lag: how long after someone opened the gate did we notice
+it, and how long until each channel confirmed the notification.
+
+Both are measured from the entry's own ``time`` (the gate's event clock)
+to a wall-clock moment on this host, so clock skew between the two shows
+up as a constant offset; negative values are clamped to zero.
+"""
+
+from dataclasses import dataclass
+from time import time
+from typing import Callable, Iterable
+
+from metrics import RollingQuantiles, summary
+
+# "fetched": the poll that first saw an entry as new for a channel;
+# "delivered": the channel confirmed the message carrying it.
+FETCHED = "fetched"
+DELIVERED = "delivered"
+
+ENTRY_LAG = summary(
+    "palgate_entry_lag_seconds",
+    "Seconds from a gate event to its fetch or confirmed delivery",
+    ("stage", "channel"),
+)
+
+
+@dataclass(frozen=True)
+class LagStats:
+    stage: str
+    channel: str
+    samples: int
+    p50: float
+    p95: float
+    p99: float
+
+
+class LagTracker:
+    """Rolling p50/p95/p99 per (stage, channel) for one watcher.
+
+    Mirrors every observation into the shared ``ENTRY_LAG`` summary; the
+    tracker's own sketches back ``/status`` so it reports this watcher only.
+    """
+
+    def __init__(
+        self, window: float = 3600, clock: Callable[[], float] = time
+    ) -> None:
+        self._window = window
+        self._clock = clock
+        self._sketches: dict[tuple[str, str], RollingQuantiles] = {}
+
+    def now(self) -> float:
+        return self._clock()
+
+    def observe(
+        self,
+        stage: str,
+        channel: str,
+        event_times: Iterable[float | None],
+        at: float | None = None,
+    ) -> None:
+        """Record one sample per event; entries without a time are skipped."""
+        now = self.now() if at is None else at
+        key = (stage, channel)
+        for event_time in event_times:
+            if not event_time:
+                continue
+            lag = max(0.0, now - float(event_time))
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = RollingQuantiles(self._window, clock=self._clock)
+                self._sketches[key] = sketch
+            sketch.add(lag)
+            ENTRY_LAG.observe(lag, stage=stage, channel=channel)
+
+    def stats(self) -> tuple[LagStats, ...]:
+        """Current quantiles, fetch stage first, channels in first-seen order."""
+        result = []
+        for (stage, channel), sketch in sorted(
+            self._sketches.items(), key=lambda pair: pair[0][0] != FETCHED
+        ):
+            p50, p95, p99 = (sketch.quantile(q) for q in (0.5, 0.95, 0.99))
+            if p50 is None or p95 is None or p99 is None:
+                continue
+            result.append(
+                LagStats(stage, channel, len(sketch), p50, p95, p99)
+            )
+        return tuple(result)
@@ -0,0 +1,164 @@
+"""Event loop stall detection.
+
+The watcher, the bot, the enricher, the aiologging bridge and Telethon all
+share one event loop, so any synchronous stretch — an fsync on a slow
+volume, a big JSON parse — delays every one of them. ``LoopMonitor``
+measures how late its own timer fires (the loop's scheduling lag) and, from
+a watchdog thread, samples the loop thread's stack while a stall is still
+in progress, so the report names the code that held the loop rather than
+whatever happened to run after it.
+"""
+
+from asyncio import Event, create_task, gather, wait
+from dataclasses import dataclass
+from inspect import CO_COROUTINE
+from logging import getLogger
+from pathlib import Path
+from sys import _current_frames
+from threading import Event as ThreadEvent, Lock, Thread, get_ident
+from time import monotonic
+from types import FrameType
+from typing import Callable
+
+from metrics import counter, histogram
+
+LOOP_LAG = histogram(
+    "palgate_loop_lag_seconds",
+    "How late the loop monitor's timer fired: event loop scheduling lag",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_STALLS = counter(
+    "palgate_loop_stalls_total",
+    "Event loop stalls longer than the configured threshold",
+)
+
+
+@dataclass(frozen=True)
+class Stall:
+    seconds: float
+    # "Task root coroutine → innermost frame", or None when the watchdog
+    # did not catch the stall in progress (it was shorter than its tick).
+    where: str | None
+
+
+class LoopMonitor:
+    """Reports event loop stalls longer than ``threshold`` seconds.
+
+    Every stall is counted and logged locally; the ops chat gets at most
+    one report per ``report_every`` seconds, so a persistently slow volume
+    does not flood it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        interval: float = 0.5,
+        report_every: float = 300,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._threshold = threshold
+        self._interval = interval
+        self._report_every = report_every
+        self._clock = clock
+        self._beat = clock()
+        self._loop_thread: int | None = None
+        self._lock = Lock()
+        self._sampled: tuple[float, str] | None = None
+        self._last_report: float | None = None
+        self._last_stall: Stall | None = None
+        self._log = getLogger("log")
+        self._local = getLogger("default")
+
+    @property
+    def last_stall(self) -> Stall | None:
+        return self._last_stall
+
+    async def run(self, stop: Event) -> None:
+        self._loop_thread = get_ident()
+        halt = ThreadEvent()
+        watchdog = Thread(
+            target=self._watch, args=(halt,), name="loop-watchdog", daemon=True
+        )
+        watchdog.start()
+        try:
+            while not stop.is_set():
+                self._beat = start = self._clock()
+                if await self._stopped_within(stop, self._interval):
+                    break
+                lag = max(0.0, self._clock() - start - self._interval)
+                LOOP_LAG.observe(lag)
+                if lag >= self._threshold:
+                    self._report(lag, start)
+        finally:
+            halt.set()
+
+    async def _stopped_within(self, stop: Event, delay: float) -> bool:
+        stop_task = create_task(stop.wait())
+        await wait((stop_task,), timeout=delay)
+        stop_task.cancel()
+        await gather(stop_task, return_exceptions=True)
+        return stop.is_set()
+
+    def _watch(self, halt: ThreadEvent) -> None:
+        # Sample once per stall, as soon as it crosses the threshold: that
+        # is when the offending code is on the stack.
+        while not halt.wait(self._threshold / 2):
+            beat = self._beat
+            if self._clock() - beat < self._interval + self._threshold:
+                continue
+            with self._lock:
+                if self._sampled is not None and self._sampled[0] == beat:
+                    continue
+            frame = _current_frames().get(self._loop_thread or 0)
+            if frame is None:
+                continue
+            where = describe_stack(frame)
+            with self._lock:
+                self._sampled = (beat, where)
+
+    def _report(self, lag: float, beat: float) -> None:
+        with self._lock:
+            sampled = self._sampled
+        where = None
+        if sampled is not None and sampled[0] == beat:
+            where = sampled[1]
+        stall = Stall(lag, where)
+        self._last_stall = stall
+        LOOP_STALLS.inc()
+        message = "Event loop stalled for %.2fs%s" % (
+            lag,
+            " in %s" % where if where is not None else "",
+        )
+        now = self._clock()
+        if (
+            self._last_report is None
+            or now - self._last_report >= self._report_every
+        ):
+            self._last_report = now
+            self._log.warning(message)
+        else:
+            self._local.warning(message)
+
+
+def describe_stack(frame: FrameType) -> str:
+    """Name a stack as ``root coroutine → innermost frame (file:line)``."""
+    frames = []
+    current: FrameType | None = frame
+    while current is not None:
+        frames.append(current)
+        current = current.f_back
+    innermost = frames[0]
+    location = "%s (%s:%d)" % (
+        innermost.f_code.co_qualname,
+        Path(innermost.f_code.co_filename).name,
+        innermost.f_lineno,
+    )
+    # The outermost coroutine frame is the task's root — the component
+    # that scheduled the blocking work.
+    root = next(
+        (f for f in reversed(frames) if f.f_code.co_flags & CO_COROUTINE),
+        None,
+    )
+    if root is None or root is innermost:
+        return location
+    return "%s → %s" % (root.f_code.co_qualname, location)
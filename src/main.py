@@ -1,27 +1,49 @@
+from argparse import ArgumentParser, Namespace
+from atexit import register as atexit_register
 from asyncio import Event, gather, get_running_loop, run as asyncio_run
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from importlib.metadata import PackageNotFoundError, version
+from json import dumps as json_dumps
 from tomllib import TOMLDecodeError, load as toml_load
-from logging import DEBUG, Filter, Formatter, LogRecord, getLogger
+from logging import (
+    DEBUG,
+    Filter,
+    Formatter,
+    LogRecord,
+    getHandlerByName,
+    getLogger,
+)
 from logging.config import dictConfig
+from logging.handlers import QueueHandler
+from os import sysconf
 from pathlib import Path
-from signal import SIGINT, SIGTERM, Signals
-from typing import Any
+from signal import SIGHUP, SIGINT, SIGTERM, Signals
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Mapping
 
 from aiologging import (
-    AsyncTelegramHandler,
     TelegramHtmlFormatter,
     getLogger as aio_get_logger,
     shutdown as aio_shutdown,
 )
 from httpx import AsyncClient
 
-from bot import OpsBot
-from config import Settings
+from bot import OpsBot, WebhookConfig
+from breaker import CircuitBreaker
+from config import Settings, load_settings
+from disk_io import DISK
 from enrich import Enricher
 from github_client import GithubClient
+from loop_monitor import LoopMonitor
+from metrics import MetricsEndpoint
 from notify import MaxNotifier, Notifier, TelegramNotifier
-from palgate import PalgateClient
+from ops_log import CoalescingTelegramHandler
+from outbox import FileOutbox
+from palgate import PalgateClient, PalgateError, TokenProvider
+from parsing import LogParser
+from recording import CaptureWriter
+from reload import SettingsReloader
 from resolver import (
     CachingResolver,
     FileResolverStore,
@@ -30,8 +52,9 @@ from resolver import (
 )
 from service import GateWatcher
 from state import FileStateStore
-from telegram_resolver import TelegramContactResolver
-from telethon.sessions import StringSession
+
+if TYPE_CHECKING:
+    from telegram_resolver import TelegramContactResolver
 
 
 class RolePrefixFilter(Filter):
@@ -51,16 +74,40 @@ class RolePrefixFilter(Filter):
         return True
 
 
-def build_logging_config(role: str = "prod") -> dict[str, Any]:
-    # stdout and the rotating file stay on stdlib handlers; only "log"
-    # records cross into aiologging (via the bridge), where the ops-chat
-    # HTTP delivery runs off the event loop thread.
+class JsonLinesFormatter(Formatter):
+    """One JSON object per record, for log shippers.
+
+    Records reach it through the queue: ``QueueHandler.prepare`` has folded
+    any traceback into the message and cleared ``exc_info``, so every
+    record is exactly one line.
+    """
+
+    def format(self, record: LogRecord) -> str:
+        document = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        return json_dumps(document, ensure_ascii=False)
+
+
+def build_logging_config(
+    role: str = "prod", log_format: str = "text"
+) -> dict[str, Any]:
+    # stdout and the rotating file sit behind a QueueHandler: the loop
+    # thread only enqueues, and a listener thread does the writes and the
+    # rollover renames. "log" records also cross into aiologging (via the
+    # bridge), where the ops-chat HTTP delivery runs off the loop thread.
     config: dict[str, Any] = {
         "version": 1,
         "formatters": {
             "default": {
                 "format": "[%(levelname)s][%(asctime)s] %(name)s: %(message)s",
             },
+            "json": {"()": JsonLinesFormatter},
         },
         "handlers": {
             "log": {
@@ -68,19 +115,24 @@ def build_logging_config(role: str = "prod") -> dict[str, Any]:
             },
             "stdout": {
                 "class": "logging.StreamHandler",
-                "formatter": "default",
+                "formatter": "json" if log_format == "json" else "default",
             },
             "file": {
                 "class": "logging.handlers.RotatingFileHandler",
                 "filename": "palgate.log",
                 "maxBytes": 5_000_000,
                 "backupCount": 3,
-                "formatter": "default",
+                "formatter": "json" if log_format == "json" else "default",
+            },
+            "queue": {
+                "class": "logging.handlers.QueueHandler",
+                "handlers": ["stdout", "file"],
+                "respect_handler_level": True,
             },
         },
         "loggers": {
-            "default": {"handlers": ["stdout", "file"], "level": "DEBUG"},
-            "log": {"handlers": ["log", "stdout", "file"], "level": "DEBUG"},
+            "default": {"handlers": ["queue"], "level": "DEBUG"},
+            "log": {"handlers": ["log", "queue"], "level": "DEBUG"},
         },
     }
     if role != "prod":
@@ -91,8 +143,11 @@ def build_logging_config(role: str = "prod") -> dict[str, Any]:
     return config
 
 
-def build_telegram_log_handler(settings: Settings) -> AsyncTelegramHandler:
-    return AsyncTelegramHandler(
+def build_telegram_log_handler(
+    settings: Settings,
+) -> CoalescingTelegramHandler:
+    return CoalescingTelegramHandler(
+        window=settings.LOG_CHAT_WINDOW,
         token=settings.TELEGRAM_API_TOKEN,
         chat_id=settings.TELEGRAM_LOG_CHAT_ID,
         parse_mode="HTML",
@@ -103,34 +158,72 @@ def build_telegram_log_handler(settings: Settings) -> AsyncTelegramHandler:
 
 
 def configure_logging(settings: Settings) -> None:
-    dictConfig(build_logging_config(settings.SERVICE_ROLE))
+    dictConfig(
+        build_logging_config(settings.SERVICE_ROLE, settings.LOG_FORMAT)
+    )
+    queue = getHandlerByName("queue")
+    if isinstance(queue, QueueHandler) and queue.listener is not None:
+        queue.listener.start()
+        # Stopping drains the queue, so the last records reach the file.
+        atexit_register(queue.listener.stop)
     telegram_log = aio_get_logger("log")
     telegram_log.setLevel(DEBUG)
     telegram_log.addHandler(build_telegram_log_handler(settings))
 
 
-def build_client(settings: Settings, http: AsyncClient) -> PalgateClient:
+def build_breakers(settings: Settings) -> dict[str, CircuitBreaker]:
+    """One breaker per endpoint, shared by every caller of it."""
+    return {
+        endpoint: CircuitBreaker(
+            endpoint,
+            failures=settings.CIRCUIT_FAILURES,
+            cooldown=settings.CIRCUIT_COOLDOWN,
+        )
+        for endpoint in ("palgate", "telegram", "max")
+    }
+
+
+def build_client(
+    settings: Settings,
+    http: AsyncClient,
+    breakers: Mapping[str, CircuitBreaker] | None = None,
+) -> PalgateClient:
     return PalgateClient(
         http=http,
         url=settings.URL_USER_LOG.format(device_id=settings.DEVICE_ID),
         session_token=settings.session_token_bytes,
         user_id=settings.USER_ID,
         token_type=settings.SESSION_TOKEN_TYPE,
+        tokens=TokenProvider(
+            settings.session_token_bytes,
+            settings.USER_ID,
+            settings.SESSION_TOKEN_TYPE,
+            slot=settings.PALGATE_TOKEN_SLOT,
+        ),
+        parser=LogParser(
+            settings.PALGATE_PARSE_WORKERS, settings.PALGATE_PARSE_THRESHOLD
+        ),
+        recorder=(
+            CaptureWriter(Path(settings.PALGATE_CAPTURE_FILE))
+            if settings.PALGATE_CAPTURE_FILE
+            else None
+        ),
+        breaker=breakers.get("palgate") if breakers is not None else None,
     )
 
 
-def build_watcher(
+def build_notifiers(
     settings: Settings,
     http: AsyncClient,
-    store: FileStateStore,
-    client: PalgateClient,
-    enricher: Enricher | None = None,
-) -> GateWatcher:
+    breakers: Mapping[str, CircuitBreaker] | None = None,
+) -> tuple[Notifier, ...]:
+    breakers = breakers if breakers is not None else {}
     notifiers: tuple[Notifier, ...] = (
         TelegramNotifier(
             http=http,
             token=settings.TELEGRAM_API_TOKEN,
             chat_id=settings.TELEGRAM_CHAT_ID,
+            breaker=breakers.get("telegram"),
         ),
     )
     if settings.MAX_API_TOKEN:
@@ -139,24 +232,56 @@ def build_watcher(
                 http=http,
                 token=settings.MAX_API_TOKEN,
                 chat_id=settings.MAX_CHAT_ID,
+                breaker=breakers.get("max"),
             ),
         )
+    return notifiers
+
+
+def build_watcher(
+    settings: Settings,
+    http: AsyncClient,
+    store: FileStateStore,
+    client: PalgateClient,
+    enricher: Enricher | None = None,
+    outbox: FileOutbox | None = None,
+    breakers: Mapping[str, CircuitBreaker] | None = None,
+) -> GateWatcher:
     return GateWatcher(
         source=settings.DEVICE_ID,
         client=client,
         store=store,
-        notifiers=notifiers,
+        notifiers=build_notifiers(settings, http, breakers),
         cron_delay=settings.CRON_DELAY,
         max_backoff=settings.MAX_BACKOFF,
         alert_after=settings.ALERT_AFTER_FAILURES,
         heartbeat_path=Path(settings.HEARTBEAT_FILE),
         enricher=enricher,
+        outbox=outbox,
     )
 
 
+def build_outbox(settings: Settings) -> FileOutbox | None:
+    if not settings.OUTBOX_ENABLED:
+        return None
+    return FileOutbox(Path(settings.OUTBOX_FILE))
+
+
+def build_metrics_endpoint(settings: Settings) -> MetricsEndpoint | None:
+    if not settings.METRICS_PORT:
+        return None
+    return MetricsEndpoint(settings.METRICS_HOST, settings.METRICS_PORT)
+
+
+def build_loop_monitor(settings: Settings) -> LoopMonitor | None:
+    if not settings.LOOP_STALL_THRESHOLD:
+        return None
+    return LoopMonitor(threshold=settings.LOOP_STALL_THRESHOLD)
+
+
 def build_enrichment(
     settings: Settings,
-) -> tuple[Enricher, TelegramContactResolver] | None:
+) -> "tuple[Enricher, TelegramContactResolver] | None":
     """Wire the Telegram identity enricher, or None when it stays off.
 
     Returns the enricher and the underlying Telethon adapter (whose session
@@ -171,6 +296,11 @@ def build_enrichment(
             "enrichment disabled"
         )
         return None
+    # Telethon alone is a third of the service's import time; only pay it
+    # when enrichment is actually on.
+    from telegram_resolver import TelegramContactResolver
+    from telethon.sessions import StringSession
+
     # A StringSession blob (TG_SESSION_STRING) beats the on-disk session file,
     # so a headless server can carry the whole session in its env file.
     session: str | StringSession = (
@@ -207,13 +337,21 @@ def build_bot(
     client: PalgateClient,
     store: FileStateStore,
     enricher: Enricher | None = None,
+    reloader: SettingsReloader | None = None,
+    breakers: Mapping[str, CircuitBreaker] | None = None,
 ) -> OpsBot:
+    # Same bot, same endpoint: replies share the gate notifications'
+    # breaker.
+    telegram_breaker = (
+        breakers.get("telegram") if breakers is not None else None
+    )
     # Replies ride the same delivery channel implementation as the gate
     # notifications, just bound to the ops chat.
     replier = TelegramNotifier(
         http=http,
         token=settings.TELEGRAM_API_TOKEN,
         chat_id=settings.TELEGRAM_LOG_CHAT_ID,
+        breaker=telegram_breaker,
     )
     github = (
         GithubClient(
@@ -231,6 +369,7 @@ def build_bot(
             http=http,
             token=settings.TELEGRAM_API_TOKEN,
             chat_id=settings.PRESTABLE_TELEGRAM_CHAT_ID,
+            breaker=telegram_breaker,
         )
         if settings.PRESTABLE_TELEGRAM_CHAT_ID
         else None
@@ -248,6 +387,17 @@ def build_bot(
         github=github,
         mock_notifier=mock_notifier,
         resolver=enricher.resolver if enricher is not None else None,
+        reloader=reloader,
+        webhook=(
+            WebhookConfig(
+                url=settings.BOT_WEBHOOK_URL,
+                secret=settings.BOT_WEBHOOK_SECRET,
+                host=settings.BOT_WEBHOOK_HOST,
+                port=settings.BOT_WEBHOOK_PORT,
+            )
+            if settings.BOT_WEBHOOK_URL
+            else None
+        ),
     )
 
 
@@ -309,12 +459,131 @@ def version_transition(previous: str | None, current: str) -> str | None:
     return "Updated %s → %s" % (previous, current)
 
 
-async def main() -> None:
-    settings = Settings()
+class StartupReport:
+    """Wall time of each startup phase, for ``--startup-report``.
+
+    Deploy swaps wait on the new instance's startup, so the phases are
+    measured in every run; ``mark`` closes the phase that just ended.
+    """
+
+    def __init__(self, clock: Callable[[], float] = perf_counter) -> None:
+        self._clock = clock
+        self._last = clock()
+        self.phases: list[tuple[str, float]] = []
+        # Interpreter start plus every import, up to main(); None where
+        # /proc is unavailable.
+        started = process_uptime()
+        if started is not None:
+            self.phases.append(("interpreter + imports", started))
+
+    def mark(self, phase: str) -> None:
+        now = self._clock()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def format(self) -> str:
+        lines = [
+            "%-24s %8.3f s" % (phase, seconds)
+            for phase, seconds in self.phases
+        ]
+        lines.append(
+            "%-24s %8.3f s"
+            % ("total", sum(seconds for _, seconds in self.phases))
+        )
+        return "\n".join(lines)
+
+
+def process_uptime() -> float | None:
+    """Seconds since this process started (Linux only)."""
+    try:
+        with open("/proc/self/stat") as fp:
+            # starttime is field 22; the command name in field 2 may
+            # contain spaces, so count from its closing parenthesis.
+            ticks = int(fp.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as fp:
+            uptime = float(fp.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - ticks / sysconf("SC_CLK_TCK")
+
+
+async def report_first_fetch(
+    client: PalgateClient, report: StartupReport
+) -> None:
+    """Time a first fetch, parse included, and print the report.
+
+    Fetch only: a whole poll cycle would deliver to the live channels,
+    move their markers and journal messages no worker here ever sends.
+    """
+    try:
+        await client.fetch_log()
+    except PalgateError:
+        report.mark("first fetch (failed)")
+    else:
+        report.mark("first fetch")
+    print(report.format())
+
+
+def parse_args(argv: list[str] | None = None) -> Namespace:
+    parser = ArgumentParser(description="Palgate log notifier")
+    parser.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="start up, fetch once, print the time each phase took and exit",
+    )
+    return parser.parse_args(argv)
+
+
+def start_service(
+    settings: Settings,
+    stop: Event,
+    watcher: GateWatcher,
+    client: PalgateClient,
+    bot: OpsBot | None,
+    enricher: Enricher | None,
+) -> list[Coroutine[Any, Any, None]]:
+    """Announce the start and return the long-running service loops."""
+    log = getLogger("log")
+    current_version = service_version()
+    log.info(
+        "Started palgate-tg-notify %s, watching %s"
+        % (current_version, settings.DEVICE_ID)
+    )
+    if enricher is not None:
+        log.info("Telegram identity enrichment enabled")
+    version_path = Path(settings.VERSION_FILE)
+    notice = version_transition(
+        read_stored_version(version_path), current_version
+    )
+    if notice is not None:
+        log.info(notice)
+    # Persist after announcing: a crash in between repeats the
+    # notice on the next boot instead of losing it.
+    store_version(version_path, current_version)
+    tasks = [watcher.run(stop), client.tokens.run(stop)]
+    tasks.extend(worker.run(stop) for worker in watcher.workers)
+    if bot is not None:
+        tasks.append(bot.run(stop))
+    if enricher is not None:
+        tasks.append(enricher.run(stop))
+    loop_monitor = build_loop_monitor(settings)
+    if loop_monitor is not None:
+        tasks.append(loop_monitor.run(stop))
+    metrics_endpoint = build_metrics_endpoint(settings)
+    if metrics_endpoint is not None:
+        tasks.append(metrics_endpoint.run(stop))
+    return tasks
+
+
+async def main(startup_report: bool = False) -> None:
+    report = StartupReport()
+    settings = load_settings()
+    report.mark("settings")
 
     configure_logging(settings)
     tz = timezone(timedelta(hours=settings.TZ))
     Formatter.converter = lambda *args: datetime.now(tz).timetuple()
+    report.mark("logging")
     # Lifecycle events go to the "log" logger — i.e. the ops Telegram chat.
     log = getLogger("log")
 
@@ -333,10 +602,13 @@ async def main() -> None:
         # holding the state (e.g. the old instance during a deploy swap).
         store = FileStateStore(Path(settings.STATE_FILE))
         store.acquire_lock(settings.LOCK_TIMEOUT)
+        report.mark("state lock")
         try:
             async with AsyncClient() as http:
-                client = build_client(settings, http)
+                breakers = build_breakers(settings)
+                client = build_client(settings, http, breakers)
                 enrichment = build_enrichment(settings)
+                report.mark("http client + wiring")
                 enricher = None
                 adapter = None
                 if enrichment is not None:
@@ -346,44 +618,62 @@ async def main() -> None:
                         # service — run without enrichment.
                         enricher = None
                         adapter = None
-                watcher = build_watcher(settings, http, store, client, enricher)
+                    report.mark("telethon connect")
+                watcher = build_watcher(
+                    settings,
+                    http,
+                    store,
+                    client,
+                    enricher,
+                    build_outbox(settings),
+                    breakers,
+                )
+                reloader = SettingsReloader(
+                    settings,
+                    watcher,
+                    partial(build_notifiers, http=http, breakers=breakers),
+                    enricher,
+                    load=load_settings,
+                )
+
+                def reload_settings() -> None:
+                    log.info(reloader.reload().describe())
+
+                loop.add_signal_handler(SIGHUP, reload_settings)
                 # Only prod serves ops commands: a second getUpdates
                 # consumer on the same bot token would 409-conflict the
                 # prod instance's long poll.
                 bot = (
                     build_bot(
-                        settings, http, watcher, client, store, enricher
+                        settings,
+                        http,
+                        watcher,
+                        client,
+                        store,
+                        enricher,
+                        reloader,
+                        breakers,
                     )
                     if settings.SERVICE_ROLE == "prod"
                     else None
                 )
-                current_version = service_version()
-                log.info(
-                    "Started palgate-tg-notify %s, watching %s"
-                    % (current_version, settings.DEVICE_ID)
-                )
-                if enricher is not None:
-                    log.info("Telegram identity enrichment enabled")
-                version_path = Path(settings.VERSION_FILE)
-                notice = version_transition(
-                    read_stored_version(version_path), current_version
-                )
-                if notice is not None:
-                    log.info(notice)
-                # Persist after announcing: a crash in between repeats the
-                # notice on the next boot instead of losing it.
-                store_version(version_path, current_version)
-                tasks = [watcher.run(stop)]
-                if bot is not None:
-                    tasks.append(bot.run(stop))
-                if enricher is not None:
-                    tasks.append(enricher.run(stop))
+                if startup_report:
+                    # A measuring run: no announcements, no loops.
+                    tasks = [report_first_fetch(client, report)]
+                else:
+                    tasks = start_service(
+                        settings, stop, watcher, client, bot, enricher
+                    )
                 try:
                     await gather(*tasks)
                 finally:
+                    client.close()
                     if adapter is not None:
                         await adapter.disconnect()
         finally:
+            # Let queued writes (resolver snapshots) land while this
+            # instance still holds the lock.
+            await DISK.drain()
             store.release_lock()
         log.info("Shut down cleanly")
     except Exception:
@@ -396,4 +686,4 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio_run(main())
+    asyncio_run(main(startup_report=parse_args().startup_report))
@@ -0,0 +1,469 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges, histograms and rolling-quantile summaries live in a
+``Registry``; the modules that own a code path declare theirs at import
+time on the default ``REGISTRY`` (the way they fetch a named logger) and
+update them inline. Nothing here talks to the network except
+``MetricsEndpoint``, which serves the registry on a local port when
+``METRICS_PORT`` is set.
+"""
+
+from abc import ABC, abstractmethod
+from asyncio import Event
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from math import ceil, inf, isinf
+from threading import Lock
+from time import monotonic, perf_counter
+from typing import Callable, Sequence
+
+from http_server import HttpRequest, HttpResponse, LocalHttpServer
+
+# Seconds; spans a sub-10ms Bot API call up to a fully retried poll.
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+LabelKey = tuple[str, ...]
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labels):
+            raise ValueError(
+                "%s expects labels %s, got %s"
+                % (self.name, list(self.labels), sorted(labels))
+            )
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _series(self, key: LabelKey, extra: str = "") -> str:
+        pairs = [
+            '%s="%s"' % (name, _escape(value))
+            for name, value in zip(self.labels, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{%s}" % ",".join(pairs) if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> list[str]: ...
+
+    def expose(self) -> list[str]:
+        return [
+            "# HELP %s %s" % (self.name, self.help.replace("\n", " ")),
+            "# TYPE %s %s" % (self.name, self.kind),
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    """A value that only goes up, one series per label combination."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("a counter cannot go down")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            "%s%s %s" % (self.name, self._series(key), _number(value))
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """A value that goes both ways; may be sampled from a callback."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[LabelKey, float] = {}
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the (unlabelled) value from ``function`` at scrape time."""
+        if self.labels:
+            raise ValueError("%s has labels; set them explicitly" % self.name)
+        self._function = function
+
+    def value(self, **labels: str) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        if self._function is not None:
+            return ["%s %s" % (self.name, _number(self.value()))]
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            "%s%s %s" % (self.name, self._series(key), _number(value))
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative ``le`` buckets, plus sum/count."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (inf,)
+        self._counts: dict[LabelKey, list[int]] = {}
+        self._sums: dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block, even if it raises."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels: str) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            series = sorted(
+                (key, list(counts), self._sums[key])
+                for key, counts in self._counts.items()
+            )
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    "%s_bucket%s %d"
+                    % (
+                        self.name,
+                        self._series(key, 'le="%s"' % _number(bound)),
+                        cumulative,
+                    )
+                )
+            lines.append(
+                "%s_sum%s %s" % (self.name, self._series(key), _number(total))
+            )
+            lines.append(
+                "%s_count%s %d" % (self.name, self._series(key), cumulative)
+            )
+        return lines
+
+
+class RollingQuantiles:
+    """Quantiles over the observations of the last ``window`` seconds.
+
+    Keeps the raw samples, at most ``max_samples`` of them (oldest dropped
+    first), and sorts on read: exact for the gate's volume — a handful of
+    entries a minute — and cheap enough at scrape and /status rates.
+    """
+
+    def __init__(
+        self,
+        window: float = 3600,
+        max_samples: int = 2048,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self._window = window
+        self._clock = clock
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+
+    def add(self, value: float) -> None:
+        self._samples.append((self._clock(), value))
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float | None:
+        """Nearest-rank quantile, or None without samples in the window."""
+        self._expire()
+        if not self._samples:
+            return None
+        values = sorted(value for _, value in self._samples)
+        rank = min(len(values), max(1, ceil(q * len(values))))
+        return values[rank - 1]
+
+    def _expire(self) -> None:
+        deadline = self._clock() - self._window
+        while self._samples and self._samples[0][0] < deadline:
+            self._samples.popleft()
+
+
+class Summary(_Metric):
+    """Rolling-window quantiles plus all-time sum/count per label set."""
+
+    kind = "summary"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        window: float = 3600,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.quantiles = tuple(quantiles)
+        self._window = window
+        self._sketches: dict[LabelKey, RollingQuantiles] = {}
+        self._counts: dict[LabelKey, int] = {}
+        self._sums: dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = RollingQuantiles(self._window)
+            sketch.add(value)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def quantile(self, q: float, **labels: str) -> float | None:
+        sketch = self._sketches.get(self._key(labels))
+        return sketch.quantile(q) if sketch is not None else None
+
+    def count(self, **labels: str) -> int:
+        return self._counts.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            keys = sorted(self._sketches)
+        lines = []
+        for key in keys:
+            sketch = self._sketches[key]
+            for q in self.quantiles:
+                value = sketch.quantile(q)
+                if value is None:
+                    continue
+                lines.append(
+                    "%s%s %s"
+                    % (
+                        self.name,
+                        self._series(key, 'quantile="%s"' % _number(q)),
+                        _number(value),
+                    )
+                )
+            lines.append(
+                "%s_sum%s %s"
+                % (self.name, self._series(key), _number(self._sums[key]))
+            )
+            lines.append(
+                "%s_count%s %d"
+                % (self.name, self._series(key), self._counts[key])
+            )
+        return lines
+
+
+class Registry:
+    """Named metrics; asking twice for the same name returns the same one."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(
+        self, name: str, help: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(
+        self, name: str, help: str, labels: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        existing = self._metrics.get(name)
+        if existing is None:
+            histogram = Histogram(name, help, labels, buckets)
+            self._metrics[name] = histogram
+            return histogram
+        return self._check(existing, Histogram, labels)
+
+    def summary(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    ) -> Summary:
+        existing = self._metrics.get(name)
+        if existing is None:
+            summary = Summary(name, help, labels, quantiles)
+            self._metrics[name] = summary
+            return summary
+        return self._check(existing, Summary, labels)
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        lines: list[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].expose())
+        return "\n".join(lines) + "\n"
+
+    def _register[M: _Metric](
+        self, kind: type[M], name: str, help: str, labels: Sequence[str]
+    ) -> M:
+        existing = self._metrics.get(name)
+        if existing is None:
+            metric = kind(name, help, labels)
+            self._metrics[name] = metric
+            return metric
+        return self._check(existing, kind, labels)
+
+    @staticmethod
+    def _check[M: _Metric](
+        existing: _Metric, kind: type[M], labels: Sequence[str]
+    ) -> M:
+        if not isinstance(existing, kind) or existing.labels != tuple(labels):
+            raise ValueError(
+                "metric %s is already registered differently" % existing.name
+            )
+        return existing
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.counter(name, help, labels)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.gauge(name, help, labels)
+
+
+def histogram(
+    name: str,
+    help: str,
+    labels: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.histogram(name, help, labels, buckets)
+
+
+def summary(
+    name: str,
+    help: str,
+    labels: Sequence[str] = (),
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+) -> Summary:
+    return REGISTRY.summary(name, help, labels, quantiles)
+
+
+class MetricsEndpoint:
+    """Serves ``GET /metrics`` from ``registry`` until stopped."""
+
+    def __init__(
+        self, host: str, port: int, registry: Registry = REGISTRY
+    ) -> None:
+        self._registry = registry
+        self._server = LocalHttpServer(self.handle, host, port)
+
+    @property
+    def port(self) -> int:
+        return self._server.port
+
+    async def run(self, stop: Event) -> None:
+        await self._server.start()
+        try:
+            await stop.wait()
+        finally:
+            await self._server.close()
+
+    async def handle(self, request: HttpRequest) -> HttpResponse:
+        if request.path != "/metrics":
+            return HttpResponse(404, b"not found")
+        if request.method != "GET":
+            return HttpResponse(405, b"method not allowed")
+        return HttpResponse(
+            200, self._registry.expose().encode(), content_type=CONTENT_TYPE
+        )
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def _number(value: float) -> str:
+    if isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
@@ -1,75 +1,267 @@
-from typing import Self
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Callable, Self, cast, overload
 
-from pydantic import model_validator, field_validator
+from pydantic import (
+    GetCoreSchemaHandler,
+    TypeAdapter,
+    ValidationError,
+    model_validator,
+    field_validator,
+)
+from pydantic_core import CoreSchema, core_schema
 
 from log_item_model import LogItem as _LogItem, LogItemType, LogItemResponse
 
 
 LogItem = _LogItem
 
+# One pydantic call per batch: validating entries one model_validate at a
+# time costs about half as much again as a list for a full page.
+_validate_entries = TypeAdapter(list[_LogItem]).validate_python
 
-class Item(_LogItem):
-    @staticmethod
-    def from_log_item(log_item: _LogItem) -> "Item":
-        return Item(**log_item.model_dump())
+
+# Entries validated in small batches before a read is taken to be a full
+# one; a poll rarely finds more new entries than this.
+_HEAD = 8
+
+
+class LazyLog(Sequence[_LogItem]):
+    """Log entries validated on first access.
+
+    The gate log comes newest-first and a poll only reads down to the
+    marker, so the entries below it — usually nearly the whole page — are
+    never validated. A malformed entry raises ``ValidationError`` when it is
+    read, not when the response is parsed. ``build`` turns a run of raw
+    entries into ``LogItem``s.
+
+    Entries are validated in batches that double as a read goes deeper —
+    the first ones one by one, then as many as were validated so far — up
+    to ``_HEAD`` entries. A read that goes past them validates the rest of
+    the page in one call, and iteration hands out validated runs whole, so
+    a full read costs what validating the list at once does.
+    """
+
+    def __init__(
+        self,
+        raw: list[Any],
+        build: Callable[[list[Any]], list[_LogItem]] = _validate_entries,
+    ) -> None:
+        self._raw = raw
+        self._build = build
+        self._items: list[_LogItem | None] = [None] * len(raw)
+        # 1 per validated entry: finding the end of a batch is a C scan.
+        self._done = bytearray(len(raw))
+        self._validated = 0
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            cls,
+            core_schema.list_schema(),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda log: [item.model_dump() for item in log]
+            ),
+        )
 
     @property
-    def pn(self) -> str:
-        result: str | None = (
-            self.sn
-            if (self.sn is not None and self.sn != "") or self.userId is None or self.userId == "0"
-            else self.userId
+    def validated(self) -> int:
+        return self._validated
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    @overload
+    def __getitem__(self, index: int) -> _LogItem: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_LogItem]: ...
+
+    def __getitem__(self, index: int | slice) -> _LogItem | list[_LogItem]:
+        if isinstance(index, slice):
+            return [self._item(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("log index out of range")
+        return self._item(index)
+
+    def __iter__(self) -> Iterator[_LogItem]:
+        # Chained a validated run at a time: a full read takes no Python
+        # step per entry.
+        return chain.from_iterable(self._runs())
+
+    def _runs(self) -> Iterator[list[_LogItem]]:
+        index, size = 0, len(self._raw)
+        while index < size:
+            if self._items[index] is None:
+                end = self._validate_from(index)
+            elif self._validated == size:
+                end = size
+            else:
+                end = index + 1
+            yield cast(list[_LogItem], self._items[index:end])
+            index = end
+
+    def _item(self, index: int) -> _LogItem:
+        item = self._items[index]
+        if item is None:
+            self._validate_from(index)
+            item = self._items[index]
+            assert item is not None
+        return item
+
+    def _validate_from(self, index: int) -> int:
+        stop = (
+            index + max(1, self._validated)
+            if self._validated < _HEAD
+            else len(self._raw)
         )
-        if result is None:
-            raise ValueError("Phone numer field is None")
+        stop = min(len(self._raw), stop)
+        end = self._done.find(1, index + 1, stop)
+        if end < 0:
+            end = stop
+        try:
+            items = self._build(self._raw[index:end])
+        except ValidationError:
+            if end - index == 1:
+                raise
+            # The malformed entry may lie past the one asked for, so only
+            # this one must fail the read.
+            end = index + 1
+            items = self._build(self._raw[index:end])
+        self._items[index:end] = items
+        self._done[index:end] = b"\x01" * (end - index)
+        self._validated += end - index
+        return end
 
-        if (length := len(result)) == 9:
-            result = "79" + result
-        elif length < 9:
-            result = "79" + "0" * (9 - length) + result
 
-        return result
+def _phone_number(sn: str | None, user_id: str | None) -> str:
+    result: str | None = (
+        sn
+        if (sn is not None and sn != "") or user_id is None or user_id == "0"
+        else user_id
+    )
+    if result is None:
+        raise ValueError("Phone numer field is None")
 
-    @property
-    def fullname(self) -> str:
-        return " ".join(name for name in (self.firstname, self.lastname) if name is not None and name != "")
+    if (length := len(result)) == 9:
+        result = "79" + result
+    elif length < 9:
+        result = "79" + "0" * (9 - length) + result
 
-    @property
-    def type_sign(self) -> str | None:
-        match self.type:
-            case LogItemType.UNDEFINED:
-                return None
-            case LogItemType.CALL:
-                return "📞"
-            case LogItemType.ADMIN:
-                return "📱"
-        return None
+    return result
 
-    @property
-    def reason_sign(self) -> str | None:
-        if self.reason == 0:
-            return None  # "✅"
-        return "❌"
 
-    def __str__(self) -> str:
-        fullname = self.fullname
-        pn = self.pn
-        return " ".join(
-            field
-            for field in (
-                fullname if fullname != "Unknown" else "?",
-                f'<a href="+{pn}">{pn}</a>',
-                self.type_sign,
-                self.reason_sign,
-            )
-            if field is not None
+def _full_name(firstname: str | None, lastname: str | None) -> str:
+    # filter(None) drops both None and "".
+    return " ".join(filter(None, (firstname, lastname)))
+
+
+def _type_sign(type: LogItemType | None) -> str | None:
+    match type:
+        case LogItemType.UNDEFINED:
+            return None
+        case LogItemType.CALL:
+            return "📞"
+        case LogItemType.ADMIN:
+            return "📱"
+    return None
+
+
+def _reason_sign(reason: int | None) -> str | None:
+    if reason == 0:
+        return None  # "✅"
+    return "❌"
+
+
+def _line(fullname: str, pn: str, type_sign: str | None, reason_sign: str | None) -> str:
+    line = '%s <a href="+%s">%s</a>' % (
+        fullname if fullname != "Unknown" else "?",
+        pn,
+        pn,
+    )
+    if type_sign is not None:
+        line += " " + type_sign
+    if reason_sign is not None:
+        line += " " + reason_sign
+    return line
+
+
+@dataclass(frozen=True, slots=True, weakref_slot=True)
+class Entry:
+    """A gate log entry on its way to the channels, reduced to what the
+    notifications need.
+
+    Batches, the enricher's queue and the outbox journal hold entries for
+    up to the enrichment TTL, so this is a plain slotted record rather than
+    a pydantic model: the phone is normalised, the name joined and the
+    line rendered once, when the entry is built from a
+    ``LogItem``. Building one raises ``ValueError`` for an entry without a
+    phone number.
+    """
+
+    time: int | None
+    pn: str
+    fullname: str
+    type: LogItemType | None
+    reason: int | None
+    line: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "line",
+            _line(
+                self.fullname,
+                self.pn,
+                _type_sign(self.type),
+                _reason_sign(self.reason),
+            ),
+        )
+
+    @staticmethod
+    def from_log_item(log_item: _LogItem) -> "Entry":
+        return Entry(
+            time=log_item.time,
+            pn=_phone_number(log_item.sn, log_item.userId),
+            fullname=_full_name(log_item.firstname, log_item.lastname),
+            type=log_item.type,
+            reason=log_item.reason,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "time": self.time,
+            "pn": self.pn,
+            "fullname": self.fullname,
+            "type": self.type.value if self.type is not None else None,
+            "reason": self.reason,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "Entry":
+        if "pn" not in data:
+            # Journaled before entries were compacted: a dumped LogItem.
+            return Entry.from_log_item(_LogItem.model_validate(data))
+        return Entry(
+            time=data.get("time"),
+            pn=str(data["pn"]),
+            fullname=str(data.get("fullname", "")),
+            type=LogItemType(data["type"]) if data.get("type") is not None else None,
+            reason=data.get("reason"),
         )
 
-    def __repr__(self) -> str:
-        return self.pn
+    def __str__(self) -> str:
+        return self.line
 
 
 class ItemResponse(LogItemResponse):
+    log: LazyLog | None = None  # type: ignore[assignment]
+
     @field_validator("log", mode="before")
     @classmethod
     def define_optional_fields(cls, log: list[dict[str, str]]) -> list[dict[str, str]]:
@@ -1,10 +1,32 @@
 from asyncio import sleep as asyncio_sleep
+from collections.abc import Iterator
+from contextlib import contextmanager
 from json import JSONDecodeError
 from logging import getLogger
+from time import perf_counter
 from typing import Any, Protocol
 
 from httpx import AsyncClient, Response, TransportError
 
+from breaker import CircuitBreaker, guarded
+from deadline import clip_timeout, expired, time_for
+from metrics import counter, histogram
+
+# Bot API cap on a message's text. Measured on the HTML source, which is
+# conservative: tags and entities do not count against Telegram's limit.
+MESSAGE_LIMIT = 4096
+
+NOTIFY_SECONDS = histogram(
+    "palgate_notify_seconds",
+    "Duration of a send/edit call including its retries",
+    ("channel", "method", "outcome"),
+)
+NOTIFY_RETRIES = counter(
+    "palgate_notify_retries_total",
+    "Send/edit attempts that failed and were retried",
+    ("channel",),
+)
+
 
 class NotifyError(Exception):
     """Delivery failed.
@@ -41,6 +63,9 @@ class TelegramNotifier:
     Retries transport failures and 5xx with exponential backoff, honours the
     ``retry_after`` hint on 429, and raises a permanent ``NotifyError`` on
     other 4xx so the caller can skip a message Telegram will never accept.
+    With a ``breaker`` (shared by every notifier of the bot) an open
+    circuit fails a call at once with a transient ``NotifyError``. Inside a
+    poll cycle, attempts and retries stay within the cycle's deadline.
     """
 
     def __init__(
@@ -51,6 +76,7 @@ class TelegramNotifier:
         timeout: float = 5,
         tries: int = 3,
         delay: float = 1,
+        breaker: CircuitBreaker | None = None,
     ) -> None:
         self._http = http
         self._base = "https://api.telegram.org/bot%s/" % token
@@ -58,6 +84,7 @@ class TelegramNotifier:
         self._timeout = timeout
         self._tries = tries
         self._delay = delay
+        self._breaker = breaker
         self._log = getLogger("default")
 
     @property
@@ -65,31 +92,47 @@ class TelegramNotifier:
         return "telegram"
 
     async def send(self, text: str) -> int | None:
-        response = await self._call(
-            "sendMessage",
-            {"chat_id": self._chat_id, "text": text, "parse_mode": "HTML"},
-        )
+        with _metered(self.name, "send"):
+            response = await self._call(
+                "sendMessage",
+                {"chat_id": self._chat_id, "text": text, "parse_mode": "HTML"},
+            )
         return self._message_id(response)
 
     async def edit(self, message_id: int, text: str) -> None:
-        await self._call(
-            "editMessageText",
-            {
-                "chat_id": self._chat_id,
-                "message_id": message_id,
-                "text": text,
-                "parse_mode": "HTML",
-            },
-        )
+        with _metered(self.name, "edit"):
+            await self._call(
+                "editMessageText",
+                {
+                    "chat_id": self._chat_id,
+                    "message_id": message_id,
+                    "text": text,
+                    "parse_mode": "HTML",
+                },
+            )
 
     async def _call(self, method: str, payload: dict[str, Any]) -> Response:
+        if expired():
+            raise NotifyError(
+                "Telegram %s skipped: poll cycle out of time" % method
+            )
+        with guarded(
+            self._breaker, NotifyError, _transient, NotifyError
+        ) as probe:
+            return await self._attempts(
+                method, payload, 1 if probe else self._tries
+            )
+
+    async def _attempts(
+        self, method: str, payload: dict[str, Any], tries: int
+    ) -> Response:
         url = self._base + method
         last_error = "no attempts made"
         delay = self._delay
-        for attempt in range(1, self._tries + 1):
+        for attempt in range(1, tries + 1):
             try:
                 response = await self._http.post(
-                    url, json=payload, timeout=self._timeout
+                    url, json=payload, timeout=clip_timeout(self._timeout)
                 )
             except TransportError as err:
                 last_error = "transport failed: %s" % err
@@ -107,17 +150,20 @@ class TelegramNotifier:
                         % (method, response.status_code, response.text),
                         permanent=True,
                     )
-            if attempt < self._tries:
-                self._log.warning(
-                    "Telegram %s attempt %d/%d failed (%s), "
-                    "retrying in %.1fs"
-                    % (method, attempt, self._tries, last_error, delay)
-                )
-                await asyncio_sleep(delay)
-                delay *= 2
+            if attempt == tries:
+                break
+            if not time_for(delay):
+                last_error += ", no time left in the poll cycle"
+                break
+            NOTIFY_RETRIES.inc(channel=self.name)
+            self._log.warning(
+                "Telegram %s attempt %d/%d failed (%s), retrying in %.1fs"
+                % (method, attempt, tries, last_error, delay)
+            )
+            await asyncio_sleep(delay)
+            delay *= 2
         raise NotifyError(
-            "Telegram unreachable after %d tries: %s"
-            % (self._tries, last_error)
+            "Telegram unreachable after %d tries: %s" % (attempt, last_error)
         )
 
     @staticmethod
@@ -143,8 +189,9 @@ class MaxNotifier:
 
     Same delivery contract as ``TelegramNotifier``: transport failures,
     5xx and 429 are retried with exponential backoff; any other 4xx raises
-    a permanent ``NotifyError``. Max authenticates with the token as a
-    query parameter, not a header.
+    a permanent ``NotifyError``, an open ``breaker`` fails a send at once
+    and a poll cycle's deadline bounds the retries. Max authenticates with
+    the token as a query parameter, not a header.
     """
 
     def __init__(
@@ -155,6 +202,7 @@ class MaxNotifier:
         timeout: float = 5,
         tries: int = 3,
         delay: float = 1,
+        breaker: CircuitBreaker | None = None,
     ) -> None:
         self._http = http
         self._url = "https://botapi.max.ru/messages"
@@ -163,6 +211,7 @@ class MaxNotifier:
         self._timeout = timeout
         self._tries = tries
         self._delay = delay
+        self._breaker = breaker
         self._log = getLogger("default")
 
     @property
@@ -175,6 +224,18 @@ class MaxNotifier:
         raise NotifyError("Max does not support editing", permanent=True)
 
     async def send(self, text: str) -> int | None:
+        with _metered(self.name, "send"):
+            return await self._send(text)
+
+    async def _send(self, text: str) -> int | None:
+        if expired():
+            raise NotifyError("Max send skipped: poll cycle out of time")
+        with guarded(
+            self._breaker, NotifyError, _transient, NotifyError
+        ) as probe:
+            return await self._attempts(text, 1 if probe else self._tries)
+
+    async def _attempts(self, text: str, tries: int) -> int | None:
         params: dict[str, Any] = {
             "access_token": self._token,
             "chat_id": self._chat_id,
@@ -182,10 +243,13 @@ class MaxNotifier:
         payload: dict[str, Any] = {"text": text, "format": "html"}
         last_error = "no attempts made"
         delay = self._delay
-        for attempt in range(1, self._tries + 1):
+        for attempt in range(1, tries + 1):
             try:
                 response = await self._http.post(
-                    self._url, params=params, json=payload, timeout=self._timeout
+                    self._url,
+                    params=params,
+                    json=payload,
+                    timeout=clip_timeout(self._timeout),
                 )
             except TransportError as err:
                 last_error = "transport failed: %s" % err
@@ -202,13 +266,43 @@ class MaxNotifier:
                         % (response.status_code, response.text),
                         permanent=True,
                     )
-            if attempt < self._tries:
-                self._log.warning(
-                    "Max send attempt %d/%d failed (%s), retrying in %.1fs"
-                    % (attempt, self._tries, last_error, delay)
-                )
-                await asyncio_sleep(delay)
-                delay *= 2
+            if attempt == tries:
+                break
+            if not time_for(delay):
+                last_error += ", no time left in the poll cycle"
+                break
+            NOTIFY_RETRIES.inc(channel=self.name)
+            self._log.warning(
+                "Max send attempt %d/%d failed (%s), retrying in %.1fs"
+                % (attempt, tries, last_error, delay)
+            )
+            await asyncio_sleep(delay)
+            delay *= 2
         raise NotifyError(
-            "Max unreachable after %d tries: %s" % (self._tries, last_error)
+            "Max unreachable after %d tries: %s" % (attempt, last_error)
+        )
+
+
+def _transient(err: NotifyError) -> bool:
+    # A rejection means the endpoint is up: not a failed call.
+    return not err.permanent
+
+
+@contextmanager
+def _metered(channel: str, method: str) -> Iterator[None]:
+    start = perf_counter()
+    outcome = "failed"
+    try:
+        yield
+        outcome = "ok"
+    except NotifyError as err:
+        if err.permanent:
+            outcome = "rejected"
+        raise
+    finally:
+        NOTIFY_SECONDS.observe(
+            perf_counter() - start,
+            channel=channel,
+            method=method,
+            outcome=outcome,
         )
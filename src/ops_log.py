@@ -0,0 +1,92 @@
+"""Ops-chat delivery for the "log" logger: batched, folded, errors first.
+
+aiologging's ``AsyncTelegramHandler`` already buffers records and joins a
+flush worth of them into as few messages as the length limit allows. During
+an incident that is not enough: the same "Delivery failed" line repeats
+every cycle, filling the chat and spending the bot token's rate budget that
+the gate notifications share. ``CoalescingTelegramHandler`` collects records
+for ``window`` seconds and folds repeats into one line marked "×N", while a
+record at or above ``urgent_level`` ships at once, taking whatever was
+waiting along with it.
+"""
+
+from copy import copy
+from logging import ERROR, LogRecord
+from typing import Any
+
+from aiologging import AsyncTelegramHandler
+from aiologging.types import BatchConfig
+
+from metrics import counter
+
+FOLDED = counter(
+    "palgate_ops_log_folded_total",
+    "Ops-chat log records folded into an earlier identical one",
+)
+
+
+class CoalescingTelegramHandler(AsyncTelegramHandler):
+    """``AsyncTelegramHandler`` flushing every ``window`` seconds, with
+    repeats folded and urgent records flushed on arrival."""
+
+    def __init__(
+        self,
+        *,
+        window: float,
+        urgent_level: int = ERROR,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            batch_config=BatchConfig(flush_interval=window), **kwargs
+        )
+        self._urgent_level = urgent_level
+
+    async def handle(self, record: LogRecord) -> None:
+        await super().handle(record)
+        if record.levelno >= self._urgent_level:
+            await self.force_flush()
+
+    async def flush(self, records: list[LogRecord] | None = None) -> None:
+        if records is None:
+            await super().flush()
+            return
+        await super().flush(fold_repeats(records))
+
+
+def fold_repeats(records: list[LogRecord]) -> list[LogRecord]:
+    """One record per distinct message, in order of first appearance.
+
+    Records match on level, logger and rendered message (plus the
+    exception, if any); a repeated one is dropped and the first gets a
+    "×N" suffix. The first occurrence keeps its timestamp.
+    """
+    counts: dict[tuple[Any, ...], int] = {}
+    first: dict[tuple[Any, ...], LogRecord] = {}
+    for record in records:
+        key = _key(record)
+        if key in counts:
+            counts[key] += 1
+            FOLDED.inc()
+        else:
+            counts[key] = 1
+            first[key] = record
+    folded = []
+    for key, record in first.items():
+        if counts[key] > 1:
+            # The record is shared with the other handlers: mark a copy.
+            record = copy(record)
+            record.msg = "%s ×%d" % (record.getMessage(), counts[key])
+            record.args = None
+        folded.append(record)
+    return folded
+
+
+def _key(record: LogRecord) -> tuple[Any, ...]:
+    error = record.exc_info[1] if record.exc_info else None
+    return (
+        record.levelno,
+        record.name,
+        record.getMessage(),
+        type(error),
+        str(error) if error is not None else None,
+    )
@@ -0,0 +1,348 @@
+"""Durable per-channel outbox between the poll loop and the channels.
+
+Without an outbox the poll cycle delivers inline: a slow or broken channel
+stalls polling, and a failed send makes the next cycle refetch and re-render
+the same entries. With one, ``GateWatcher`` renders a batch once, appends the
+messages to the channel's journal and advances the marker right away; a
+``DeliveryWorker`` per channel drains its journal independently, with its own
+backoff. The journal lives on the data volume, so a restart resumes pending
+sends without waiting for the next poll.
+
+The reliability contract stays at-least-once: an entry is journaled before
+the marker moves and acknowledged only after the channel confirmed delivery,
+so a crash in between repeats a message instead of losing it.
+"""
+
+from asyncio import FIRST_COMPLETED, Event, create_task, gather, wait
+from dataclasses import dataclass
+from json import JSONDecodeError, load as json_load
+from logging import getLogger
+from pathlib import Path
+from random import uniform
+from time import time
+from typing import Any, Callable, Sequence
+
+from disk_io import DISK, DiskExecutor, write_json_atomic
+from enrich import Enricher
+from lag import DELIVERED, LagTracker
+from models import Entry
+from notify import Notifier, NotifyError
+
+OUTBOX_VERSION = 1
+
+
+@dataclass(frozen=True)
+class OutboxEntry:
+    """One rendered message waiting for its channel.
+
+    ``items`` are the entries the text was rendered from, kept as plain
+    dicts so the journal stays JSON; the worker hands them to the enricher
+    once the message has an id.
+    """
+
+    id: int
+    text: str
+    items: tuple[dict[str, Any], ...]
+    created_at: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "items": list(self.items),
+            "created_at": self.created_at,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "OutboxEntry":
+        return OutboxEntry(
+            id=int(data["id"]),
+            text=str(data["text"]),
+            items=tuple(data.get("items", ())),
+            created_at=float(data.get("created_at", 0.0)),
+        )
+
+
+class MemoryOutbox:
+    """Per-channel FIFO journals kept in memory; lost on restart.
+
+    ``enqueue`` wakes the channel's worker; ``peek`` and ``pending`` are
+    cheap in-memory reads, so status snapshots never touch the disk.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time) -> None:
+        self._clock = clock
+        self._channels: dict[str, list[OutboxEntry]] = {}
+        self._next_id = 1
+        self._events: dict[str, Event] = {}
+
+    async def enqueue(
+        self, channel: str, text: str, items: Sequence[Entry]
+    ) -> OutboxEntry:
+        entry = OutboxEntry(
+            id=self._next_id,
+            text=text,
+            items=tuple(item.to_dict() for item in items),
+            created_at=self._clock(),
+        )
+        self._next_id += 1
+        self._channels.setdefault(channel, []).append(entry)
+        try:
+            await self._persist()
+        except BaseException:
+            # Not journaled, so the caller's marker stays put and the next
+            # cycle enqueues the batch again: keeping this copy queued
+            # would send it twice.
+            self._channels[channel] = [
+                queued
+                for queued in self._channels.get(channel, [])
+                if queued is not entry
+            ]
+            raise
+        self._event(channel).set()
+        return entry
+
+    def peek(self, channel: str) -> OutboxEntry | None:
+        """The oldest pending entry of ``channel``, or None when drained."""
+        entries = self._channels.get(channel)
+        return entries[0] if entries else None
+
+    async def ack(self, channel: str, entry_id: int) -> None:
+        """Drop a delivered (or permanently rejected) entry."""
+        entries = self._channels.get(channel, [])
+        remaining = [entry for entry in entries if entry.id != entry_id]
+        if len(remaining) == len(entries):
+            return
+        self._channels[channel] = remaining
+        await self._persist()
+
+    def pending(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+    async def wait(self, channel: str, stop: Event, timeout: float) -> None:
+        """Sleep until ``channel`` gets an entry, ``stop`` or ``timeout``."""
+        event = self._event(channel)
+        if stop.is_set() or event.is_set():
+            event.clear()
+            return
+        waiters = (create_task(stop.wait()), create_task(event.wait()))
+        _, pending = await wait(
+            waiters, timeout=timeout, return_when=FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        await gather(*pending, return_exceptions=True)
+        event.clear()
+
+    def _event(self, channel: str) -> Event:
+        return self._events.setdefault(channel, Event())
+
+    async def _persist(self) -> None:
+        """Hook for durable subclasses; the memory outbox keeps nothing."""
+
+
+class FileOutbox(MemoryOutbox):
+    """``MemoryOutbox`` journaled to a JSON file on the data volume.
+
+    The whole journal is rewritten atomically (tmp file + rename) on every
+    change, like the state file; it only ever holds undelivered messages, so
+    it stays small. An unreadable journal starts empty — the markers already
+    moved past its entries, so those messages are lost, which is logged.
+    Rewrites run on the ``DiskExecutor``, queued ahead of the marker
+    advance that follows them.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        clock: Callable[[], float] = time,
+        disk: DiskExecutor = DISK,
+    ) -> None:
+        super().__init__(clock)
+        self._path = path
+        self._disk = disk
+        self._log = getLogger("log")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as fp:
+                document = json_load(fp)
+        except FileNotFoundError:
+            return
+        except (JSONDecodeError, OSError) as err:
+            self._log.error("Outbox journal is unreadable, resetting: %s" % err)
+            return
+        try:
+            channels = {
+                channel: [OutboxEntry.from_dict(raw) for raw in entries]
+                for channel, entries in document["channels"].items()
+            }
+            next_id = int(document["next_id"])
+        except (KeyError, TypeError, ValueError, AttributeError) as err:
+            self._log.error(
+                "Outbox journal has unexpected shape, resetting: %s" % err
+            )
+            return
+        self._channels = channels
+        self._next_id = next_id
+        for channel, entries in channels.items():
+            if entries:
+                self._event(channel).set()
+
+    async def _persist(self) -> None:
+        # Snapshot on the loop thread; only the write itself is offloaded.
+        document = {
+            "version": OUTBOX_VERSION,
+            "next_id": self._next_id,
+            "channels": {
+                channel: [entry.to_dict() for entry in entries]
+                for channel, entries in self._channels.items()
+                if entries
+            },
+        }
+        await self._disk.run(write_json_atomic, self._path, document)
+
+
+class DeliveryWorker:
+    """Drains one channel's outbox, oldest message first.
+
+    Same failure policy as the inline path: a transient ``NotifyError``
+    keeps the message at the head and backs off exponentially (capped at
+    ``max_backoff``, with jitter); a permanent one drops just that message.
+    Only the first failure of a streak reaches the ops chat, plus a notice
+    once the channel recovers. Like every loop here, it never dies.
+    """
+
+    def __init__(
+        self,
+        notifier: Notifier,
+        outbox: MemoryOutbox,
+        enricher: Enricher | None = None,
+        retry_delay: float = 1,
+        max_backoff: float = 300,
+        idle_timeout: float = 60,
+        lag: LagTracker | None = None,
+    ) -> None:
+        self._notifier = notifier
+        self._outbox = outbox
+        self._enricher = enricher
+        self._retry_delay = retry_delay
+        self._max_backoff = max_backoff
+        self._idle_timeout = idle_timeout
+        self._lag = lag
+        self._failures = 0
+        self._log = getLogger("log")
+        self._local = getLogger("default")
+
+    @property
+    def channel(self) -> str:
+        return self._notifier.name
+
+    def reconfigure(
+        self,
+        notifier: Notifier | None = None,
+        retry_delay: float | None = None,
+        max_backoff: float | None = None,
+    ) -> None:
+        """Swap the channel's notifier (same name: the journal is keyed by
+        it) or the backoff; the message in flight finishes the old way."""
+        if notifier is not None:
+            if notifier.name != self.channel:
+                raise ValueError(
+                    "Worker for %s cannot deliver to %s"
+                    % (self.channel, notifier.name)
+                )
+            self._notifier = notifier
+        if retry_delay is not None:
+            self._retry_delay = retry_delay
+        if max_backoff is not None:
+            self._max_backoff = max_backoff
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    async def run(self, stop: Event) -> None:
+        while not stop.is_set():
+            entry = self._outbox.peek(self.channel)
+            if entry is None:
+                await self._outbox.wait(self.channel, stop, self._idle_timeout)
+                continue
+            try:
+                delivered = await self.deliver(entry)
+            except Exception:  # the worker must survive anything
+                self._log.exception(
+                    "Unexpected error in %s delivery worker" % self.channel
+                )
+                delivered = False
+            if not delivered:
+                await self._sleep(stop, self._backoff())
+
+    async def deliver(self, entry: OutboxEntry) -> bool:
+        """Send one entry; True once it left the journal."""
+        try:
+            message_id = await self._notifier.send(entry.text)
+        except NotifyError as err:
+            if not err.permanent:
+                self._failures += 1
+                log = self._log if self._failures == 1 else self._local
+                log.error(
+                    "Delivery to %s failed, will retry: %s"
+                    % (self.channel, err)
+                )
+                return False
+            self._log.error(
+                "%s permanently rejected a queued message, dropping it: %s"
+                % (self.channel, err)
+            )
+        else:
+            if self._failures:
+                self._log.info(
+                    "Delivery to %s recovered after %d failed attempts"
+                    % (self.channel, self._failures)
+                )
+            self._local.info(
+                "Delivered to %s:\n%s" % (self.channel, entry.text)
+            )
+            try:
+                self._delivered(entry, message_id)
+            except Exception:  # the message is out: never send it again
+                self._log.exception(
+                    "Bookkeeping after a delivery to %s failed" % self.channel
+                )
+        self._failures = 0
+        await self._outbox.ack(self.channel, entry.id)
+        return True
+
+    def _delivered(self, entry: OutboxEntry, message_id: int | None) -> None:
+        if self._lag is not None:
+            self._lag.observe(
+                DELIVERED,
+                self.channel,
+                (_event_time(raw) for raw in entry.items),
+            )
+        if self._enricher is not None and message_id is not None:
+            items = tuple(Entry.from_dict(raw) for raw in entry.items)
+            self._enricher.track(self._notifier, message_id, items)
+
+    def _backoff(self) -> float:
+        base = max(self._retry_delay, 0.0)
+        capped = min(
+            self._max_backoff, base * float(2 ** max(self._failures - 1, 0))
+        )
+        return capped * uniform(1.0, 1.25)
+
+    async def _sleep(self, stop: Event, delay: float) -> None:
+        if stop.is_set():
+            return
+        stop_task = create_task(stop.wait())
+        await wait((stop_task,), timeout=delay)
+        stop_task.cancel()
+        await gather(stop_task, return_exceptions=True)
+
+
+def _event_time(raw: dict[str, Any]) -> float | None:
+    value = raw.get("time")
+    return float(value) if isinstance(value, (int, float)) else None
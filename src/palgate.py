@@ -1,20 +1,56 @@
-from json import JSONDecodeError
+from asyncio import Event, wait_for
+from dataclasses import dataclass
+from hashlib import blake2b
 from logging import WARNING, getLogger
-from typing import Any
+from math import floor
+from time import perf_counter, time
+from typing import Callable
 
 from httpx import AsyncClient, Response, TransportError
-from pydantic import ValidationError
 from pylgate.token_generator import generate_token
 from pylgate.types import TokenType
 from tenacity import (
     AsyncRetrying,
+    RetryCallState,
     before_sleep_log,
     retry_if_exception_type,
     stop_after_attempt,
     wait_exponential,
 )
+from tenacity.stop import stop_base
 
+from breaker import CircuitBreaker, guarded
+from deadline import clip_timeout, expired, time_for
+from metrics import counter, histogram
 from models import ItemResponse
+from parsing import LogParseError, LogParser
+from recording import CaptureWriter
+
+FETCH_SECONDS = histogram(
+    "palgate_fetch_request_seconds",
+    "Latency of a single Palgate log request attempt",
+    ("outcome",),
+)
+FETCH_RETRIES = counter(
+    "palgate_fetch_retries_total",
+    "Palgate log request attempts that were retried",
+)
+FETCH_UNCHANGED = counter(
+    "palgate_fetch_unchanged_total",
+    "Palgate log fetches answered from the previous response, by how the "
+    "client knew nothing changed",
+    ("reason",),
+)
+TOKEN_SECONDS = histogram(
+    "palgate_token_generation_seconds",
+    "Time spent generating one X-Bt-Token",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+TOKENS = counter(
+    "palgate_tokens_total",
+    "X-Bt-Tokens handed to requests, by whether they were ready in advance",
+    ("source",),
+)
 
 
 class PalgateError(Exception):
@@ -37,12 +73,107 @@ class InvalidResponseError(PalgateError):
     """A 2xx response with a body that cannot be parsed or validated."""
 
 
+class TokenProvider:
+    """X-Bt-Tokens for the current time slot, generated ahead of use.
+
+    A pylgate token embeds its timestamp and the API accepts it for a few
+    seconds only. The provider cuts wall time into slots of ``slot`` whole
+    seconds (a token's resolution) and stamps each token with the start of its slot, so one token
+    serves every request in the slot — polls, retries and ``/log`` alike —
+    and a retry that backs off into the next slot gets a new one. ``run``
+    generates the upcoming slot's token shortly before the slot begins, so
+    the request path finds it ready. Without ``run``, the first request of
+    a slot generates it inline; ``slot=0`` generates a token per request.
+    """
+
+    def __init__(
+        self,
+        session_token: bytes,
+        user_id: int,
+        token_type: TokenType,
+        slot: int = 0,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        self._session_token = session_token
+        self._user_id = user_id
+        self._token_type = token_type
+        self._slot = slot
+        # How long before a slot starts its token is generated.
+        self._lead = min(0.5, slot / 2)
+        self._clock = clock
+        self._tokens: dict[int, str] = {}
+
+    def current(self) -> str:
+        now = self._clock()
+        if self._slot <= 0:
+            TOKENS.inc(source="inline")
+            return self._generate(now)
+        index = self._slot_index(now)
+        token = self._tokens.get(index)
+        if token is not None:
+            TOKENS.inc(source="ready")
+            return token
+        TOKENS.inc(source="inline")
+        return self._prepare(index)
+
+    async def run(self, stop: Event) -> None:
+        if self._slot <= 0:
+            return
+        while not stop.is_set():
+            now = self._clock()
+            upcoming = self._slot_index(now) + 1
+            for index in (upcoming - 1, upcoming):
+                if index not in self._tokens:
+                    self._prepare(index)
+            wake = (upcoming + 1) * self._slot - self._lead
+            try:
+                await wait_for(stop.wait(), max(0.0, wake - now))
+            except TimeoutError:
+                pass
+
+    def _slot_index(self, now: float) -> int:
+        return floor(now / self._slot)
+
+    def _prepare(self, index: int) -> str:
+        token = self._generate(index * self._slot)
+        # Slots before the previous one are over; nothing asks for them.
+        for stale in [key for key in self._tokens if key < index - 1]:
+            del self._tokens[stale]
+        self._tokens[index] = token
+        return token
+
+    def _generate(self, at: float) -> str:
+        started = perf_counter()
+        # Despite its name, pylgate's timestamp_ms is in whole seconds.
+        token: str = generate_token(
+            self._session_token,
+            self._user_id,
+            self._token_type,
+            timestamp_ms=int(at),
+        )
+        TOKEN_SECONDS.observe(perf_counter() - started)
+        return token
+
+
+@dataclass(frozen=True)
+class _LastResponse:
+    response: ItemResponse
+    # blake2b of the raw body, to recognise an unchanged log without
+    # parsing it.
+    digest: bytes
+    etag: str | None
+    last_modified: str | None
+
+
 class PalgateClient:
     """Asynchronous client for the Palgate user access log endpoint.
 
-    Every attempt generates a fresh X-Bt-Token: pylgate tokens embed the
-    current timestamp and are only valid for a few seconds, so a token must
-    never be reused across retries.
+    X-Bt-Tokens come from a ``TokenProvider``; by default a fresh token is
+    generated for every attempt, the way pylgate's own client does it. With
+    a ``breaker`` an open circuit fails a fetch at once with
+    ``TransientFetchError``, and the half-open probe makes one attempt
+    instead of ``tries``. Inside a poll cycle the attempts, their timeouts
+    and the sleeps between them stay within the cycle's deadline.
     """
 
     def __init__(
@@ -55,52 +186,128 @@ class PalgateClient:
         timeout: float = 5,
         tries: int = 3,
         delay: float = 1,
+        recorder: CaptureWriter | None = None,
+        tokens: TokenProvider | None = None,
+        parser: LogParser | None = None,
+        breaker: CircuitBreaker | None = None,
     ) -> None:
         self._http = http
         self._url = url
-        self._session_token = session_token
-        self._user_id = user_id
-        self._token_type = token_type
+        self._tokens = tokens or TokenProvider(
+            session_token, user_id, token_type
+        )
         self._timeout = timeout
         self._tries = tries
         self._delay = delay
+        self._recorder = recorder
+        self._parser = parser or LogParser()
+        self._breaker = breaker
+        self._last: _LastResponse | None = None
         self._log = getLogger("default")
+        self._log_retry = before_sleep_log(self._log, WARNING)
+
+    @property
+    def tokens(self) -> TokenProvider:
+        return self._tokens
 
     def generate_token(self) -> str:
-        return generate_token(self._session_token, self._user_id, self._token_type)
+        return self._tokens.current()
+
+    def close(self) -> None:
+        self._parser.shutdown()
 
     async def fetch_log(self) -> ItemResponse:
-        payload = await self._fetch_json(self._url)
-        try:
-            return ItemResponse.model_validate(payload)
-        except ValidationError as err:
-            raise InvalidResponseError("Model validation error: %s" % err) from err
+        """The current log; the previous call's very object if unchanged.
 
-    async def _fetch_json(self, url: str) -> Any:
-        try:
-            response = await self._get_with_retries(url)
-        except TransportError as err:
-            raise TransientFetchError("HTTP transport failed: %s" % err) from err
+        The API's validators (ETag, Last-Modified) are sent back as a
+        conditional request, and a 304 costs nothing to handle. Without
+        them, a body byte-identical to the last one is recognised by its
+        hash and skips JSON decoding and validation. Either way the
+        previous ``ItemResponse`` is returned as is, which tells the
+        caller that nothing changed since it last looked.
+        """
+        if expired():
+            # Not a call to the API, so not the breaker's business either.
+            raise TransientFetchError("Fetch skipped: poll cycle out of time")
+        # A 4xx means the API is up and answering: only a
+        # TransientFetchError counts as a failed call.
+        with guarded(
+            self._breaker,
+            PalgateError,
+            lambda err: isinstance(err, TransientFetchError),
+            TransientFetchError,
+        ) as probe:
+            try:
+                response = await self._get_with_retries(
+                    self._url, 1 if probe else self._tries
+                )
+            except TransportError as err:
+                raise TransientFetchError(
+                    "HTTP transport failed: %s" % err
+                ) from err
 
-        try:
-            return response.json()
-        except JSONDecodeError as err:
-            raise InvalidResponseError("JSON decode error: %s" % err) from err
+        last = self._last
+        if response.status_code == 304:
+            if last is None:
+                raise InvalidResponseError(
+                    "Palgate API answered 304 to an unconditional request"
+                )
+            FETCH_UNCHANGED.inc(reason="not_modified")
+            return last.response
+        digest = blake2b(response.content, digest_size=16).digest()
+        if last is not None and digest == last.digest:
+            FETCH_UNCHANGED.inc(reason="same_body")
+            parsed = last.response
+        else:
+            try:
+                parsed = await self._parser.parse(response.content)
+            except LogParseError as err:
+                raise InvalidResponseError(str(err)) from err
+        self._last = _LastResponse(
+            response=parsed,
+            digest=digest,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return parsed
 
-    async def _get_with_retries(self, url: str) -> Response:
+    async def _get_with_retries(self, url: str, tries: int) -> Response:
         retrying = AsyncRetrying(
-            stop=stop_after_attempt(self._tries),
+            stop=stop_after_attempt(tries) | _StopOutOfTime(),
             wait=wait_exponential(multiplier=self._delay),
             retry=retry_if_exception_type((TransientFetchError, TransportError)),
-            before_sleep=before_sleep_log(self._log, WARNING),
+            before_sleep=self._before_retry,
             reraise=True,
         )
         response: Response = await retrying(self._get, url)
         return response
 
+    def _before_retry(self, state: RetryCallState) -> None:
+        FETCH_RETRIES.inc()
+        self._log_retry(state)
+
     async def _get(self, url: str) -> Response:
         headers = {"User-Agent": "okhttp/4.9.3", "X-Bt-Token": self.generate_token()}
-        response = await self._http.get(url, headers=headers, timeout=self._timeout)
+        last = self._last
+        if last is not None:
+            if last.etag is not None:
+                headers["If-None-Match"] = last.etag
+            if last.last_modified is not None:
+                headers["If-Modified-Since"] = last.last_modified
+        start = perf_counter()
+        try:
+            response = await self._http.get(
+                url, headers=headers, timeout=clip_timeout(self._timeout)
+            )
+        except TransportError:
+            FETCH_SECONDS.observe(perf_counter() - start, outcome="transport")
+            raise
+        elapsed = perf_counter() - start
+        FETCH_SECONDS.observe(
+            elapsed, outcome=_status_class(response.status_code)
+        )
+        if self._recorder is not None:
+            self._recorder.record(response.status_code, response.text, elapsed)
         if response.status_code >= 500 or response.status_code == 429:
             raise TransientFetchError(
                 "Palgate API responded %d" % response.status_code
@@ -111,3 +318,19 @@ class PalgateClient:
                 status_code=response.status_code,
             )
         return response
+
+
+class _StopOutOfTime(stop_base):
+    """Stop when the next attempt would start past the poll cycle's
+    deadline."""
+
+    def __call__(self, retry_state: RetryCallState) -> bool:
+        # The wait strategy has already set the sleep before that attempt.
+        return not time_for(retry_state.upcoming_sleep)
+
+
+def _status_class(status_code: int) -> str:
+    # 429 is split out from the other 4xx: it is retried, they are not.
+    if status_code == 429:
+        return "429"
+    return "%dxx" % (status_code // 100)
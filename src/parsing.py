@@ -0,0 +1,159 @@
+"""Decoding and validation of Palgate log bodies, inline or in a process pool.
+
+Validation is CPU work on the event loop thread. For one gate and a
+``LazyLog`` that reads a few entries it is negligible, but a process
+polling many gates with large pages spends real time there — time the ops
+bot and the enricher wait for. ``LogParser`` can hand bodies above a size
+threshold to worker processes instead: the worker decodes the JSON,
+checks the envelope and validates every entry, and sends back compact
+tuples that the loop turns back into entries without validating again.
+"""
+
+from asyncio import get_running_loop
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from json import JSONDecodeError, loads as json_loads
+from logging import getLogger
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Any
+
+from pydantic import ValidationError
+
+from log_item_model import LogItemType
+from metrics import histogram
+from models import ItemResponse, LazyLog, LogItem
+
+PARSE_SECONDS = histogram(
+    "palgate_parse_seconds",
+    "Decoding and validating one Palgate log body, by where it ran",
+    ("path",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DEFAULT_THRESHOLD = 256 * 1024
+
+_FIELDS = tuple(LogItem.model_fields)
+# err, msg, status, and per entry either its field values in _FIELDS
+# order or, when it failed validation, the raw entry.
+CompactLog = tuple[Any, Any, Any, list[tuple[Any, ...] | dict[str, Any]]]
+
+
+class LogParseError(ValueError):
+    """The body is not a valid log response; the message says why."""
+
+
+class LogParser:
+    """Parses log bodies inline, or in ``workers`` processes above
+    ``threshold`` bytes.
+
+    The pool is started on first use. Should it break (a worker killed by
+    the OOM killer), the body is parsed inline and the next large one
+    starts a fresh pool.
+    """
+
+    def __init__(
+        self, workers: int = 0, threshold: int = DEFAULT_THRESHOLD
+    ) -> None:
+        self._workers = workers
+        self._threshold = threshold
+        self._pool: ProcessPoolExecutor | None = None
+        self._log = getLogger("default")
+
+    async def parse(self, body: bytes) -> ItemResponse:
+        if self._workers <= 0 or len(body) < self._threshold:
+            started = perf_counter()
+            try:
+                return parse_log(body)
+            finally:
+                PARSE_SECONDS.observe(perf_counter() - started, path="inline")
+
+        started = perf_counter()
+        loop = get_running_loop()
+        try:
+            err, msg, status, entries = await loop.run_in_executor(
+                self._executor(), compact_log, body
+            )
+        except BrokenProcessPool as error:
+            self._log.error(
+                "Log parser pool broke, parsing inline: %s" % error
+            )
+            self.shutdown()
+            return parse_log(body)
+        finally:
+            PARSE_SECONDS.observe(perf_counter() - started, path="pool")
+        return ItemResponse.model_construct(
+            log=LazyLog(entries, build=_from_compact),
+            err=err,
+            msg=msg,
+            status=status,
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Not fork: the service has threads (disk I/O, logging) that a
+            # forked child would inherit mid-operation. The fork server
+            # preloads this module, so workers start with the models
+            # already imported.
+            context = get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            self._pool = ProcessPoolExecutor(self._workers, mp_context=context)
+        return self._pool
+
+
+def parse_log(body: bytes) -> ItemResponse:
+    return _validate(_decode(body))
+
+
+def compact_log(body: bytes) -> CompactLog:
+    """Worker side of ``LogParser``: a body in, plain tuples out."""
+    payload = _decode(body)
+    response = _validate(payload)
+    entries: list[tuple[Any, ...] | dict[str, Any]] = []
+    for raw in payload["log"]:
+        try:
+            item = LogItem.model_validate(raw)
+        except ValidationError:
+            # Raised again on the loop side if the entry is ever read.
+            entries.append(raw)
+            continue
+        entries.append(
+            tuple(
+                value.value if isinstance(value, LogItemType) else value
+                for value in (getattr(item, name) for name in _FIELDS)
+            )
+        )
+    return response.err, response.msg, response.status, entries
+
+
+def _decode(body: bytes) -> Any:
+    try:
+        return json_loads(body)
+    except JSONDecodeError as err:
+        raise LogParseError("JSON decode error: %s" % err) from err
+
+
+def _validate(payload: Any) -> ItemResponse:
+    try:
+        return ItemResponse.model_validate(payload)
+    except ValidationError as err:
+        raise LogParseError("Model validation error: %s" % err) from err
+
+
+def _from_compact(
+    entries: list[tuple[Any, ...] | dict[str, Any]],
+) -> list[LogItem]:
+    return [_from_compact_entry(entry) for entry in entries]
+
+
+def _from_compact_entry(entry: tuple[Any, ...] | dict[str, Any]) -> LogItem:
+    if isinstance(entry, dict):
+        return LogItem.model_validate(entry)
+    values = dict(zip(_FIELDS, entry))
+    if values["type"] is not None:
+        values["type"] = LogItemType(values["type"])
+    return LogItem.model_construct(**values)
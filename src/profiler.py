@@ -0,0 +1,183 @@
+"""On-demand profiling of the live event loop.
+
+``profile_loop`` samples the loop thread's stack from a helper thread for a
+bounded window (no tracing hooks, so the service runs at close to full
+speed) and, in parallel, diffs two ``tracemalloc`` snapshots to find where
+memory was allocated. The result is aggregated per function: *self* counts
+samples where the function was the innermost frame, *total* counts samples
+where it was anywhere on the stack. Samples taken while the loop sat in
+the selector waiting for I/O are counted as idle rather than attributed.
+"""
+
+from asyncio import sleep
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from sys import _current_frames
+from threading import Event as ThreadEvent, Thread, get_ident
+from time import perf_counter
+from types import CodeType, FrameType
+from tracemalloc import (
+    Snapshot,
+    is_tracing,
+    start as start_tracing,
+    stop as stop_tracing,
+    take_snapshot,
+)
+
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 8
+
+
+@dataclass(frozen=True)
+class FunctionStat:
+    name: str
+    samples: int
+
+
+@dataclass(frozen=True)
+class AllocationStat:
+    site: str
+    size: int
+    count: int
+
+
+@dataclass(frozen=True)
+class Profile:
+    seconds: float
+    samples: int
+    idle: int
+    top_self: tuple[FunctionStat, ...]
+    top_total: tuple[FunctionStat, ...]
+    # Net growth per allocation site over the window; empty when another
+    # tracemalloc user was already active and owns the snapshots.
+    allocations: tuple[AllocationStat, ...]
+
+    @property
+    def busy(self) -> float:
+        """Share of samples where the loop was running code, 0..1."""
+        if not self.samples:
+            return 0.0
+        return (self.samples - self.idle) / self.samples
+
+
+class _Sampler:
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self._thread_id = thread_id
+        self._interval = interval
+        self._halt = ThreadEvent()
+        self.samples = 0
+        self.idle = 0
+        self.self_counts: Counter[str] = Counter()
+        self.total_counts: Counter[str] = Counter()
+
+    def start(self) -> Thread:
+        thread = Thread(target=self._run, name="profiler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self, thread: Thread) -> None:
+        self._halt.set()
+        thread.join()
+
+    def _run(self) -> None:
+        while not self._halt.wait(self._interval):
+            frame = _current_frames().get(self._thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def _record(self, frame: FrameType) -> None:
+        self.samples += 1
+        if _is_idle(frame.f_code):
+            self.idle += 1
+            return
+        self.self_counts[_label(frame.f_code)] += 1
+        seen = set()
+        current: FrameType | None = frame
+        while current is not None:
+            label = _label(current.f_code)
+            # Recursion must not count one sample twice.
+            if label not in seen:
+                seen.add(label)
+                self.total_counts[label] += 1
+            current = current.f_back
+
+
+async def profile_loop(
+    seconds: float,
+    top: int = DEFAULT_TOP,
+    interval: float = DEFAULT_INTERVAL,
+) -> Profile:
+    """Profile the running event loop for ``seconds``; awaits the window."""
+    owns_tracing = not is_tracing()
+    if owns_tracing:
+        start_tracing()
+    before = take_snapshot() if owns_tracing else None
+    sampler = _Sampler(get_ident(), interval)
+    thread = sampler.start()
+    started = perf_counter()
+    try:
+        await sleep(seconds)
+    finally:
+        sampler.stop(thread)
+        after = take_snapshot() if owns_tracing else None
+        if owns_tracing:
+            stop_tracing()
+    return Profile(
+        seconds=perf_counter() - started,
+        samples=sampler.samples,
+        idle=sampler.idle,
+        top_self=_top(sampler.self_counts, top),
+        top_total=_top(sampler.total_counts, top),
+        allocations=(
+            _allocations(before, after, top)
+            if before is not None and after is not None
+            else ()
+        ),
+    )
+
+
+def _top(counts: Counter[str], top: int) -> tuple[FunctionStat, ...]:
+    return tuple(
+        FunctionStat(name, samples)
+        for name, samples in counts.most_common(top)
+    )
+
+
+def _allocations(
+    before: Snapshot, after: Snapshot, top: int
+) -> tuple[AllocationStat, ...]:
+    stats = [
+        stat
+        for stat in after.compare_to(before, "lineno")
+        if stat.size_diff > 0
+        # The snapshots themselves are allocated in tracemalloc.
+        and not stat.traceback[0].filename.endswith("tracemalloc.py")
+    ]
+    return tuple(
+        AllocationStat(
+            "%s:%d"
+            % (
+                Path(stat.traceback[0].filename).name,
+                stat.traceback[0].lineno,
+            ),
+            stat.size_diff,
+            stat.count_diff,
+        )
+        for stat in stats[:top]
+    )
+
+
+def _label(code: CodeType) -> str:
+    return "%s (%s:%d)" % (
+        code.co_qualname,
+        Path(code.co_filename).name,
+        code.co_firstlineno,
+    )
+
+
+def _is_idle(code: CodeType) -> bool:
+    # The loop blocks in selectors.*Selector.select between callbacks.
+    return code.co_name == "select" and code.co_filename.endswith(
+        "selectors.py"
+    )
@@ -0,0 +1,156 @@
+"""Capture of raw Palgate responses, and their replay.
+
+With ``PALGATE_CAPTURE_FILE`` set, ``PalgateClient`` appends every response
+it receives — status, body, latency and the wall time it arrived — to a
+gzip-compressed JSON-lines file. ``ReplayTransport`` serves such a capture
+back to a ``PalgateClient`` on a virtual clock running at real or
+accelerated speed, so a recorded traffic pattern (a Monday morning burst)
+can be pushed through ``GateWatcher`` locally, as often as needed.
+
+The capture holds the gate log verbatim — names and phone numbers — so it
+is as sensitive as the log itself.
+"""
+
+from asyncio import sleep
+from dataclasses import asdict, dataclass
+from gzip import compress, open as gzip_open
+from json import dumps as json_dumps, loads as json_loads
+from logging import getLogger
+from pathlib import Path
+from time import monotonic, time
+from typing import Callable, Iterator, Sequence
+
+from httpx import AsyncBaseTransport, Request, Response
+
+from disk_io import DISK, DiskExecutor
+
+
+@dataclass(frozen=True)
+class Frame:
+    # Wall time the response arrived, epoch seconds.
+    at: float
+    status: int
+    body: str
+    latency: float
+
+
+class CaptureWriter:
+    """Encodes and appends frames to a capture file on the
+    ``DiskExecutor``.
+
+    Each frame is its own gzip member, so a capture cut short by a crash
+    is readable up to the last complete frame. Write failures are logged
+    once and never reach the poll loop.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        disk: DiskExecutor = DISK,
+        clock: Callable[[], float] = time,
+    ) -> None:
+        self._path = path
+        self._disk = disk
+        self._clock = clock
+        self._failed = False
+        self._log = getLogger("default")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(self, status: int, body: str, latency: float) -> None:
+        # Serializing and compressing a whole page is the costly part, so
+        # it runs in the disk job too, off the event loop.
+        frame = Frame(self._clock(), status, body, latency)
+        self._disk.submit(self._append, frame)
+
+    def _append(self, frame: Frame) -> None:
+        line = json_dumps(asdict(frame), ensure_ascii=False) + "\n"
+        try:
+            with open(self._path, "ab") as fp:
+                fp.write(compress(line.encode()))
+        except OSError as err:
+            if not self._failed:
+                self._log.error("Cannot write Palgate capture: %s" % err)
+            self._failed = True
+        else:
+            self._failed = False
+
+
+def read_capture(path: Path) -> Iterator[Frame]:
+    with gzip_open(path, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            if line.strip():
+                yield Frame(**json_loads(line))
+
+
+class ReplayTransport(AsyncBaseTransport):
+    """httpx transport answering every request from a capture.
+
+    The capture's timeline is replayed on a virtual clock that starts at
+    the first frame when the first request arrives and runs ``speed`` times
+    faster than real time. A request gets the newest frame recorded at or
+    before the virtual now — what the gate would have answered at that
+    moment — after the frame's recorded latency (scaled by ``speed``).
+    With ``speed=None`` the frames are served one per request instead, as
+    fast as the client asks. Past the end of the capture the last frame
+    keeps being served and ``exhausted`` turns true.
+    """
+
+    def __init__(
+        self,
+        frames: Sequence[Frame],
+        speed: float | None = 1.0,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        if not frames:
+            raise ValueError("capture is empty")
+        self._frames = sorted(frames, key=lambda frame: frame.at)
+        self._speed = speed
+        self._clock = clock
+        self._started: float | None = None
+        self._served = 0
+        self._index = 0
+        self.exhausted = False
+
+    @property
+    def served(self) -> int:
+        return self._served
+
+    def now(self) -> float:
+        """The virtual wall time: where the replay is in the capture."""
+        origin = self._frames[0].at
+        if self._speed is None:
+            return self._frames[max(0, self._index - 1)].at
+        if self._started is None:
+            return origin
+        return origin + (self._clock() - self._started) * self._speed
+
+    async def handle_async_request(self, request: Request) -> Response:
+        if self._started is None:
+            self._started = self._clock()
+        frame = self._next_frame()
+        self._served += 1
+        if frame.latency > 0:
+            await sleep(frame.latency / (self._speed or 1.0))
+        return Response(
+            frame.status,
+            content=frame.body.encode(),
+            headers={"Content-Type": "application/json"},
+            request=request,
+        )
+
+    def _next_frame(self) -> Frame:
+        if self._speed is None:
+            frame = self._frames[min(self._index, len(self._frames) - 1)]
+            self._index = min(self._index + 1, len(self._frames))
+            self.exhausted = self._index == len(self._frames)
+            return frame
+        now = self.now()
+        while (
+            self._index + 1 < len(self._frames)
+            and self._frames[self._index + 1].at <= now
+        ):
+            self._index += 1
+        self.exhausted = self._index + 1 >= len(self._frames) and (
+            now >= self._frames[-1].at
+        )
+        return self._frames[self._index]
@@ -0,0 +1,169 @@
+"""Settings reload without a restart: SIGHUP or the ops bot's /reload.
+
+A restart costs a lock handover, a Telethon reconnect and a cold resolver
+cache, which is a lot for a new poll delay. ``SettingsReloader`` reads the
+settings again (the environment with ``SETTINGS_FILE`` over it), diffs them
+against the ones in effect and applies what the running objects can take
+in place:
+
+- ``CRON_DELAY``, ``MAX_BACKOFF``, ``ALERT_AFTER_FAILURES`` — the watcher
+  and its delivery workers;
+- ``TELEGRAM_CHAT_ID``, ``MAX_API_TOKEN``, ``MAX_CHAT_ID`` — the notifier
+  set (with an outbox, only re-pointing the existing channels);
+- the ``RESOLVE_*`` anti-flood knobs and TTLs — the limiter, the profile
+  cache and the enricher, when enrichment is running.
+
+Everything else is reported as needing a restart and stays as it was. The
+report names settings, never values: most of them are secrets.
+"""
+
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Callable, Sequence
+
+from pydantic import ValidationError
+
+from config import Settings, load_settings
+from enrich import Enricher
+from metrics import counter
+from notify import Notifier
+from service import GateWatcher
+
+RELOADS = counter(
+    "palgate_settings_reloads_total",
+    "Settings reloads by outcome (invalid: the new settings were rejected)",
+    ("outcome",),
+)
+
+WATCHER_SETTINGS = ("CRON_DELAY", "MAX_BACKOFF", "ALERT_AFTER_FAILURES")
+CHANNEL_SETTINGS = ("TELEGRAM_CHAT_ID", "MAX_API_TOKEN", "MAX_CHAT_ID")
+RESOLVER_SETTINGS = (
+    "RESOLVE_MIN_INTERVAL",
+    "RESOLVE_PER_HOUR",
+    "RESOLVE_PER_DAY",
+    "RESOLVE_POSITIVE_TTL",
+    "RESOLVE_NEGATIVE_TTL",
+    "RESOLVE_POLL_INTERVAL",
+)
+
+
+@dataclass(frozen=True)
+class ReloadReport:
+    """What one reload changed; ``error`` is set when nothing was read."""
+
+    applied: tuple[str, ...] = ()
+    restart: tuple[str, ...] = ()
+    error: str | None = None
+
+    def describe(self) -> str:
+        if self.error is not None:
+            return "Settings not reloaded: %s" % self.error
+        if not self.applied and not self.restart:
+            return "Settings reloaded, nothing changed"
+        parts = ["Settings reloaded"]
+        if self.applied:
+            parts.append("applied: %s" % ", ".join(self.applied))
+        if self.restart:
+            parts.append("need a restart: %s" % ", ".join(self.restart))
+        return "; ".join(parts)
+
+
+class SettingsReloader:
+    """Applies changed settings to the running service.
+
+    ``notifiers`` builds the delivery channels for a settings object (as at
+    startup). A setting that needs a restart stays at its old value here
+    too, so every later reload reports it again until the restart happens.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        watcher: GateWatcher,
+        notifiers: Callable[[Settings], Sequence[Notifier]],
+        enricher: Enricher | None = None,
+        load: Callable[[], Settings] = load_settings,
+    ) -> None:
+        self._settings = settings
+        self._watcher = watcher
+        self._notifiers = notifiers
+        self._enricher = enricher
+        self._load = load
+
+    @property
+    def settings(self) -> Settings:
+        """The settings in effect."""
+        return self._settings
+
+    def reload(self) -> ReloadReport:
+        try:
+            new = self._load()
+        except ValidationError as err:
+            RELOADS.inc(outcome="invalid")
+            # Field names only: the rejected input may be a token.
+            return ReloadReport(
+                error="invalid %s"
+                % ", ".join(
+                    ".".join(str(part) for part in error["loc"]) or "settings"
+                    for error in err.errors()
+                )
+            )
+        except OSError as err:
+            RELOADS.inc(outcome="invalid")
+            return ReloadReport(error="cannot read: %s" % err)
+        except Exception as err:  # e.g. a settings file that won't parse
+            RELOADS.inc(outcome="invalid")
+            # The message may quote the input; it goes to the local log only.
+            getLogger("default").exception("Settings reload failed")
+            return ReloadReport(error="cannot load: %s" % type(err).__name__)
+
+        current = self._settings
+        changed = [
+            name
+            for name in type(current).model_fields
+            if getattr(new, name) != getattr(current, name)
+        ]
+        applied: list[str] = []
+
+        watcher = [name for name in changed if name in WATCHER_SETTINGS]
+        if watcher:
+            self._watcher.reconfigure(
+                cron_delay=new.CRON_DELAY,
+                max_backoff=new.MAX_BACKOFF,
+                alert_after=new.ALERT_AFTER_FAILURES,
+            )
+            applied.extend(watcher)
+
+        channels = [name for name in changed if name in CHANNEL_SETTINGS]
+        # Built from the settings in effect with only the channel fields
+        # changed: a new bot token, say, must wait for the restart.
+        if channels and self._watcher.replace_notifiers(
+            self._notifiers(
+                current.model_copy(
+                    update={name: getattr(new, name) for name in channels}
+                )
+            )
+        ):
+            applied.extend(channels)
+
+        resolver = [name for name in changed if name in RESOLVER_SETTINGS]
+        if resolver and self._enricher is not None:
+            self._enricher.resolver.limiter.set_limits(
+                new.RESOLVE_MIN_INTERVAL,
+                new.RESOLVE_PER_HOUR,
+                new.RESOLVE_PER_DAY,
+            )
+            self._enricher.resolver.cache.set_ttls(
+                new.RESOLVE_POSITIVE_TTL, new.RESOLVE_NEGATIVE_TTL
+            )
+            self._enricher.poll_interval = new.RESOLVE_POLL_INTERVAL
+            applied.extend(resolver)
+
+        self._settings = current.model_copy(
+            update={name: getattr(new, name) for name in applied}
+        )
+        RELOADS.inc(outcome="ok")
+        return ReloadReport(
+            applied=tuple(applied),
+            restart=tuple(name for name in changed if name not in applied),
+        )
@@ -20,16 +20,29 @@ delivery.
 
 from dataclasses import dataclass
 from enum import Enum
-from json import JSONDecodeError, dump as json_dump, load as json_load
+from concurrent.futures import Future
+from json import JSONDecodeError, load as json_load
 from logging import getLogger
-from os import fsync, replace
 from pathlib import Path
-from time import time
+from time import perf_counter, time
 from typing import Any, Callable, Protocol
 
+from disk_io import DISK, DiskExecutor, write_json_atomic
+from metrics import counter, histogram
+
 HOUR = 3600.0
 DAY = 86400.0
 
+REFRESH_TOTAL = counter(
+    "palgate_resolver_refresh_total",
+    "Profile refreshes by outcome (deferred: held back by the limiter)",
+    ("outcome",),
+)
+LOOKUP_SECONDS = histogram(
+    "palgate_resolver_lookup_seconds",
+    "Duration of a raw phone-to-profile lookup",
+)
+
 
 @dataclass(frozen=True)
 class Profile:
@@ -117,12 +130,26 @@ class ProfileCache:
     A found profile is cached for ``positive_ttl`` (identities change rarely);
     a definitive miss for the shorter ``negative_ttl``, because a person may
     join Telegram or open their privacy later and we want to pick that up.
+
+    ``version`` changes whenever a lookup could answer differently than
+    before: a new or changed profile, an entry dropped. Refreshing an entry
+    with the same profile only extends it and keeps the version.
     """
 
     def __init__(self, positive_ttl: float, negative_ttl: float) -> None:
         self._positive_ttl = positive_ttl
         self._negative_ttl = negative_ttl
         self._entries: dict[str, _CacheEntry] = {}
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def set_ttls(self, positive_ttl: float, negative_ttl: float) -> None:
+        """New TTLs for entries put from now on; cached ones keep theirs."""
+        self._positive_ttl = positive_ttl
+        self._negative_ttl = negative_ttl
 
     def lookup(self, phone: str, now: float) -> Resolution | None:
         """A cached ``Resolution``, or ``None`` on a miss/expiry."""
@@ -131,6 +158,7 @@ class ProfileCache:
             return None
         if entry.expires_at <= now:
             del self._entries[phone]
+            self._version += 1
             return None
         if entry.profile is None:
             return Resolution(ResolveOutcome.ABSENT)
@@ -138,12 +166,17 @@ class ProfileCache:
 
     def put(self, phone: str, profile: Profile | None, now: float) -> None:
         ttl = self._positive_ttl if profile is not None else self._negative_ttl
+        previous = self._entries.get(phone)
+        if previous is None or previous.profile != profile:
+            self._version += 1
         self._entries[phone] = _CacheEntry(profile, now + ttl)
 
     def prune(self, now: float) -> None:
         expired = [k for k, e in self._entries.items() if e.expires_at <= now]
         for key in expired:
             del self._entries[key]
+        if expired:
+            self._version += 1
 
     def size(self, now: float) -> int:
         self.prune(now)
@@ -153,6 +186,7 @@ class ProfileCache:
         """Drop every entry; returns how many were dropped."""
         count = len(self._entries)
         self._entries.clear()
+        self._version += 1
         return count
 
     def snapshot(self, now: float) -> dict[str, Any]:
@@ -169,6 +203,7 @@ class ProfileCache:
 
     def restore(self, data: dict[str, Any], now: float) -> None:
         self._entries.clear()
+        self._version += 1
         for phone, raw in data.items():
             expires_at = float(raw["expires_at"])
             if expires_at <= now:
@@ -206,6 +241,13 @@ class RateLimiter:
         self._calls: list[float] = []
         self._cooldown_until = 0.0
 
+    def set_limits(self, min_interval: float, per_hour: int, per_day: int) -> None:
+        """New spacing and caps; the recorded calls and any open cooldown
+        count against them as before."""
+        self._min_interval = min_interval
+        self._per_hour = per_hour
+        self._per_day = per_day
+
     def _prune(self, now: float) -> None:
         cutoff = now - DAY
         self._calls = [t for t in self._calls if t > cutoff]
@@ -286,9 +328,22 @@ class CachingResolver:
         """Cache-only lookup; ``None`` on a miss."""
         return self._cache.lookup(phone, self._clock())
 
+    @property
+    def cache_version(self) -> int:
+        """Changes whenever ``cached`` may answer differently."""
+        return self._cache.version
+
     def cooldown_remaining(self) -> float:
         return self._limiter.cooldown_remaining(self._clock())
 
+    @property
+    def cache(self) -> ProfileCache:
+        return self._cache
+
+    @property
+    def limiter(self) -> RateLimiter:
+        return self._limiter
+
     def cache_size(self) -> int:
         return self._cache.size(self._clock())
 
@@ -313,8 +368,10 @@ class CachingResolver:
         """Fresh lookup that bypasses the cache read but not the limiter."""
         now = self._clock()
         if not self._limiter.try_acquire(now):
+            REFRESH_TOTAL.inc(outcome=ResolveOutcome.DEFERRED.value)
             return Resolution(ResolveOutcome.DEFERRED)
 
+        start = perf_counter()
         try:
             profile = await self._raw.resolve(phone)
         except FloodError as err:
@@ -332,6 +389,8 @@ class CachingResolver:
                 ResolveOutcome.RESOLVED if profile is not None else ResolveOutcome.ABSENT,
                 profile,
             )
+        LOOKUP_SECONDS.observe(perf_counter() - start)
+        REFRESH_TOTAL.inc(outcome=outcome.outcome.value)
         self._save()
         return outcome
 
@@ -367,15 +426,20 @@ class FileResolverStore:
     Lives on the data volume next to ``state.json`` so the cache and cooldown
     survive restarts. Writes go through a tmp file + ``rename`` so a crash
     mid-write cannot corrupt the previous snapshot; an unreadable file loads
-    as empty rather than taking the resolver down.
+    as empty rather than taking the resolver down. ``save`` only queues the
+    write on the ``DiskExecutor`` (snapshots land in order; a failure is
+    logged from there), so a lookup never waits for the disk.
     """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, disk: DiskExecutor = DISK) -> None:
         self._path = path
+        self._disk = disk
         self._log = getLogger("default")
         path.parent.mkdir(parents=True, exist_ok=True)
 
     def load(self) -> dict[str, Any]:
+        # Only read at startup; let snapshots still queued land first.
+        self._disk.flush()
         try:
             with open(self._path) as fp:
                 document = json_load(fp)
@@ -390,9 +454,10 @@ class FileResolverStore:
         return document
 
     def save(self, document: dict[str, Any]) -> None:
-        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
-        with open(tmp_path, "w") as fp:
-            json_dump(document, fp)
-            fp.flush()
-            fsync(fp.fileno())
-        replace(tmp_path, self._path)
+        written = self._disk.submit(write_json_atomic, self._path, document)
+        written.add_done_callback(self._report_failure)
+
+    def _report_failure(self, written: "Future[None]") -> None:
+        err = written.exception()
+        if err is not None:
+            self._log.warning("Cannot persist resolver state: %s" % err)
@@ -1,21 +1,42 @@
 from asyncio import FIRST_COMPLETED, Event, create_task, gather, wait
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from itertools import takewhile
 from logging import getLogger
 from pathlib import Path
 from random import uniform
-from time import time
+from time import perf_counter, time
 from typing import Sequence
 
+from pydantic import ValidationError
+
+from deadline import budget, expired
+from disk_io import DISK
 from enrich import Enricher
-from models import Item, LogItem
-from notify import Notifier, NotifyError
-from palgate import PalgateClient, PalgateError
+from lag import DELIVERED, FETCHED, LagStats, LagTracker
+from metrics import gauge, histogram
+from models import Entry, ItemResponse, LogItem
+from notify import MESSAGE_LIMIT, Notifier, NotifyError
+from outbox import DeliveryWorker, MemoryOutbox
+from palgate import InvalidResponseError, PalgateClient, PalgateError
 from state import StateStore
 
 # How far past the next planned poll the heartbeat stays valid; covers a
-# slow poll cycle (retries inside the client) plus scheduling slack.
+# slow poll cycle (at most CYCLE_BUDGET) plus scheduling slack.
 HEARTBEAT_MARGIN = 60
+# How long one poll cycle may take, retries included: past it the client
+# and the notifiers stop retrying and the cycle ends with what it got
+# through, well inside the heartbeat margin.
+CYCLE_BUDGET = 45
+
+POLL_SECONDS = histogram(
+    "palgate_poll_seconds",
+    "Duration of one poll cycle: fetch plus fan-out to every channel",
+    ("outcome",),
+)
+POLL_FAILURES = gauge(
+    "palgate_poll_consecutive_failures",
+    "Poll cycles failed in a row; 0 once a cycle catches every channel up",
+)
 
 
 def item_key(item: LogItem) -> str:
@@ -36,6 +57,10 @@ class WatcherStatus:
     last_ok_at: float | None
     next_poll_at: float | None
     channels: tuple[str, ...]
+    # Messages waiting in each channel's outbox; empty without an outbox.
+    queued: dict[str, int] = field(default_factory=dict)
+    # Gate-event-to-fetch/delivery quantiles over the last hour.
+    lag: tuple[LagStats, ...] = ()
 
 
 class GateWatcher:
@@ -46,6 +71,16 @@ class GateWatcher:
     on the next cycle; a duplicate is preferred over a lost notification.
     The polling loop never dies — failures escalate through exponential
     backoff and an alert to the ops log after ``alert_after`` bad cycles.
+
+    With an ``outbox`` the cycle only renders and journals each batch and
+    advances the marker; one ``DeliveryWorker`` per channel (see
+    ``workers``) sends from the journal, so polling never waits on a
+    channel.
+
+    A cycle runs under a ``cycle_budget`` deadline (see ``deadline``). A
+    channel it has no time left for is left behind, as after a failed
+    send, and catches up on the next cycle; a marker write that has started
+    is never cut off, so a delivered message is not sent again.
     """
 
     def __init__(
@@ -59,6 +94,10 @@ class GateWatcher:
         alert_after: int = 10,
         heartbeat_path: Path | None = None,
         enricher: Enricher | None = None,
+        message_limit: int = MESSAGE_LIMIT,
+        outbox: MemoryOutbox | None = None,
+        lag: LagTracker | None = None,
+        cycle_budget: float = CYCLE_BUDGET,
     ) -> None:
         self._source = source
         self._client = client
@@ -68,7 +107,26 @@ class GateWatcher:
         self._cron_delay = cron_delay
         self._max_backoff = max_backoff
         self._alert_after = alert_after
+        self._cycle_budget = cycle_budget
         self._heartbeat_path = heartbeat_path
+        self._message_limit = message_limit
+        self._outbox = outbox
+        self._lag = lag if lag is not None else LagTracker()
+        self._workers = (
+            tuple(
+                DeliveryWorker(
+                    notifier,
+                    outbox,
+                    enricher,
+                    retry_delay=max(cron_delay, 1),
+                    max_backoff=max_backoff,
+                    lag=self._lag,
+                )
+                for notifier in self._notifiers
+            )
+            if outbox is not None
+            else ()
+        )
         self._heartbeat_ok = True
         self._log = getLogger("log")
         self._local = getLogger("default")
@@ -80,6 +138,11 @@ class GateWatcher:
         self._last_poll_at: float | None = None
         self._last_ok_at: float | None = None
         self._next_poll_at: float | None = None
+        # The last response every channel was caught up on.
+        self._settled: ItemResponse | None = None
+        # Per channel, the keys of the pending entries whose fetch lag is
+        # already recorded; only the current page's are kept.
+        self._fetched: dict[str, frozenset[str]] = {}
 
     def status(self) -> WatcherStatus:
         return WatcherStatus(
@@ -91,8 +154,58 @@ class GateWatcher:
             last_ok_at=self._last_ok_at,
             next_poll_at=self._next_poll_at,
             channels=tuple(notifier.name for notifier in self._notifiers),
+            queued=(
+                {
+                    notifier.name: self._outbox.pending(notifier.name)
+                    for notifier in self._notifiers
+                }
+                if self._outbox is not None
+                else {}
+            ),
+            lag=self._lag.stats(),
         )
 
+    @property
+    def workers(self) -> tuple[DeliveryWorker, ...]:
+        """Per-channel outbox drainers to run next to ``run``; empty
+        without an outbox."""
+        return self._workers
+
+    def reconfigure(
+        self, cron_delay: float, max_backoff: float, alert_after: int
+    ) -> None:
+        """New poll timing. The sleep in progress runs out as planned; the
+        next delay or backoff is computed from the new values."""
+        self._cron_delay = cron_delay
+        self._max_backoff = max_backoff
+        self._alert_after = alert_after
+        for worker in self._workers:
+            worker.reconfigure(
+                retry_delay=max(cron_delay, 1), max_backoff=max_backoff
+            )
+
+    def replace_notifiers(self, notifiers: Sequence[Notifier]) -> bool:
+        """Deliver to ``notifiers`` from the next cycle on.
+
+        A channel keeps its marker by name, so a new one is primed on its
+        first poll and a re-pointed one (another chat) carries on where the
+        old one stopped. With an outbox each channel has a worker running
+        since startup: only notifiers of the same channels can be swapped,
+        and False (nothing changed) means a restart is needed.
+        """
+        notifiers = tuple(notifiers)
+        if self._outbox is not None:
+            by_name = {notifier.name: notifier for notifier in notifiers}
+            if set(by_name) != {worker.channel for worker in self._workers}:
+                return False
+            for worker in self._workers:
+                worker.reconfigure(notifier=by_name[worker.channel])
+        self._notifiers = notifiers
+        # A new channel has no marker yet; an unchanged log must not let
+        # the cycle skip priming it.
+        self._settled = None
+        return True
+
     def poke(self) -> None:
         """Request an immediate poll cycle (works even while paused)."""
         self._poke_requested = True
@@ -156,8 +269,9 @@ class GateWatcher:
                             % (self._source, failures, error)
                         )
                 self._failures = failures
+                POLL_FAILURES.set(failures)
 
-            self._touch_heartbeat(delay)
+            await self._touch_heartbeat(delay)
             self._next_poll_at = time() + delay
             await self._sleep(stop, delay)
 
@@ -177,16 +291,50 @@ class GateWatcher:
 
     async def poll_once(self) -> bool:
         """One fetch + fan-out cycle; True when every channel is caught up."""
-        response = await self._client.fetch_log()
-        items = response.log or []  # non-empty, enforced by ItemResponse
-        ok = True
-        for notifier in self._notifiers:
-            ok = await self._deliver(notifier, items) and ok
-        return ok
+        start = perf_counter()
+        outcome = "error"
+        try:
+            with budget(self._cycle_budget):
+                response = await self._client.fetch_log()
+                if response is self._settled:
+                    # The client hands back the very same response while
+                    # the log is unchanged, and every channel caught up on
+                    # it.
+                    outcome = "unchanged"
+                    return True
+                fetched_at = self._lag.now()
+                # Non-empty, enforced by ItemResponse.
+                items: Sequence[LogItem] = response.log or []
+                ok = True
+                try:
+                    for notifier in self._notifiers:
+                        delivered = await self._deliver(
+                            notifier, items, fetched_at
+                        )
+                        ok = delivered and ok
+                except ValidationError as err:
+                    # Entries are validated as the cycle reads them
+                    # (LazyLog).
+                    raise InvalidResponseError(
+                        "Model validation error: %s" % err
+                    ) from err
+                self._settled = response if ok else None
+                if ok:
+                    outcome = "caught_up"
+                else:
+                    outcome = "out_of_time" if expired() else "behind"
+                return ok
+        finally:
+            POLL_SECONDS.observe(perf_counter() - start, outcome=outcome)
 
     async def _deliver(
-        self, notifier: Notifier, items: Sequence[LogItem]
+        self,
+        notifier: Notifier,
+        items: Sequence[LogItem],
+        fetched_at: float | None = None,
     ) -> bool:
+        if self._out_of_time(notifier):
+            return False
         head_key = item_key(items[0])
         marker = await self._store.get_marker(self._source, notifier.name)
         if marker is None:
@@ -205,69 +353,149 @@ class GateWatcher:
             takewhile(lambda item: item_key(item) != marker, items)
         )
         if not new_items:
+            self._fetched.pop(notifier.name, None)
             return True
+        # A channel that keeps failing sees the same entries every cycle;
+        # their fetch lag is the first sighting's.
+        seen = self._fetched.get(notifier.name, frozenset())
+        keys = tuple(item_key(item) for item in new_items)
+        self._lag.observe(
+            FETCHED,
+            notifier.name,
+            (
+                item.time
+                for item, key in zip(new_items, keys)
+                if key not in seen
+            ),
+            fetched_at,
+        )
+        self._fetched[notifier.name] = frozenset(keys)
 
-        batch = tuple(Item.from_log_item(item) for item in reversed(new_items))
-        try:
-            await self.send_batch(notifier, batch)
-        except NotifyError as err:
-            if not err.permanent:
-                self._log.error(
-                    "Delivery to %s failed, will retry: %s"
-                    % (notifier.name, err)
+        oldest_first = new_items[::-1]
+        batch = tuple(Entry.from_log_item(item) for item in oldest_first)
+        expected = marker
+        landed = 0
+        for chunk in self.split_batch(batch):
+            if self._outbox is not None:
+                # Journaled before the marker moves; the channel's worker
+                # owns the delivery from here on.
+                await self._outbox.enqueue(
+                    notifier.name, self._render(chunk), chunk
                 )
+            elif self._out_of_time(notifier):
                 return False
-            # The channel will never accept this message — advancing the
-            # marker anyway keeps one poison batch from blocking the
-            # channel forever.
-            self._log.error(
-                "%s permanently rejected the batch, skipping it: %s"
-                % (notifier.name, err)
-            )
+            else:
+                try:
+                    await self._send_chunk(notifier, chunk)
+                except NotifyError as err:
+                    if not err.permanent:
+                        self._log.error(
+                            "Delivery to %s failed, will retry: %s"
+                            % (notifier.name, err)
+                        )
+                        return False
+                    # The channel will never accept this message —
+                    # advancing the marker anyway keeps one poison chunk
+                    # from blocking the channel forever.
+                    self._log.error(
+                        "%s permanently rejected %d entries, skipping them: %s"
+                        % (notifier.name, len(chunk), err)
+                    )
 
-        if not await self._store.advance(
-            self._source, notifier.name, marker, head_key
-        ):
-            self._log.error(
-                "Marker %s/%s moved concurrently, batch may repeat"
-                % (self._source, notifier.name)
-            )
+            # Advance per landed (or journaled) chunk: a failure halfway
+            # through a big catch-up batch resumes after the last confirmed
+            # message instead of resending the whole backlog.
+            landed += len(chunk)
+            chunk_key = item_key(oldest_first[landed - 1])
+            if not await self._store.advance(
+                self._source, notifier.name, expected, chunk_key
+            ):
+                self._log.error(
+                    "Marker %s/%s moved concurrently, batch may repeat"
+                    % (self._source, notifier.name)
+                )
+                return True
+            expected = chunk_key
+        return True
+
+    def _out_of_time(self, notifier: Notifier) -> bool:
+        """True once the cycle's deadline passed: the channel stops where
+        it is, with its marker after the last landed chunk."""
+        if not expired():
+            return False
+        self._local.warning(
+            "Poll cycle out of time, %s/%s catches up next cycle"
+            % (self._source, notifier.name)
+        )
         return True
 
+    def split_batch(self, batch: Sequence[Entry]) -> list[tuple[Entry, ...]]:
+        """Group a batch, oldest-first, into messages under the text limit.
+
+        Splits on entry (line) boundaries only. An entry that alone exceeds
+        the limit still gets a message of its own — the channel rejects it
+        permanently and the caller skips just that entry.
+        """
+        chunks: list[tuple[Entry, ...]] = []
+        current: list[Entry] = []
+        size = 0
+        for item in batch:
+            length = len(self._render((item,)))
+            if current and size + 1 + length > self._message_limit:
+                chunks.append(tuple(current))
+                current = []
+                size = 0
+            size += length + (1 if current else 0)
+            current.append(item)
+        if current:
+            chunks.append(tuple(current))
+        return chunks
+
     async def send_batch(
-        self, notifier: Notifier, batch: Sequence[Item]
+        self, notifier: Notifier, batch: Sequence[Entry]
     ) -> None:
         """Render and deliver a batch through the standard channel path.
 
         Shared by the poll cycle and injected entries (the ops bot's /mock):
         the enricher folds cached identities into the text and queues the
-        rest for background resolution, exactly like a polled batch. Markers
-        are the caller's business — this method only delivers. Raises
-        ``NotifyError`` when the channel refused the message.
+        rest for background resolution, exactly like a polled batch. A batch
+        over the message limit goes out as several messages. Markers are the
+        caller's business — this method only delivers. Raises ``NotifyError``
+        when the channel refused a message; earlier chunks stay delivered.
         """
-        if self._enricher is not None:
-            message = self._enricher.render(batch)
-        else:
-            message = "\n".join(str(item) for item in batch)
+        for chunk in self.split_batch(batch):
+            await self._send_chunk(notifier, chunk)
+
+    async def _send_chunk(
+        self, notifier: Notifier, chunk: Sequence[Entry]
+    ) -> None:
+        message = self._render(chunk)
         message_id = await notifier.send(message)
         self._local.info("Delivered to %s:\n%s" % (notifier.name, message))
-        # Best-effort: queue the batch for identity enrichment. A failure
+        self._lag.observe(
+            DELIVERED, notifier.name, (item.time for item in chunk)
+        )
+        # Best-effort: queue the chunk for identity enrichment. A failure
         # here must never affect the caller's marker advance.
         if self._enricher is not None and message_id is not None:
-            self._enricher.track(notifier, message_id, batch)
+            self._enricher.track(notifier, message_id, chunk)
+
+    def _render(self, items: Sequence[Entry]) -> str:
+        if self._enricher is not None:
+            return self._enricher.render(items)
+        return "\n".join(str(item) for item in items)
 
     def _backoff(self, failures: int) -> float:
         base = float(max(self._cron_delay, 1))
         capped = min(self._max_backoff, base * float(2 ** (failures - 1)))
         return capped * uniform(1.0, 1.25)
 
-    def _touch_heartbeat(self, next_delay: float) -> None:
+    async def _touch_heartbeat(self, next_delay: float) -> None:
         if self._heartbeat_path is None:
             return
         deadline = time() + next_delay + HEARTBEAT_MARGIN
         try:
-            self._heartbeat_path.parent.mkdir(parents=True, exist_ok=True)
-            self._heartbeat_path.write_text("%f" % deadline)
+            await DISK.run(_write_heartbeat, self._heartbeat_path, deadline)
         except OSError as err:
             # A broken heartbeat only degrades the healthcheck signal; it
             # must not take the polling loop down with it. The first
@@ -283,3 +511,8 @@ class GateWatcher:
             if not self._heartbeat_ok:
                 self._log.info("Heartbeat restored")
             self._heartbeat_ok = True
+
+
+def _write_heartbeat(path: Path, deadline: float) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("%f" % deadline)
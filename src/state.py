@@ -1,11 +1,12 @@
 from fcntl import LOCK_EX, LOCK_NB, LOCK_UN, flock
-from json import JSONDecodeError, dump as json_dump, load as json_load
+from json import JSONDecodeError, load as json_load
 from logging import getLogger
-from os import fsync, replace
 from pathlib import Path
 from time import monotonic, sleep
 from typing import Any, Protocol, TextIO
 
+from disk_io import DISK, DiskExecutor, write_json_atomic
+
 STATE_VERSION = 1
 
 
@@ -52,11 +53,13 @@ class FileStateStore:
     started during a deploy waits in ``acquire_lock`` until the previous one
     shuts down, so there is never more than one writer per state file.
     Writes are atomic (tmp file + rename) — a crash mid-write cannot corrupt
-    the previous state.
+    the previous state. File access runs on the ``DiskExecutor``; ``advance``
+    is one job (read, compare, write), so the swap stays atomic there too.
     """
 
-    def __init__(self, path: Path) -> None:
+    def __init__(self, path: Path, disk: DiskExecutor = DISK) -> None:
         self._path = path
+        self._disk = disk
         self._lock_path = path.with_suffix(path.suffix + ".lock")
         self._lock_file: TextIO | None = None
         self._log = getLogger("default")
@@ -87,12 +90,20 @@ class FileStateStore:
         self._lock_file = None
 
     async def get_marker(self, source: str, channel: str) -> str | None:
-        channels = self._channels(self._read(), source)
+        document = await self._disk.run(self._read)
+        channels = self._channels(document, source)
         marker = channels.get(channel, {}).get("last_key")
         return marker if isinstance(marker, str) else None
 
     async def advance(
         self, source: str, channel: str, expected: str | None, new: str
+    ) -> bool:
+        return await self._disk.run(
+            self._compare_and_write, source, channel, expected, new
+        )
+
+    def _compare_and_write(
+        self, source: str, channel: str, expected: str | None, new: str
     ) -> bool:
         document = self._read()
         channels = self._channels(document, source)
@@ -100,7 +111,7 @@ class FileStateStore:
         if current != expected:
             return False
         channels[channel] = {"last_key": new}
-        self._write(document)
+        write_json_atomic(self._path, document)
         return True
 
     @staticmethod
@@ -128,14 +139,6 @@ class FileStateStore:
             return self._empty()
         return document
 
-    def _write(self, document: dict[str, Any]) -> None:
-        tmp_path = self._path.with_suffix(self._path.suffix + ".tmp")
-        with open(tmp_path, "w") as fp:
-            json_dump(document, fp)
-            fp.flush()
-            fsync(fp.fileno())
-        replace(tmp_path, self._path)
-
     @staticmethod
     def _empty() -> dict[str, Any]:
         return {"version": STATE_VERSION, "sources": {}}
@@ -1,15 +1,24 @@
 from asyncio import Event, create_task, sleep, wait_for
 from datetime import timedelta, timezone
+from json import loads as json_loads
 from typing import Any, Callable, Dict, List
 
 import pytest
 from httpx import AsyncClient, ConnectError, MockTransport, Request, Response
 
 import bot as bot_module
-from bot import OpsBot, format_duration
+from bot import (
+    CommandExecutor,
+    OpsBot,
+    WebhookConfig,
+    format_duration,
+    format_profile,
+)
 from github_client import GithubError, Release
 from notify import NotifyError
 from palgate import TransientFetchError
+from profiler import AllocationStat, FunctionStat, Profile
+from reload import ReloadReport
 from service import GateWatcher
 from state import MemoryStateStore
 from tests.conftest import (
@@ -47,9 +56,14 @@ class TelegramServerMock:
         self.batches: List[Any] = []
         self.requests: List[Request] = []
         self.on_empty: Callable[[], None] | None = None
+        self.webhook_responses: List[Response] = []
 
     def handler(self, request: Request) -> Response:
         self.requests.append(request)
+        if request.url.path.endswith(("/setWebhook", "/deleteWebhook")):
+            if self.webhook_responses:
+                return self.webhook_responses.pop(0)
+            return Response(200, json={"ok": True, "result": True})
         if request.url.path.endswith("/getMe"):
             result: Dict[str, Any] = {"id": 1, "is_bot": True}
             if self.username is not None:
@@ -94,6 +108,18 @@ class FakeResolver:
         return cleared
 
 
+class FakeReloader:
+    """SettingsReloader test double: hands out a fixed report."""
+
+    def __init__(self, report: ReloadReport) -> None:
+        self._report = report
+        self.reloads = 0
+
+    def reload(self) -> ReloadReport:
+        self.reloads += 1
+        return self._report
+
+
 def make_release(
     tag: str,
     title: str | None = None,
@@ -164,6 +190,8 @@ def make_bot(
     mock_notifier: RecordingNotifier | None = None,
     enricher: StubEnricher | None = None,
     resolver: FakeResolver | None = None,
+    reloader: FakeReloader | None = None,
+    webhook: WebhookConfig | None = None,
 ) -> tuple[OpsBot, GateWatcher, ScriptedPalgateClient, RecordingNotifier,
            TelegramServerMock, Event]:
     server = TelegramServerMock(username=username)
@@ -195,6 +223,8 @@ def make_bot(
         github=github,
         mock_notifier=mock_notifier,
         resolver=resolver,  # type: ignore[arg-type]
+        reloader=reloader,  # type: ignore[arg-type]
+        webhook=webhook,
     )
     return ops_bot, watcher, client, replier, server, stop
 
@@ -312,6 +342,27 @@ class TestStatusCommand:
         reply = replier.sent[0]
         assert "Source gate: paused" in reply
         assert "telegram: not primed" in reply
+        assert "Lag since" not in reply
+
+    @pytest.mark.asyncio
+    async def test_status_reports_the_lag_quantiles(self) -> None:
+        ops_bot, watcher, _, replier, _, stop = make_bot(
+            [[make_update(1, "/status")]],
+            watcher_script=[
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+        )
+        await watcher.poll_once()
+        await watcher.poll_once()
+
+        await run_bot(ops_bot, stop)
+
+        reply = replier.sent[0]
+        assert "Lag since the gate event (last hour):" in reply
+        assert "fetched telegram: p50" in reply
+        assert "delivered telegram: p50" in reply
+        assert "(1 entries)" in reply
 
 
 class TestLogCommand:
@@ -1029,6 +1080,101 @@ class TestResolveCommand:
         assert "/resolve" in replier.sent[0]
 
 
+PROFILE = Profile(
+    seconds=10,
+    samples=200,
+    idle=150,
+    top_self=(FunctionStat("GateWatcher.poll_once (service.py:120)", 40),),
+    top_total=(FunctionStat("GateWatcher.run (service.py:160)", 50),),
+    allocations=(AllocationStat("models.py:30", 3 * 1024, 12),),
+)
+
+
+class TestReloadCommand:
+    @pytest.mark.asyncio
+    async def test_replies_with_the_report(self) -> None:
+        reloader = FakeReloader(
+            ReloadReport(applied=("CRON_DELAY",), restart=("DEVICE_ID",))
+        )
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/reload")]], reloader=reloader
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert reloader.reloads == 1
+        assert replier.sent == [
+            "Settings reloaded; applied: CRON_DELAY; "
+            "need a restart: DEVICE_ID."
+        ]
+
+    @pytest.mark.asyncio
+    async def test_error_is_escaped(self) -> None:
+        reloader = FakeReloader(ReloadReport(error="cannot read: <x>"))
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/reload")]], reloader=reloader
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert replier.sent == ["Settings not reloaded: cannot read: &lt;x&gt;."]
+
+    @pytest.mark.asyncio
+    async def test_without_a_reloader(self) -> None:
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/reload")]]
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert replier.sent == ["Settings reload is not available."]
+
+
+class TestProfileCommand:
+    @pytest.mark.asyncio
+    async def test_profiles_for_the_requested_window(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        windows: List[float] = []
+
+        async def fake_profile(seconds: float) -> Profile:
+            windows.append(seconds)
+            return PROFILE
+
+        monkeypatch.setattr(bot_module, "profile_loop", fake_profile)
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/profile 3"), make_update(2, "/profile 999")]]
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert windows == [3, bot_module.MAX_PROFILE_SECONDS]
+        assert "poll_once" in replier.sent[0]
+
+    @pytest.mark.asyncio
+    async def test_non_numeric_window_shows_usage(self) -> None:
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/profile soon")]]
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert "Usage: /profile [seconds]" in replier.sent[0]
+
+    def test_format_reports_shares_of_busy_samples(self) -> None:
+        text = format_profile(PROFILE)
+
+        assert "busy 25%" in text
+        assert " 80% GateWatcher.poll_once (service.py:120)" in text
+        assert "100% GateWatcher.run (service.py:160)" in text
+        assert "3.0 KiB in 12 block(s) at models.py:30" in text
+
+    def test_format_idle_loop(self) -> None:
+        idle = Profile(10, 100, 100, (), (), ())
+
+        assert "idle the whole time" in format_profile(idle)
+
+
 class TestPromoteCommand:
     @pytest.mark.asyncio
     async def test_unconfigured_promote_is_refused(self) -> None:
@@ -1171,6 +1317,274 @@ class TestLoopResilience:
         await wait_for(task, timeout=1)
 
 
+WEBHOOK_SECRET = "s3cret-token"
+
+
+class TestWebhookMode:
+    def make_webhook_bot(
+        self,
+    ) -> tuple[OpsBot, RecordingNotifier, TelegramServerMock, Event]:
+        ops_bot, _, _, replier, server, stop = make_bot(
+            [],
+            webhook=WebhookConfig(
+                url="https://ops.example.com/tg/hook",
+                secret=WEBHOOK_SECRET,
+                host="127.0.0.1",
+                port=0,
+            ),
+        )
+        server.on_empty = None
+        return ops_bot, replier, server, stop
+
+    async def start(self, ops_bot: OpsBot, stop: Event) -> Any:
+        task = create_task(ops_bot.run(stop))
+        for _ in range(100):
+            if ops_bot.webhook_port is not None:
+                break
+            await sleep(0.01)
+        return task
+
+    async def push(
+        self,
+        ops_bot: OpsBot,
+        update: Any,
+        secret: str = WEBHOOK_SECRET,
+        path: str = "/tg/hook",
+    ) -> Response:
+        async with AsyncClient() as http:
+            return await http.post(
+                "http://127.0.0.1:%d%s" % (ops_bot.webhook_port, path),
+                json=update,
+                headers={"X-Telegram-Bot-Api-Secret-Token": secret},
+            )
+
+    @pytest.mark.asyncio
+    async def test_webhook_is_registered_with_the_secret(self) -> None:
+        ops_bot, _, server, stop = self.make_webhook_bot()
+
+        task = await self.start(ops_bot, stop)
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        registrations = [
+            json_loads(request.content)
+            for request in server.requests
+            if request.url.path.endswith("/setWebhook")
+        ]
+        assert registrations == [
+            {
+                "url": "https://ops.example.com/tg/hook",
+                "secret_token": WEBHOOK_SECRET,
+                "allowed_updates": ["message"],
+            }
+        ]
+        assert server.update_requests() == []  # no long poll in this mode
+
+    @pytest.mark.asyncio
+    async def test_pushed_command_is_handled(self) -> None:
+        ops_bot, replier, _, stop = self.make_webhook_bot()
+        task = await self.start(ops_bot, stop)
+
+        response = await self.push(ops_bot, make_update(1, "/help"))
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert response.status_code == 200
+        assert len(replier.sent) == 1
+        assert "/status" in replier.sent[0]
+
+    @pytest.mark.asyncio
+    async def test_bad_secret_is_rejected(self) -> None:
+        ops_bot, replier, _, stop = self.make_webhook_bot()
+        task = await self.start(ops_bot, stop)
+
+        response = await self.push(
+            ops_bot, make_update(1, "/help"), secret="wrong"
+        )
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert response.status_code == 403
+        assert replier.sent == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_path_and_bad_json_are_rejected(self) -> None:
+        ops_bot, replier, _, stop = self.make_webhook_bot()
+        task = await self.start(ops_bot, stop)
+
+        wrong_path = await self.push(
+            ops_bot, make_update(1, "/help"), path="/other"
+        )
+        bad_json = await self.push(ops_bot, ["not", "an", "update"])
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert wrong_path.status_code == 404
+        assert bad_json.status_code == 400
+        assert replier.sent == []
+
+    @pytest.mark.asyncio
+    async def test_redelivered_update_is_handled_once(self) -> None:
+        ops_bot, replier, _, stop = self.make_webhook_bot()
+        task = await self.start(ops_bot, stop)
+
+        await self.push(ops_bot, make_update(5, "/help"))
+        await self.push(ops_bot, make_update(5, "/help"))
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert len(replier.sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_registration_is_retried(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(bot_module, "ERROR_BACKOFF", 0.01)
+        ops_bot, _, server, stop = self.make_webhook_bot()
+        server.webhook_responses = [Response(500, text="try later")]
+
+        task = await self.start(ops_bot, stop)
+        await sleep(0.1)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        attempts = [
+            request
+            for request in server.requests
+            if request.url.path.endswith("/setWebhook")
+        ]
+        assert len(attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_long_poll_drops_a_leftover_webhook(self) -> None:
+        ops_bot, _, _, _, server, stop = make_bot(
+            [
+                Response(
+                    409,
+                    json={
+                        "ok": False,
+                        "description": "Conflict: can't use getUpdates "
+                        "method while webhook is active",
+                    },
+                ),
+                [make_update(1, "/help")],
+            ]
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert any(
+            request.url.path.endswith("/deleteWebhook")
+            for request in server.requests
+        )
+
+
+class GatedGithubClient(ScriptedGithubClient):
+    """Release listing blocks until ``gate`` is set."""
+
+    def __init__(self, tags: List[str]) -> None:
+        super().__init__(tags=tags)
+        self.gate = Event()
+
+    async def releases(self, limit: int = 5) -> List[Release]:
+        await self.gate.wait()
+        return await super().releases(limit)
+
+
+class TestCommandExecutor:
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self) -> None:
+        executor = CommandExecutor(limit=2)
+        gate = Event()
+        running: List[int] = []
+        peak: List[int] = []
+
+        def job(index: int) -> Callable[[], Any]:
+            async def run() -> None:
+                running.append(index)
+                peak.append(len(running))
+                await gate.wait()
+                running.remove(index)
+
+            return run
+
+        for index in range(5):
+            executor.submit(job(index))
+        await sleep(0.01)
+        assert len(running) == 2
+        gate.set()
+        await executor.drain(1)
+
+        assert max(peak) == 2
+        assert executor.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_lane_keeps_arrival_order(self) -> None:
+        executor = CommandExecutor()
+        order: List[str] = []
+
+        def job(label: str, delay: float) -> Callable[[], Any]:
+            async def run() -> None:
+                await sleep(delay)
+                order.append(label)
+
+            return run
+
+        executor.submit(job("first", 0.03), "control")
+        executor.submit(job("free", 0), None)
+        executor.submit(job("second", 0), "control")
+        await executor.drain(1)
+
+        assert order == ["free", "first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_drain_cancels_what_outlives_the_grace(self) -> None:
+        executor = CommandExecutor()
+        executor.submit(Event().wait)
+
+        await executor.drain(0.01)
+
+        assert executor.in_flight == 0
+
+
+class TestConcurrentCommands:
+    @pytest.mark.asyncio
+    async def test_slow_command_does_not_block_status(self) -> None:
+        github = GatedGithubClient(tags=["1.2.3"])
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/versions"), make_update(2, "/status")]],
+            github=github,
+        )
+
+        task = create_task(ops_bot.run(stop))
+        await sleep(0.05)
+        assert len(replier.sent) == 1
+        assert "palgate-tg-notify" in replier.sent[0]
+        github.gate.set()
+        await wait_for(task, timeout=1)
+
+        assert "Releases" in replier.sent[1]
+
+    @pytest.mark.asyncio
+    async def test_timed_out_command_gets_a_reply(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(bot_module, "SLOW_COMMAND_TIMEOUT", 0.01)
+        ops_bot, _, _, replier, _, stop = make_bot(
+            [[make_update(1, "/versions")]],
+            github=GatedGithubClient(tags=["1.2.3"]),
+        )
+
+        await run_bot(ops_bot, stop)
+
+        assert len(replier.sent) == 1
+        assert "/versions timed out" in replier.sent[0]
+
+
 class TestFormatDuration:
     def test_seconds_only(self) -> None:
         assert format_duration(42) == "42s"
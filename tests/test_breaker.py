@@ -0,0 +1,199 @@
+from contextlib import AbstractContextManager
+from typing import List
+
+import pytest
+
+from breaker import (
+    CIRCUIT_REJECTED,
+    CIRCUIT_STATE,
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    guarded,
+)
+from deadline import budget
+
+
+def make_breaker(
+    now: List[float], failures: int = 3, cooldown: float = 60
+) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test", failures=failures, cooldown=cooldown, clock=lambda: now[0]
+    )
+
+
+class CallError(Exception):
+    def __init__(self, message: str, transient: bool = True) -> None:
+        super().__init__(message)
+        self.transient = transient
+
+
+def guard(breaker: CircuitBreaker | None) -> AbstractContextManager[bool]:
+    return guarded(breaker, CallError, lambda err: err.transient, CallError)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    while breaker.state != OPEN:
+        breaker.check()
+        breaker.failed()
+
+
+class TestCircuitBreaker:
+    def test_closed_admits_calls(self) -> None:
+        breaker = make_breaker([0.0])
+
+        assert breaker.check() is False
+        assert breaker.state == CLOSED
+        assert CIRCUIT_STATE.value(endpoint="test") == 0
+
+    def test_opens_after_consecutive_failures(self) -> None:
+        breaker = make_breaker([0.0], failures=3)
+        for _ in range(2):
+            breaker.check()
+            breaker.failed()
+        assert breaker.state == CLOSED
+
+        breaker.check()
+        breaker.failed()
+
+        assert breaker.state == OPEN
+        assert CIRCUIT_STATE.value(endpoint="test") == 2
+
+    def test_a_success_resets_the_count(self) -> None:
+        breaker = make_breaker([0.0], failures=2)
+        breaker.failed()
+        breaker.succeeded()
+        breaker.failed()
+
+        assert breaker.state == CLOSED
+
+    def test_open_rejects_until_the_cooldown_passes(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        rejected = CIRCUIT_REJECTED.value(endpoint="test")
+        now[0] = 45
+
+        with pytest.raises(CircuitOpenError, match="next probe in 15s") as info:
+            breaker.check()
+
+        assert info.value.retry_in == pytest.approx(15)
+        assert CIRCUIT_REJECTED.value(endpoint="test") == rejected + 1
+
+    def test_one_probe_after_the_cooldown(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+
+        assert breaker.check() is True
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError, match="probe in flight"):
+            breaker.check()
+
+    def test_successful_probe_closes(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+        breaker.check()
+
+        breaker.succeeded()
+
+        assert breaker.state == CLOSED
+        assert breaker.check() is False
+
+    def test_failed_probe_opens_for_another_cooldown(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=3, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+        breaker.check()
+
+        breaker.failed()
+
+        assert breaker.state == OPEN
+        assert breaker.retry_in() == pytest.approx(60)
+
+    def test_released_probe_lets_the_next_call_probe(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+        breaker.check()
+
+        breaker.released()
+
+        assert breaker.state == OPEN
+        assert breaker.check() is True
+
+
+class TestGuarded:
+    def test_without_a_breaker_the_call_just_runs(self) -> None:
+        with guard(None) as probe:
+            assert probe is False
+
+    def test_a_transient_error_is_a_failed_call(self) -> None:
+        breaker = make_breaker([0.0], failures=1)
+
+        with pytest.raises(CallError), guard(breaker):
+            raise CallError("down")
+
+        assert breaker.state == OPEN
+
+    def test_a_failure_past_the_deadline_is_not_counted(self) -> None:
+        breaker = make_breaker([0.0], failures=1)
+
+        # The attempt's timeout was clipped to the time left and ran out.
+        with pytest.raises(CallError), budget(0), guard(breaker):
+            raise CallError("timed out")
+
+        assert breaker.state == CLOSED
+
+    def test_a_probe_cut_off_by_the_deadline_is_released(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+
+        with pytest.raises(CallError), budget(0), guard(breaker):
+            raise CallError("timed out")
+
+        assert breaker.state == OPEN
+        assert breaker.check() is True
+
+    def test_an_answer_is_a_success_even_as_an_error(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+
+        with pytest.raises(CallError), guard(breaker) as probe:
+            assert probe is True
+            raise CallError("rejected", transient=False)
+
+        assert breaker.state == CLOSED
+
+    def test_any_other_exception_releases_the_probe(self) -> None:
+        now = [0.0]
+        breaker = make_breaker(now, failures=1, cooldown=60)
+        trip(breaker)
+        now[0] = 60
+
+        with pytest.raises(KeyError), guard(breaker):
+            raise KeyError("cancelled")
+
+        assert breaker.state == OPEN
+        assert breaker.check() is True
+
+    def test_a_refused_call_raises_the_callers_error(self) -> None:
+        breaker = make_breaker([0.0], failures=1)
+        trip(breaker)
+
+        with pytest.raises(CallError, match="circuit open") as info:
+            with guard(breaker):
+                pass
+
+        assert isinstance(info.value.__cause__, CircuitOpenError)
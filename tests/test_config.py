@@ -1,7 +1,9 @@
+from pathlib import Path
+
 import pytest
 from pydantic import ValidationError
 
-from config import Settings
+from config import Settings, load_settings
 
 
 class TestSettingsValidation:
@@ -84,3 +86,72 @@ class TestSettingsValidation:
     def test_unknown_role_is_rejected(self, settings: Settings) -> None:
         with pytest.raises(ValidationError):
             Settings(**{**settings.model_dump(), "SERVICE_ROLE": "staging"})
+
+    def test_loop_monitor_is_on_by_default(self, settings: Settings) -> None:
+        assert settings.LOOP_STALL_THRESHOLD == 0.5
+
+    def test_webhook_is_off_by_default(self, settings: Settings) -> None:
+        assert settings.BOT_WEBHOOK_URL == ""
+        assert settings.BOT_WEBHOOK_PORT == 8080
+
+    def test_webhook_requires_a_secret(self, settings: Settings) -> None:
+        with pytest.raises(ValidationError, match="BOT_WEBHOOK_SECRET"):
+            Settings(
+                **{
+                    **settings.model_dump(),
+                    "BOT_WEBHOOK_URL": "https://bot.example.com/hook",
+                }
+            )
+
+    def test_webhook_secret_charset_is_checked(
+        self, settings: Settings
+    ) -> None:
+        with pytest.raises(ValidationError):
+            Settings(
+                **{**settings.model_dump(), "BOT_WEBHOOK_SECRET": "no spaces"}
+            )
+
+
+class TestLoadSettings:
+    @pytest.fixture
+    def settings_file(
+        self,
+        settings: Settings,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> Path:
+        path = tmp_path / "settings.env"
+        for name, value in settings.model_dump(mode="json").items():
+            monkeypatch.setenv(name, str(value))
+        monkeypatch.setenv("SETTINGS_FILE", str(path))
+        return path
+
+    def test_without_the_file_the_environment_is_used(
+        self, settings_file: Path
+    ) -> None:
+        assert load_settings().CRON_DELAY == 60
+
+    def test_the_file_overrides_the_environment(
+        self, settings_file: Path
+    ) -> None:
+        settings_file.write_text("CRON_DELAY=15\nMAX_CHAT_ID=42\n")
+
+        loaded = load_settings()
+
+        assert loaded.CRON_DELAY == 15
+        assert loaded.MAX_CHAT_ID == 42
+        assert loaded.DEVICE_ID == "test_device"
+
+    def test_a_required_field_may_come_from_the_file_alone(
+        self, settings_file: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.delenv("TELEGRAM_CHAT_ID")
+        settings_file.write_text("TELEGRAM_CHAT_ID=-1007\n")
+
+        assert load_settings().TELEGRAM_CHAT_ID == -1007
+
+    def test_the_file_is_validated(self, settings_file: Path) -> None:
+        settings_file.write_text("CRON_DELAY=-1\n")
+
+        with pytest.raises(ValidationError, match="CRON_DELAY"):
+            load_settings()
@@ -0,0 +1,35 @@
+from deadline import budget, clip_timeout, expired, remaining, time_for
+
+
+class TestBudget:
+    def test_no_deadline_outside_a_budget(self) -> None:
+        assert remaining() is None
+        assert expired() is False
+        assert clip_timeout(5) == 5
+        assert time_for(3600) is True
+
+    def test_a_budget_bounds_timeouts_and_sleeps(self) -> None:
+        with budget(10):
+            left = remaining()
+            assert left is not None and 9 < left <= 10
+            assert clip_timeout(5) == 5
+            assert clip_timeout(30) <= 10
+            assert time_for(1) is True
+            assert time_for(10) is False
+
+        assert remaining() is None
+
+    def test_a_spent_budget_is_expired(self) -> None:
+        with budget(0):
+            assert expired() is True
+            assert clip_timeout(5) == 0
+            assert time_for(0) is False
+
+    def test_a_nested_budget_never_extends_the_outer_one(self) -> None:
+        with budget(1):
+            with budget(60):
+                left = remaining()
+                assert left is not None and left <= 1
+            with budget(0):
+                assert expired() is True
+            assert expired() is False
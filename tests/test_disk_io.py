@@ -0,0 +1,100 @@
+from asyncio import CancelledError, create_task, gather, sleep as sleep_async
+from pathlib import Path
+from threading import Event as ThreadEvent, get_ident
+from time import sleep
+
+import pytest
+
+from disk_io import DiskExecutor, write_json_atomic
+from state import FileStateStore
+
+
+class TestDiskExecutor:
+    @pytest.mark.asyncio
+    async def test_jobs_run_off_the_loop_thread(self) -> None:
+        disk = DiskExecutor()
+
+        worker = await disk.run(get_ident)
+
+        assert worker != get_ident()
+
+    @pytest.mark.asyncio
+    async def test_jobs_run_in_submission_order(self) -> None:
+        disk = DiskExecutor()
+        done: list[int] = []
+
+        def job(n: int, delay: float) -> None:
+            sleep(delay)
+            done.append(n)
+
+        await gather(
+            disk.run(job, 1, 0.05), disk.run(job, 2, 0), disk.run(job, 3, 0)
+        )
+
+        assert done == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_loop_keeps_running_while_a_job_blocks(self) -> None:
+        disk = DiskExecutor()
+        release = ThreadEvent()
+        blocked = create_task(disk.run(release.wait, 1))
+        await sleep_async(0.01)
+
+        # Only a free loop gets here before the job's one-second timeout.
+        release.set()
+
+        assert await blocked is True
+
+    @pytest.mark.asyncio
+    async def test_a_queued_job_survives_a_cancelled_caller(self) -> None:
+        disk = DiskExecutor()
+        release = ThreadEvent()
+        done: list[str] = []
+        disk.submit(release.wait, 1)
+        caller = create_task(disk.run(done.append, "written"))
+        await sleep_async(0.01)
+
+        caller.cancel()
+        with pytest.raises(CancelledError):
+            await caller
+        release.set()
+        await disk.drain()
+
+        assert done == ["written"]
+
+    def test_flush_waits_for_queued_jobs(self) -> None:
+        disk = DiskExecutor()
+        done: list[str] = []
+        disk.submit(lambda: (sleep(0.05), done.append("written")))
+
+        disk.flush()
+
+        assert done == ["written"]
+
+
+class TestWriteJsonAtomic:
+    def test_replaces_the_file_without_leftovers(self, tmp_path: Path) -> None:
+        path = tmp_path / "doc.json"
+        path.write_text("old")
+
+        write_json_atomic(path, {"a": 1})
+
+        assert path.read_text() == '{"a": 1}'
+        assert [p.name for p in tmp_path.iterdir()] == ["doc.json"]
+
+
+class TestSlowVolume:
+    @pytest.mark.asyncio
+    async def test_concurrent_advances_keep_cas_semantics(
+        self, tmp_path: Path
+    ) -> None:
+        store = FileStateStore(tmp_path / "state.json", disk=DiskExecutor())
+
+        results = await gather(
+            *(store.advance("gate", "telegram", None, "k%d" % n)
+              for n in range(5))
+        )
+
+        assert results.count(True) == 1
+        winner = "k%d" % results.index(True)
+        assert await store.get_marker("gate", "telegram") == winner
@@ -5,7 +5,7 @@ import pytest
 
 from tests.conftest import BASE_LOG_ITEM_DATA, RecordingNotifier
 from enrich import Enricher
-from models import Item
+from models import Entry, LogItem
 from notify import NotifyError
 from resolver import (
     CachingResolver,
@@ -41,10 +41,10 @@ class ScriptedRawResolver:
         return result
 
 
-def make_item(phone: str, first: str = "John", last: str = "Doe") -> Item:
+def make_item(phone: str, first: str = "John", last: str = "Doe") -> Entry:
     data = dict(BASE_LOG_ITEM_DATA)
     data.update({"sn": phone, "userId": "0", "firstname": first, "lastname": last})
-    return Item(**data)
+    return Entry.from_log_item(LogItem(**data))
 
 
 NEO = Profile(user_id=42, username="neo", firstname="Thomas", lastname="Anderson")
@@ -118,6 +118,36 @@ class TestRender:
             ' → <a href="https://t.me/+79001234567">✈️ A&lt;b&gt; X</a>'
         )
 
+    @pytest.mark.asyncio
+    async def test_line_is_rendered_again_only_when_the_cache_changes(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        enricher, _, resolver = build({"79001234567": NEO}, Clock())
+        rendered: List[Entry] = []
+        render_line = enricher._render_line
+
+        def counting(item: Entry) -> str:
+            rendered.append(item)
+            return render_line(item)
+
+        monkeypatch.setattr(enricher, "_render_line", counting)
+        item = make_item("79001234567")
+        plain = enricher.render([item])
+        assert enricher.render([item]) == plain
+        assert rendered == [item]
+
+        await resolver.resolve("79001234567")
+        assert enricher.render([item]).endswith("✈️ Thomas Anderson</a>")
+        assert len(rendered) == 2
+
+    def test_lines_are_forgotten_with_their_items(self) -> None:
+        enricher, _, _ = build({}, Clock())
+        item = make_item("79001234567")
+        enricher.render([item])
+        assert len(enricher._lines) == 1
+        del item
+        assert enricher._lines == {}
+
 
 class TestTrack:
     def test_no_enqueue_when_all_known(self) -> None:
@@ -208,6 +238,26 @@ class TestDogon:
         assert raw.calls == ["79001234567"]
         assert len(enricher._queue) == 1
 
+    @pytest.mark.asyncio
+    async def test_round_without_new_resolutions_renders_nothing(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        limiter = RateLimiter(min_interval=100, per_hour=100, per_day=100)
+        enricher, raw, _ = build({"79001234567": NEO}, Clock(), limiter=limiter)
+        limiter.try_acquire(Clock()())  # the next lookup is deferred
+        notifier = RecordingNotifier(message_id=1)
+        enricher.track(notifier, 1, [make_item("79001234567")])
+        calls: List[Any] = []
+        monkeypatch.setattr(enricher, "render", calls.append)
+
+        await enricher._drain_once()
+        await enricher._drain_once()
+
+        assert raw.calls == []
+        assert calls == []
+        assert notifier.edited == []
+        assert len(enricher._queue) == 1
+
     @pytest.mark.asyncio
     async def test_flood_error_pauses_dogon(self) -> None:
         enricher, raw, resolver = build({"79001234567": FloodError(50)}, Clock())
@@ -1,4 +1,5 @@
 from json import loads as json_loads
+from time import monotonic
 from typing import Callable, List, Tuple
 
 import pytest
@@ -10,7 +11,9 @@ from github_client import GithubClient, GithubError, Release
 Handler = Callable[[Request], Response]
 
 
-def make_client(handler: Handler) -> Tuple[GithubClient, List[Request]]:
+def make_client(
+    handler: Handler, clock: Callable[[], float] | None = None
+) -> Tuple[GithubClient, List[Request]]:
     seen: List[Request] = []
 
     def recording_handler(request: Request) -> Response:
@@ -19,7 +22,10 @@ def make_client(handler: Handler) -> Tuple[GithubClient, List[Request]]:
 
     http = AsyncClient(transport=MockTransport(recording_handler))
     client = GithubClient(
-        http=http, token="gh_token", repo="m6mok/palgate-tg-notify"
+        http=http,
+        token="gh_token",
+        repo="m6mok/palgate-tg-notify",
+        clock=clock or monotonic,
     )
     return client, seen
 
@@ -110,6 +116,85 @@ class TestReleases:
             await client.releases()
 
 
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+PAYLOAD = [{"tag_name": "2.0.0"}, {"tag_name": "1.1.0"}]
+
+
+def etag_handler(request: Request) -> Response:
+    if request.headers.get("If-None-Match") == '"v1"':
+        return Response(304)
+    return Response(200, json=PAYLOAD, headers={"ETag": '"v1"'})
+
+
+class TestReleaseCache:
+    @pytest.mark.asyncio
+    async def test_fresh_listing_is_served_from_the_cache(self) -> None:
+        client, seen = make_client(etag_handler, FakeClock())
+
+        first = await client.releases()
+        second = await client.releases()
+
+        assert first == second
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_shorter_listing_is_cut_from_a_longer_one(self) -> None:
+        client, seen = make_client(etag_handler, FakeClock())
+
+        await client.releases(10)
+
+        assert await client.release_tags(1) == ["2.0.0"]
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_listing_is_revalidated_with_the_etag(self) -> None:
+        clock = FakeClock()
+        client, seen = make_client(etag_handler, clock)
+        first = await client.releases()
+
+        clock.now += 31
+        second = await client.releases()
+
+        assert second == first
+        assert seen[1].headers["If-None-Match"] == '"v1"'
+        # The 304 refreshed the entry: no third request yet.
+        await client.releases()
+        assert len(seen) == 2
+
+    @pytest.mark.asyncio
+    async def test_dispatch_expires_the_cache(self) -> None:
+        def handler(request: Request) -> Response:
+            if request.method == "POST":
+                return Response(204)
+            return etag_handler(request)
+
+        client, seen = make_client(handler, FakeClock())
+        await client.releases()
+
+        await client.dispatch_deploy("1.1.0")
+        await client.releases()
+
+        assert [request.method for request in seen] == ["GET", "POST", "GET"]
+        assert seen[2].headers["If-None-Match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_errors_are_not_cached(self) -> None:
+        responses = [Response(500), Response(200, json=PAYLOAD)]
+        client, seen = make_client(lambda _: responses.pop(0), FakeClock())
+
+        with pytest.raises(GithubError):
+            await client.releases()
+
+        assert await client.release_tags() == ["2.0.0", "1.1.0"]
+
+
 class TestReleaseTags:
     @pytest.mark.asyncio
     async def test_returns_tag_names_newest_first(self) -> None:
@@ -0,0 +1,105 @@
+from asyncio import open_connection
+from typing import AsyncIterator, List
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+
+from http_server import HttpRequest, HttpResponse, LocalHttpServer
+
+
+class RecordingHandler:
+    def __init__(self, response: HttpResponse | None = None) -> None:
+        self.requests: List[HttpRequest] = []
+        self.response = response or HttpResponse(200, b"ok")
+        self.fail = False
+
+    async def __call__(self, request: HttpRequest) -> HttpResponse:
+        self.requests.append(request)
+        if self.fail:
+            raise RuntimeError("handler bug")
+        return self.response
+
+
+@pytest_asyncio.fixture
+async def handler() -> RecordingHandler:
+    return RecordingHandler()
+
+
+@pytest_asyncio.fixture
+async def server(handler: RecordingHandler) -> AsyncIterator[LocalHttpServer]:
+    server = LocalHttpServer(handler, "127.0.0.1", 0, max_body=64)
+    await server.start()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+def url(server: LocalHttpServer, path: str = "/") -> str:
+    return "http://127.0.0.1:%d%s" % (server.port, path)
+
+
+class TestLocalHttpServer:
+    @pytest.mark.asyncio
+    async def test_request_reaches_the_handler(
+        self, server: LocalHttpServer, handler: RecordingHandler
+    ) -> None:
+        async with AsyncClient() as http:
+            response = await http.post(
+                url(server, "/hook?x=1"),
+                content=b"payload",
+                headers={"X-Custom": "yes"},
+            )
+
+        assert response.status_code == 200
+        assert response.text == "ok"
+        request = handler.requests[0]
+        assert request.method == "POST"
+        assert request.path == "/hook"
+        assert request.headers["x-custom"] == "yes"
+        assert request.body == b"payload"
+
+    @pytest.mark.asyncio
+    async def test_oversized_body_is_refused(
+        self, server: LocalHttpServer, handler: RecordingHandler
+    ) -> None:
+        async with AsyncClient() as http:
+            response = await http.post(url(server), content=b"x" * 65)
+
+        assert response.status_code == 413
+        assert handler.requests == []
+
+    @pytest.mark.asyncio
+    async def test_malformed_request_line_is_refused(
+        self, server: LocalHttpServer, handler: RecordingHandler
+    ) -> None:
+        reader, writer = await open_connection("127.0.0.1", server.port)
+        writer.write(b"garbage\r\n\r\n")
+        await writer.drain()
+
+        status_line = await reader.readline()
+        writer.close()
+
+        assert status_line.startswith(b"HTTP/1.1 400")
+        assert handler.requests == []
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_become_500(
+        self, server: LocalHttpServer, handler: RecordingHandler
+    ) -> None:
+        handler.fail = True
+
+        async with AsyncClient() as http:
+            response = await http.get(url(server))
+            handler.fail = False
+            after = await http.get(url(server))
+
+        assert response.status_code == 500
+        assert after.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_port_zero_binds_a_free_port(
+        self, server: LocalHttpServer
+    ) -> None:
+        assert server.port > 0
@@ -0,0 +1,60 @@
+from lag import DELIVERED, ENTRY_LAG, FETCHED, LagTracker
+
+
+class FakeClock:
+    def __init__(self, now: float = 10_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLagTracker:
+    def test_quantiles_per_stage_and_channel(self) -> None:
+        clock = FakeClock()
+        tracker = LagTracker(clock=clock)
+
+        tracker.observe(
+            DELIVERED, "telegram", [clock.now - lag for lag in range(1, 101)]
+        )
+        tracker.observe(FETCHED, "telegram", [clock.now - 5])
+
+        fetched, delivered = tracker.stats()
+        assert (fetched.stage, fetched.samples, fetched.p50) == (FETCHED, 1, 5)
+        assert delivered.channel == "telegram"
+        assert (delivered.p50, delivered.p95, delivered.p99) == (50, 95, 99)
+        assert delivered.samples == 100
+
+    def test_entries_without_a_time_are_skipped(self) -> None:
+        tracker = LagTracker(clock=FakeClock())
+
+        tracker.observe(FETCHED, "telegram", [None, 0])
+
+        assert tracker.stats() == ()
+
+    def test_clock_skew_is_clamped_to_zero(self) -> None:
+        clock = FakeClock()
+        tracker = LagTracker(clock=clock)
+
+        tracker.observe(FETCHED, "telegram", [clock.now + 30])
+
+        assert tracker.stats()[0].p99 == 0
+
+    def test_old_samples_leave_the_window(self) -> None:
+        clock = FakeClock()
+        tracker = LagTracker(window=60, clock=clock)
+        tracker.observe(DELIVERED, "max", [clock.now - 1])
+
+        clock.now += 61
+
+        assert tracker.stats() == ()
+
+    def test_observations_feed_the_shared_summary(self) -> None:
+        clock = FakeClock()
+        tracker = LagTracker(clock=clock)
+        before = ENTRY_LAG.count(stage=DELIVERED, channel="lag-test")
+
+        tracker.observe(DELIVERED, "lag-test", [clock.now - 3], at=clock.now)
+
+        after = ENTRY_LAG.count(stage=DELIVERED, channel="lag-test")
+        assert after == before + 1
@@ -0,0 +1,64 @@
+from asyncio import Event, create_task, sleep, wait_for
+from time import sleep as blocking_sleep
+
+import pytest
+
+from loop_monitor import LOOP_STALLS, LoopMonitor
+
+
+async def hog_the_loop(seconds: float) -> None:
+    blocking_sleep(seconds)
+
+
+class TestLoopMonitor:
+    @pytest.mark.asyncio
+    async def test_stall_is_reported_with_the_blocking_coroutine(
+        self,
+    ) -> None:
+        monitor = LoopMonitor(threshold=0.1, interval=0.02)
+        stop = Event()
+        task = create_task(monitor.run(stop))
+        stalls = LOOP_STALLS.value()
+        await sleep(0.05)
+
+        await create_task(hog_the_loop(0.4))
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        stall = monitor.last_stall
+        assert stall is not None and stall.seconds >= 0.1
+        assert stall.where is not None and "hog_the_loop" in stall.where
+        assert LOOP_STALLS.value() == stalls + 1
+
+    @pytest.mark.asyncio
+    async def test_quiet_loop_reports_nothing(self) -> None:
+        monitor = LoopMonitor(threshold=0.2, interval=0.01)
+        stop = Event()
+        task = create_task(monitor.run(stop))
+
+        await sleep(0.1)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert monitor.last_stall is None
+
+    @pytest.mark.asyncio
+    async def test_only_the_first_stall_reaches_the_ops_log(
+        self, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        monitor = LoopMonitor(threshold=0.05, interval=0.01)
+        stop = Event()
+        task = create_task(monitor.run(stop))
+        await sleep(0.03)
+
+        for _ in range(2):
+            await create_task(hog_the_loop(0.15))
+            await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        ops = [r for r in caplog.records if r.name == "log"]
+        local = [r for r in caplog.records if r.name == "default"]
+        assert len(ops) == 1 and "Event loop stalled" in ops[0].message
+        assert len(local) >= 1
@@ -1,11 +1,16 @@
-from asyncio import Event, wait_for
+import json
+from asyncio import Event, sleep, wait_for
+from datetime import datetime
 from importlib.metadata import PackageNotFoundError
-from logging import INFO, Formatter, LogRecord
+from logging import ERROR, INFO, Formatter, LogRecord
+from logging.handlers import QueueHandler
 from os import getpid, kill
 from pathlib import Path
-from signal import SIGTERM
+from queue import Queue
+from signal import SIGHUP, SIGTERM
+from sys import exc_info
 from tomllib import load as toml_load
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from aiologging import (
@@ -19,23 +24,34 @@ from bot import OpsBot
 from config import Settings
 from github_client import GithubClient
 from main import (
+    JsonLinesFormatter,
     RolePrefixFilter,
+    StartupReport,
     build_bot,
+    build_breakers,
     build_client,
     build_enrichment,
     build_logging_config,
+    build_loop_monitor,
+    build_metrics_endpoint,
+    build_outbox,
     build_telegram_log_handler,
     build_watcher,
     configure_logging,
     main,
+    parse_args,
+    process_uptime,
     read_stored_version,
     service_version,
     store_version,
     version_transition,
 )
 from enrich import Enricher
+from loop_monitor import LoopMonitor
+from metrics import MetricsEndpoint
 from notify import TelegramNotifier
-from palgate import PalgateClient
+from outbox import FileOutbox
+from palgate import PalgateClient, TokenProvider
 from resolver import CachingResolver, ProfileCache, RateLimiter
 from service import GateWatcher
 from state import FileStateStore
@@ -56,6 +72,22 @@ class TestBuildLoggingConfig:
         assert handler["maxBytes"] > 0
         assert handler["backupCount"] > 0
 
+    def test_local_handlers_sit_behind_the_queue(self) -> None:
+        config = build_logging_config()
+
+        queue = config["handlers"]["queue"]
+        assert queue["class"] == "logging.handlers.QueueHandler"
+        assert queue["handlers"] == ["stdout", "file"]
+        assert config["loggers"]["default"]["handlers"] == ["queue"]
+        assert config["loggers"]["log"]["handlers"] == ["log", "queue"]
+
+    def test_json_format_applies_to_stdout_and_file(self) -> None:
+        config = build_logging_config(log_format="json")
+
+        assert config["formatters"]["json"]["()"] is JsonLinesFormatter
+        assert config["handlers"]["stdout"]["formatter"] == "json"
+        assert config["handlers"]["file"]["formatter"] == "json"
+
     def test_chat_delivery_is_not_a_logger_anymore(self) -> None:
         config = build_logging_config()
 
@@ -76,6 +108,41 @@ class TestBuildLoggingConfig:
         assert role_filter["role"] == "prestable"
 
 
+class TestJsonLinesFormatter:
+    def test_one_json_object_per_record(self) -> None:
+        record = LogRecord(
+            "default", INFO, __file__, 1, "Delivered to %s:\n%s",
+            ("telegram", "line"), None,
+        )
+
+        line = JsonLinesFormatter().format(record)
+
+        assert "\n" not in line
+        document = json.loads(line)
+        assert document["level"] == "INFO"
+        assert document["logger"] == "default"
+        assert document["message"] == "Delivered to telegram:\nline"
+        assert datetime.fromisoformat(document["time"]).tzinfo is not None
+
+
+    def test_a_traceback_stays_in_the_one_line(self) -> None:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = LogRecord(
+                "default", ERROR, __file__, 1, "Round failed", None,
+                exc_info(),
+            )
+        prepared = QueueHandler(Queue()).prepare(record)
+
+        line = JsonLinesFormatter().format(prepared)
+
+        assert "\n" not in line
+        message = json.loads(line)["message"]
+        assert message.startswith("Round failed\nTraceback")
+        assert "ValueError: boom" in message
+
+
 class TestRolePrefixFilter:
     def make_record(self, msg: str, *args: object) -> LogRecord:
         return LogRecord(
@@ -130,6 +197,24 @@ class TestTelegramLogDelivery:
             await aio_shutdown(timeout=5.0)
 
 
+    @pytest.mark.asyncio
+    async def test_configure_logging_starts_the_queue_listener(
+        self, settings: Settings
+    ) -> None:
+        queue = QueueHandler(Queue())
+        queue.listener = Mock()
+        try:
+            with patch("main.dictConfig"), patch(
+                "main.getHandlerByName", return_value=queue
+            ), patch("main.atexit_register") as register:
+                configure_logging(settings)
+
+            queue.listener.start.assert_called_once_with()
+            register.assert_called_once_with(queue.listener.stop)
+        finally:
+            await aio_shutdown(timeout=5.0)
+
+
 class TestBuildEnrichment:
     def test_disabled_by_default(self, settings: Settings) -> None:
         assert build_enrichment(settings) is None
@@ -192,6 +277,52 @@ class TestBuildEnrichment:
         assert not (tmp_path / "tele.session").exists()
 
 
+class TestBuildOutbox:
+    def test_outbox_is_off_by_default(self, settings: Settings) -> None:
+        assert build_outbox(settings) is None
+
+    def test_enabled_outbox_journals_to_the_configured_file(
+        self, settings: Settings, tmp_path: Path
+    ) -> None:
+        settings = Settings(
+            **{
+                **settings.model_dump(),
+                "OUTBOX_ENABLED": True,
+                "OUTBOX_FILE": str(tmp_path / "outbox.json"),
+            }
+        )
+
+        outbox = build_outbox(settings)
+
+        assert isinstance(outbox, FileOutbox)
+        assert outbox._path == tmp_path / "outbox.json"
+
+
+class TestBuildMetricsEndpoint:
+    def test_endpoint_is_off_by_default(self, settings: Settings) -> None:
+        assert build_metrics_endpoint(settings) is None
+
+    def test_port_enables_the_endpoint(self, settings: Settings) -> None:
+        settings = Settings(**{**settings.model_dump(), "METRICS_PORT": 9100})
+
+        endpoint = build_metrics_endpoint(settings)
+
+        assert isinstance(endpoint, MetricsEndpoint)
+        assert endpoint.port == 9100
+
+
+class TestBuildLoopMonitor:
+    def test_monitor_is_on_by_default(self, settings: Settings) -> None:
+        assert isinstance(build_loop_monitor(settings), LoopMonitor)
+
+    def test_zero_threshold_turns_it_off(self, settings: Settings) -> None:
+        settings = Settings(
+            **{**settings.model_dump(), "LOOP_STALL_THRESHOLD": 0}
+        )
+
+        assert build_loop_monitor(settings) is None
+
+
 class TestBuildWatcher:
     @pytest.mark.asyncio
     async def test_builds_a_gate_watcher_from_settings(
@@ -273,6 +404,30 @@ class TestBuildBot:
             assert isinstance(bot, OpsBot)
             assert bot._chat_id == settings.TELEGRAM_LOG_CHAT_ID
 
+    @pytest.mark.asyncio
+    async def test_callers_of_an_endpoint_share_its_breaker(
+        self, settings: Settings, tmp_path: Path
+    ) -> None:
+        settings = Settings(
+            **{**settings.model_dump(), "MAX_API_TOKEN": "max_token"}
+        )
+        breakers = build_breakers(settings)
+        store = FileStateStore(tmp_path / "state.json")
+        async with AsyncClient() as http:
+            client = build_client(settings, http, breakers)
+            watcher = build_watcher(
+                settings, http, store, client, breakers=breakers
+            )
+            bot = build_bot(
+                settings, http, watcher, client, store, breakers=breakers
+            )
+
+            telegram, max_notifier = watcher._notifiers
+            assert telegram._breaker is breakers["telegram"]  # type: ignore[attr-defined]
+            assert bot._replier._breaker is breakers["telegram"]  # type: ignore[attr-defined]
+            assert max_notifier._breaker is breakers["max"]  # type: ignore[attr-defined]
+            assert client._breaker is breakers["palgate"]
+
     @pytest.mark.asyncio
     async def test_rollback_is_off_without_a_github_token(
         self, settings: Settings, tmp_path: Path
@@ -438,6 +593,32 @@ class TestVersionFile:
         assert read_stored_version(path) is None
 
 
+class TestStartupReport:
+    def test_phases_are_timed_back_to_back(self) -> None:
+        ticks = iter([10.0, 10.5, 12.0])
+        report = StartupReport(clock=lambda: next(ticks))
+        report.phases.clear()
+
+        report.mark("settings")
+        report.mark("state lock")
+
+        assert report.phases == [("settings", 0.5), ("state lock", 1.5)]
+        assert report.format().splitlines()[-1].split() == [
+            "total",
+            "2.000",
+            "s",
+        ]
+
+    def test_process_uptime_is_positive(self) -> None:
+        uptime = process_uptime()
+
+        assert uptime is None or uptime > 0
+
+    def test_startup_report_flag(self) -> None:
+        assert parse_args(["--startup-report"]).startup_report is True
+        assert parse_args([]).startup_report is False
+
+
 class TestMain:
     @pytest.mark.asyncio
     async def test_main_wires_everything_and_releases_the_lock(
@@ -445,13 +626,16 @@ class TestMain:
     ) -> None:
         run_mock = AsyncMock()
         bot_run_mock = AsyncMock()
+        monitor_run_mock = AsyncMock()
         original_converter = Formatter.converter
         try:
             with (
-                patch("main.Settings", return_value=settings),
+                patch("main.load_settings", return_value=settings),
                 patch("main.dictConfig") as dict_config,
                 patch.object(GateWatcher, "run", run_mock),
                 patch.object(OpsBot, "run", bot_run_mock),
+                patch.object(LoopMonitor, "run", monitor_run_mock),
+                patch.object(TokenProvider, "run", AsyncMock()),
                 caplog.at_level("INFO", logger="log"),
             ):
                 await main()
@@ -461,6 +645,7 @@ class TestMain:
         dict_config.assert_called_once()
         run_mock.assert_awaited_once()
         bot_run_mock.assert_awaited_once()
+        monitor_run_mock.assert_awaited_once()
 
         # Lifecycle events must reach the ops ("log") logger.
         messages = [record.message for record in caplog.records]
@@ -475,6 +660,43 @@ class TestMain:
         successor.acquire_lock(timeout=0.5)
         successor.release_lock()
 
+    @pytest.mark.asyncio
+    async def test_startup_report_fetches_once_and_prints_the_phases(
+        self,
+        settings: Settings,
+        caplog: pytest.LogCaptureFixture,
+        capsys: pytest.CaptureFixture[str],
+    ) -> None:
+        run_mock = AsyncMock()
+        poll_mock = AsyncMock(return_value=True)
+        fetch_mock = AsyncMock()
+        original_converter = Formatter.converter
+        try:
+            with (
+                patch("main.load_settings", return_value=settings),
+                patch("main.dictConfig"),
+                patch.object(GateWatcher, "run", run_mock),
+                patch.object(GateWatcher, "poll_once", poll_mock),
+                patch.object(PalgateClient, "fetch_log", fetch_mock),
+                caplog.at_level("INFO", logger="log"),
+            ):
+                await main(startup_report=True)
+        finally:
+            Formatter.converter = original_converter
+
+        fetch_mock.assert_awaited_once()
+        # Nothing is delivered and no marker moves.
+        poll_mock.assert_not_awaited()
+        run_mock.assert_not_awaited()
+        report = capsys.readouterr().out
+        for phase in ("settings", "state lock", "first fetch", "total"):
+            assert phase in report
+        # A measuring run announces nothing to the ops chat.
+        messages = [record.message for record in caplog.records]
+        assert not any(
+            message.startswith("Started") for message in messages
+        )
+
     @pytest.mark.asyncio
     async def test_prestable_role_runs_without_the_ops_bot(
         self, settings: Settings, caplog: pytest.LogCaptureFixture
@@ -487,10 +709,12 @@ class TestMain:
         original_converter = Formatter.converter
         try:
             with (
-                patch("main.Settings", return_value=settings),
+                patch("main.load_settings", return_value=settings),
                 patch("main.dictConfig"),
                 patch.object(GateWatcher, "run", run_mock),
                 patch.object(OpsBot, "run", bot_run_mock),
+                patch.object(LoopMonitor, "run", AsyncMock()),
+                patch.object(TokenProvider, "run", AsyncMock()),
                 caplog.at_level("INFO", logger="log"),
             ):
                 await main()
@@ -508,10 +732,12 @@ class TestMain:
         original_converter = Formatter.converter
         try:
             with (
-                patch("main.Settings", return_value=settings),
+                patch("main.load_settings", return_value=settings),
                 patch("main.dictConfig"),
                 patch.object(GateWatcher, "run", AsyncMock()),
                 patch.object(OpsBot, "run", AsyncMock()),
+                patch.object(LoopMonitor, "run", AsyncMock()),
+                patch.object(TokenProvider, "run", AsyncMock()),
                 caplog.at_level("INFO", logger="log"),
             ):
                 await main()
@@ -541,10 +767,12 @@ class TestMain:
         original_converter = Formatter.converter
         try:
             with (
-                patch("main.Settings", return_value=settings),
+                patch("main.load_settings", return_value=settings),
                 patch("main.dictConfig"),
                 patch.object(GateWatcher, "run", signal_driven_run),
                 patch.object(OpsBot, "run", AsyncMock()),
+                patch.object(LoopMonitor, "run", AsyncMock()),
+                patch.object(TokenProvider, "run", AsyncMock()),
                 caplog.at_level("INFO", logger="log"),
             ):
                 await main()
@@ -556,6 +784,43 @@ class TestMain:
             for record in caplog.records
         )
 
+    @pytest.mark.asyncio
+    async def test_sighup_reloads_the_settings(
+        self, settings: Settings, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        reloaded = Settings(**{**settings.model_dump(), "CRON_DELAY": 15})
+        delays = []
+
+        async def signal_driven_run(self: GateWatcher, stop: Event) -> None:
+            kill(getpid(), SIGHUP)
+            for _ in range(100):
+                if self._cron_delay != settings.CRON_DELAY:
+                    break
+                await sleep(0.01)
+            delays.append(self._cron_delay)
+
+        original_converter = Formatter.converter
+        try:
+            with (
+                patch(
+                    "main.load_settings", side_effect=[settings, reloaded]
+                ),
+                patch("main.dictConfig"),
+                patch.object(GateWatcher, "run", signal_driven_run),
+                patch.object(OpsBot, "run", AsyncMock()),
+                patch.object(LoopMonitor, "run", AsyncMock()),
+                patch.object(TokenProvider, "run", AsyncMock()),
+                caplog.at_level("INFO", logger="log"),
+            ):
+                await main()
+        finally:
+            Formatter.converter = original_converter
+
+        assert delays == [15]
+        assert "Settings reloaded; applied: CRON_DELAY" in [
+            record.message for record in caplog.records
+        ]
+
     @pytest.mark.asyncio
     async def test_crash_is_reported_to_the_ops_chat_and_reraised(
         self, settings: Settings, caplog: pytest.LogCaptureFixture
@@ -564,10 +829,12 @@ class TestMain:
         original_converter = Formatter.converter
         try:
             with (
-                patch("main.Settings", return_value=settings),
+                patch("main.load_settings", return_value=settings),
                 patch("main.dictConfig"),
                 patch.object(GateWatcher, "run", run_mock),
                 patch.object(OpsBot, "run", AsyncMock()),
+                patch.object(LoopMonitor, "run", AsyncMock()),
+                patch.object(TokenProvider, "run", AsyncMock()),
                 caplog.at_level("ERROR", logger="log"),
             ):
                 with pytest.raises(RuntimeError, match="boom"):
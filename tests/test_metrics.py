@@ -0,0 +1,190 @@
+from asyncio import Event, create_task, sleep, wait_for
+
+import pytest
+from httpx import AsyncClient
+
+from http_server import HttpRequest
+from metrics import (
+    Counter,
+    MetricsEndpoint,
+    Registry,
+    RollingQuantiles,
+    _Metric,
+)
+
+
+class TestCounter:
+    def test_counts_per_label_combination(self) -> None:
+        registry = Registry()
+        sent = registry.counter("sent_total", "Messages sent", ("channel",))
+
+        sent.inc(channel="telegram")
+        sent.inc(2, channel="telegram")
+        sent.inc(channel="max")
+
+        assert sent.value(channel="telegram") == 3
+        assert sent.value(channel="max") == 1
+
+    def test_cannot_go_down(self) -> None:
+        counter = Registry().counter("sent_total", "Messages sent")
+
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_labels_must_match_the_declaration(self) -> None:
+        counter = Registry().counter("sent_total", "Sent", ("channel",))
+
+        with pytest.raises(ValueError, match="channel"):
+            counter.inc(chat="ops")
+
+
+class TestGauge:
+    def test_set_inc_dec(self) -> None:
+        gauge = Registry().gauge("depth", "Queue depth")
+
+        gauge.set(5)
+        gauge.inc()
+        gauge.dec(3)
+
+        assert gauge.value() == 3
+
+    def test_function_is_sampled_at_scrape_time(self) -> None:
+        registry = Registry()
+        queue = [1, 2]
+        registry.gauge("depth", "Queue depth").set_function(
+            lambda: len(queue)
+        )
+        queue.append(3)
+
+        assert "depth 3\n" in registry.expose()
+
+
+class TestHistogram:
+    def test_observations_land_in_cumulative_buckets(self) -> None:
+        registry = Registry()
+        latency = registry.histogram(
+            "latency_seconds", "Latency", ("outcome",), buckets=(0.1, 1)
+        )
+
+        latency.observe(0.05, outcome="ok")
+        latency.observe(0.5, outcome="ok")
+        latency.observe(5, outcome="ok")
+
+        text = registry.expose()
+        assert 'latency_seconds_bucket{outcome="ok",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{outcome="ok",le="1"} 2' in text
+        assert 'latency_seconds_bucket{outcome="ok",le="+Inf"} 3' in text
+        assert 'latency_seconds_sum{outcome="ok"} 5.55' in text
+        assert 'latency_seconds_count{outcome="ok"} 3' in text
+        assert latency.count(outcome="ok") == 3
+
+    def test_time_observes_even_when_the_block_raises(self) -> None:
+        latency = Registry().histogram("latency_seconds", "Latency")
+
+        with pytest.raises(RuntimeError):
+            with latency.time():
+                raise RuntimeError("boom")
+
+        assert latency.count() == 1
+
+
+class TestSummary:
+    def test_exposes_rolling_quantiles_and_totals(self) -> None:
+        registry = Registry()
+        lag = registry.summary("lag_seconds", "Lag", ("channel",))
+
+        for value in range(1, 11):
+            lag.observe(value, channel="telegram")
+
+        text = registry.expose()
+        assert "# TYPE lag_seconds summary" in text
+        assert 'lag_seconds{channel="telegram",quantile="0.5"} 5' in text
+        assert 'lag_seconds{channel="telegram",quantile="0.99"} 10' in text
+        assert 'lag_seconds_sum{channel="telegram"} 55' in text
+        assert 'lag_seconds_count{channel="telegram"} 10' in text
+
+    def test_window_forgets_old_samples(self) -> None:
+        now = [0.0]
+        sketch = RollingQuantiles(window=60, clock=lambda: now[0])
+        sketch.add(100)
+        now[0] = 30
+        sketch.add(1)
+
+        assert sketch.quantile(0.99) == 100
+        now[0] = 61
+        assert sketch.quantile(0.99) == 1
+        assert len(sketch) == 1
+
+    def test_no_samples_means_no_quantile(self) -> None:
+        assert RollingQuantiles().quantile(0.5) is None
+
+
+class TestMetric:
+    def test_a_kind_without_samples_cannot_be_built(self) -> None:
+        class Untyped(_Metric):
+            kind = "untyped"
+
+        with pytest.raises(TypeError, match="samples"):
+            Untyped("untyped_total", "Untyped")  # type: ignore[abstract]
+
+
+class TestRegistry:
+    def test_same_name_returns_the_same_metric(self) -> None:
+        registry = Registry()
+
+        first = registry.counter("sent_total", "Sent", ("channel",))
+        second = registry.counter("sent_total", "Sent", ("channel",))
+
+        assert first is second
+        assert isinstance(registry.get("sent_total"), Counter)
+
+    def test_conflicting_registration_is_refused(self) -> None:
+        registry = Registry()
+        registry.counter("sent_total", "Sent")
+
+        with pytest.raises(ValueError, match="already registered"):
+            registry.gauge("sent_total", "Sent")
+
+    def test_exposition_format(self) -> None:
+        registry = Registry()
+        registry.counter("sent_total", "Messages sent", ("chat",)).inc(
+            chat='say "hi"\n'
+        )
+
+        assert registry.expose() == (
+            "# HELP sent_total Messages sent\n"
+            "# TYPE sent_total counter\n"
+            'sent_total{chat="say \\"hi\\"\\n"} 1\n'
+        )
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.asyncio
+    async def test_serves_the_registry(self) -> None:
+        registry = Registry()
+        registry.counter("sent_total", "Messages sent").inc()
+        endpoint = MetricsEndpoint("127.0.0.1", 0, registry)
+        stop = Event()
+        task = create_task(endpoint.run(stop))
+        await sleep(0.01)
+
+        async with AsyncClient() as http:
+            response = await http.get(
+                "http://127.0.0.1:%d/metrics" % endpoint.port
+            )
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "sent_total 1" in response.text
+
+    @pytest.mark.asyncio
+    async def test_other_paths_and_methods_are_refused(self) -> None:
+        endpoint = MetricsEndpoint("127.0.0.1", 0, Registry())
+
+        missing = await endpoint.handle(HttpRequest("GET", "/"))
+        post = await endpoint.handle(HttpRequest("POST", "/metrics"))
+
+        assert missing.status == 404
+        assert post.status == 405
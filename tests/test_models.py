@@ -1,37 +1,16 @@
 import pytest
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from models import Item, ItemResponse
+from pydantic import ValidationError
 
+from models import Entry, ItemResponse, LazyLog, LogItem
 
-class TestItem:
-    """Test cases for Item class."""
 
-    def test_from_log_item(self, sample_log_item_data: Dict[str, Any]) -> None:
-        """Test creating Item from log item data."""
-        # Create a mock log item with model_dump method
-        class MockLogItem:
-            def __init__(self, data: Dict[str, Any]) -> None:
-                for key, value in data.items():
-                    setattr(self, key, value)
+class TestEntryFields:
+    """Test cases for the phone, name and line of an Entry."""
 
-            def model_dump(self) -> Dict[str, Any]:
-                return {k: getattr(self, k) for k in self.__dict__}
-
-        mock_log_item = MockLogItem(sample_log_item_data)
-
-        # Convert mock log item to Item instance
-        item = Item.from_log_item(mock_log_item)
-
-        # Verify all fields are correctly mapped
-        assert item.userId == sample_log_item_data["userId"]
-        assert item.firstname == sample_log_item_data["firstname"]
-        assert item.lastname == sample_log_item_data["lastname"]
-        assert item.type.value == sample_log_item_data["type"]
-        assert item.sn == sample_log_item_data["sn"]
-
-    def test_pn_property_with_user_id_and_empty_sn(self) -> None:
-        """Test pn property when userId is provided and sn is empty."""
+    def test_pn_with_user_id_and_empty_sn(self) -> None:
+        """Test pn when userId is provided and sn is empty."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -43,12 +22,12 @@ class TestItem:
             "type": 1,
             "sn": ""
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.pn == "79000012345"  # Fixed expected value based on actual logic
 
-    def test_pn_property_with_sn_and_zero_user_id(self) -> None:
-        """Test pn property when sn is provided and userId is zero."""
+    def test_pn_with_sn_and_zero_user_id(self) -> None:
+        """Test pn when sn is provided and userId is zero."""
         item_data = {
             "userId": "0",
             "operation": "call",
@@ -60,12 +39,12 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.pn == "79001234567"
 
-    def test_pn_property_with_short_user_id_and_empty_sn(self) -> None:
-        """Test pn property with short userId and empty sn."""
+    def test_pn_with_short_user_id_and_empty_sn(self) -> None:
+        """Test pn with short userId and empty sn."""
         item_data = {
             "userId": "123",
             "operation": "call",
@@ -77,12 +56,12 @@ class TestItem:
             "type": 1,
             "sn": ""
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.pn == "79000000123"  # Fixed expected value based on actual logic
 
-    def test_pn_property_with_9_digit_user_id_and_empty_sn(self) -> None:
-        """Test pn property when userId has exactly 9 digits and sn is empty."""
+    def test_pn_with_9_digit_user_id_and_empty_sn(self) -> None:
+        """Test pn when userId has exactly 9 digits and sn is empty."""
         item_data = {
             "userId": "123456789",
             "operation": "call",
@@ -94,12 +73,12 @@ class TestItem:
             "type": 1,
             "sn": ""
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.pn == "79123456789"  # Should add "79" prefix to 9-digit number
 
-    def test_pn_property_raises_error_when_both_user_id_and_sn_are_none(self) -> None:
-        """Test pn property raises ValueError when both userId and sn are None."""
+    def test_pn_raises_error_when_both_user_id_and_sn_are_none(self) -> None:
+        """Test building raises ValueError when both userId and sn are None."""
         item_data = {
             "userId": None,
             "operation": "call",
@@ -111,13 +90,11 @@ class TestItem:
             "type": 1,
             "sn": None
         }
-        item = Item(**item_data)
-
         with pytest.raises(ValueError, match="Phone numer field is None"):
-            _ = item.pn
+            Entry.from_log_item(LogItem(**item_data))
 
-    def test_fullname_property_with_both_names(self) -> None:
-        """Test fullname property when both firstname and lastname are provided."""
+    def test_fullname_with_both_names(self) -> None:
+        """Test fullname when both firstname and lastname are provided."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -129,12 +106,12 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.fullname == "John Doe"
 
-    def test_fullname_property_with_empty_lastname(self) -> None:
-        """Test fullname property when lastname is empty."""
+    def test_fullname_with_empty_lastname(self) -> None:
+        """Test fullname when lastname is empty."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -146,7 +123,7 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.fullname == "John"
 
@@ -155,8 +132,10 @@ class TestItem:
         (1, "📞"),    # CALL - phone emoji
         (100, "📱"),  # ADMIN - mobile phone emoji
     ])
-    def test_type_sign_property_with_parameterized_test_cases(self, type_value: int, expected_sign: str) -> None:
-        """Test type_sign property returns correct emoji for each enum value."""
+    def test_type_sign_with_parameterized_test_cases(
+        self, type_value: int, expected_sign: str | None
+    ) -> None:
+        """Test the line ends with the correct emoji for each enum value."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -168,33 +147,24 @@ class TestItem:
             "type": type_value,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
-        assert item.type_sign == expected_sign
-
-    def test_type_sign_property_returns_none_for_unknown_type(self) -> None:
-        """Test type_sign property returns None for unknown type values."""
-        from unittest.mock import patch
-
-        # Create a valid item first
-        item_data = {
-            "userId": "12345",
-            "operation": "call",
-            "time": 1708675200,
-            "firstname": "John",
-            "lastname": "Doe",
-            "image": True,
-            "reason": 0,
-            "type": 1,  # Valid type for initialization
-            "sn": "79001234567"
-        }
-        item = Item(**item_data)
-
-        # Mock the type attribute to return an invalid value
-        with patch.object(item, 'type', 999):  # Invalid type value
-            assert item.type_sign is None  # Should return None for unknown type
-
-    def test_reason_sign_property_for_success_and_failure(self) -> None:
-        """Test reason_sign property returns cross mark for failures, None for successes."""
+        item = Entry.from_log_item(LogItem(**item_data))
+        expected_end = "</a>" if expected_sign is None else " " + expected_sign
+        assert str(item).endswith(expected_end)
+
+    def test_type_sign_is_omitted_for_unknown_type(self) -> None:
+        """Test the line has no type emoji for unknown type values."""
+        item = Entry(
+            time=1708675200,
+            pn="79001234567",
+            fullname="John Doe",
+            type=999,  # type: ignore[arg-type]
+            reason=0,
+        )
+
+        assert str(item).endswith("</a>")
+
+    def test_reason_sign_for_success_and_failure(self) -> None:
+        """Test the line has a cross mark for failures, nothing for successes."""
         # Test success case (reason=0)
         success_item_data = {
             "userId": "12345",
@@ -207,8 +177,8 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        success_item = Item(**success_item_data)
-        assert success_item.reason_sign is None
+        success_item = Entry.from_log_item(LogItem(**success_item_data))
+        assert str(success_item).endswith("📞")
 
         # Test failure case (reason≠0)
         failure_item_data = {
@@ -222,8 +192,8 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        failure_item = Item(**failure_item_data)
-        assert failure_item.reason_sign == "❌"
+        failure_item = Entry.from_log_item(LogItem(**failure_item_data))
+        assert str(failure_item).endswith("📞 ❌")
 
     def test_str_method_includes_all_required_parts(self) -> None:
         """Test __str__ method includes fullname, phone link, type sign, and reason sign."""
@@ -238,7 +208,7 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         result = str(item)
         expected_parts = ["John Doe", '<a href="+79001234567">79001234567</a>', "📞"]
@@ -258,29 +228,47 @@ class TestItem:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         result = str(item)
         assert "?" in result
         assert '<a href="+79001234567">79001234567</a>' in result
         assert "📞" in result
 
-    def test_repr_method_returns_phone_number(self) -> None:
-        """Test __repr__ method returns the formatted phone number."""
-        item_data = {
-            "userId": "12345",
-            "operation": "call",
-            "time": 1708675200,
-            "firstname": "John",
-            "lastname": "Doe",
-            "image": True,
-            "reason": 0,
-            "type": 1,
-            "sn": "79001234567"
-        }
-        item = Item(**item_data)
 
-        assert repr(item) == "79001234567"  # Fixed expected value based on actual logic
+
+class TestEntry:
+    """Test cases for the compact Entry record."""
+
+    def test_is_immutable_and_slotted(self, sample_log_item_data: Dict[str, Any]) -> None:
+        """Test an Entry rejects assignment and has no instance dict."""
+        entry = Entry.from_log_item(LogItem(**sample_log_item_data))
+
+        with pytest.raises(AttributeError):
+            entry.pn = "79000000000"  # type: ignore[misc]
+        assert not hasattr(entry, "__dict__")
+
+    def test_without_phone_raises(self) -> None:
+        """Test building an Entry from a log item with no phone raises."""
+        with pytest.raises(ValueError, match="Phone numer field is None"):
+            Entry.from_log_item(LogItem(sn=None, userId=None))
+
+    def test_dict_roundtrip(self, sample_log_item_data: Dict[str, Any]) -> None:
+        """Test to_dict/from_dict restore an equal Entry with its line."""
+        entry = Entry.from_log_item(LogItem(**sample_log_item_data))
+
+        restored = Entry.from_dict(entry.to_dict())
+
+        assert restored == entry
+        assert restored.line == entry.line
+
+    def test_from_dict_reads_a_dumped_log_item(self, sample_log_item_data: Dict[str, Any]) -> None:
+        """Test from_dict accepts the LogItem dumps older journals hold."""
+        log_item = LogItem(**sample_log_item_data)
+
+        restored = Entry.from_dict(log_item.model_dump(mode="json"))
+
+        assert restored == Entry.from_log_item(log_item)
 
 
 class TestItemResponse:
@@ -350,12 +338,91 @@ class TestItemResponse:
             ItemResponse(**data)
 
 
+class TestLazyLog:
+    """Entries are validated on access, not with the response."""
+
+    def test_entries_are_validated_on_first_access(
+        self, sample_item_response_data: Dict[str, Any]
+    ) -> None:
+        response = ItemResponse(**sample_item_response_data)
+        assert isinstance(response.log, LazyLog)
+        assert response.log.validated == 0
+
+        head = response.log[0]
+
+        assert head.userId == sample_item_response_data["log"][0]["userId"]
+        assert response.log[0] is head
+        assert response.log.validated == 1
+
+    def test_a_malformed_entry_fails_only_when_read(self) -> None:
+        response = ItemResponse(
+            log=[
+                {"userId": "1", "time": 1708675200},
+                {"userId": "2", "time": "not a time"},
+            ],
+            status="ok",
+        )
+        assert response.log is not None
+
+        assert response.log[0].userId == "1"
+        with pytest.raises(ValidationError):
+            response.log[1]
+
+    def test_a_malformed_entry_past_a_batch_fails_only_itself(self) -> None:
+        entries = [{"userId": str(n), "time": 1708675200} for n in range(4)]
+        entries[3]["time"] = "not a time"
+        response = ItemResponse(log=entries, status="ok")
+        assert response.log is not None
+
+        assert [response.log[n].userId for n in range(3)] == ["0", "1", "2"]
+        with pytest.raises(ValidationError):
+            response.log[3]
+
+    def test_a_full_read_validates_the_rest_at_once(self) -> None:
+        batches: List[int] = []
+
+        def build(raw: List[Any]) -> List[LogItem]:
+            batches.append(len(raw))
+            return [LogItem.model_validate(entry) for entry in raw]
+
+        log = LazyLog([{"userId": str(n)} for n in range(100)], build=build)
+
+        assert len(list(log)) == 100
+        assert batches == [1, 1, 2, 4, 92]
+
+    def test_behaves_like_a_sequence(
+        self, sample_item_response_data: Dict[str, Any]
+    ) -> None:
+        response = ItemResponse(**sample_item_response_data)
+        assert response.log is not None
+
+        assert len(response.log) == 2
+        assert [item.userId for item in response.log] == [
+            entry["userId"] for entry in sample_item_response_data["log"]
+        ]
+        assert response.log[-1] is response.log[1]
+        assert response.log[:1] == [response.log[0]]
+        with pytest.raises(IndexError):
+            response.log[2]
+
+    def test_response_dumps_its_entries(
+        self, sample_item_response_data: Dict[str, Any]
+    ) -> None:
+        response = ItemResponse(**sample_item_response_data)
+
+        dumped = response.model_dump()
+
+        assert dumped["log"][0]["userId"] == (
+            sample_item_response_data["log"][0]["userId"]
+        )
+
+
 # Additional edge case tests
-class TestItemEdgeCases:
-    """Test cases for edge cases in Item class."""
+class TestEntryEdgeCases:
+    """Test cases for edge cases in Entry fields."""
 
-    def test_pn_property_with_empty_string_user_id_and_sn(self) -> None:
-        """Test pn property when userId is empty string and sn is provided."""
+    def test_pn_with_empty_string_user_id_and_sn(self) -> None:
+        """Test pn when userId is empty string and sn is provided."""
         item_data = {
             "userId": "",
             "operation": "call",
@@ -367,12 +434,12 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.pn == "79001234567"  # Should use sn when userId is empty
 
-    def test_pn_property_with_none_user_id_and_empty_sn(self) -> None:
-        """Test pn property when userId is None and sn is empty."""
+    def test_pn_with_none_user_id_and_empty_sn(self) -> None:
+        """Test pn when userId is None and sn is empty."""
         item_data = {
             "userId": None,
             "operation": "call",
@@ -384,13 +451,13 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": ""
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         result = item.pn
         assert result == "79000000000"  # "79" + "0"*9 for empty string sn
 
-    def test_fullname_property_with_none_names(self) -> None:
-        """Test fullname property when both names are None."""
+    def test_fullname_with_none_names(self) -> None:
+        """Test fullname when both names are None."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -402,12 +469,12 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.fullname == ""
 
-    def test_fullname_property_with_empty_names(self) -> None:
-        """Test fullname property when both names are empty strings."""
+    def test_fullname_with_empty_names(self) -> None:
+        """Test fullname when both names are empty strings."""
         item_data = {
             "userId": "12345",
             "operation": "call",
@@ -419,7 +486,7 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         assert item.fullname == ""
 
@@ -436,7 +503,7 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         result = str(item)
         # Logic shows "?" only when fullname == "Unknown", not when it's empty
@@ -456,7 +523,7 @@ class TestItemEdgeCases:
             "type": 1,
             "sn": "79001234567"
         }
-        item = Item(**item_data)
+        item = Entry.from_log_item(LogItem(**item_data))
 
         result = str(item)
         assert "❌" in result  # Reason sign should be included
@@ -4,14 +4,25 @@ from typing import Callable, List, Tuple
 import pytest
 from httpx import AsyncClient, ConnectError, MockTransport, Request, Response
 
-from notify import MaxNotifier, NotifyError, TelegramNotifier
+from breaker import CircuitBreaker
+from deadline import budget
+from notify import (
+    NOTIFY_RETRIES,
+    NOTIFY_SECONDS,
+    MaxNotifier,
+    NotifyError,
+    TelegramNotifier,
+)
 
 
 Handler = Callable[[Request], Response]
 
 
 def make_notifier(
-    handler: Handler, tries: int = 3
+    handler: Handler,
+    tries: int = 3,
+    breaker: CircuitBreaker | None = None,
+    delay: float = 0,
 ) -> Tuple[TelegramNotifier, List[Request]]:
     seen: List[Request] = []
 
@@ -25,13 +36,14 @@ def make_notifier(
         token="test:token",
         chat_id=42,
         tries=tries,
-        delay=0,
+        delay=delay,
+        breaker=breaker,
     )
     return notifier, seen
 
 
 def make_max_notifier(
-    handler: Handler, tries: int = 3
+    handler: Handler, tries: int = 3, breaker: CircuitBreaker | None = None
 ) -> Tuple[MaxNotifier, List[Request]]:
     seen: List[Request] = []
 
@@ -46,6 +58,7 @@ def make_max_notifier(
         chat_id=77,
         tries=tries,
         delay=0,
+        breaker=breaker,
     )
     return notifier, seen
 
@@ -191,6 +204,146 @@ class TestEdit:
         assert len(seen) == 1
 
 
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast_without_a_request(self) -> None:
+        breaker = CircuitBreaker("telegram", failures=1, cooldown=60)
+        notifier, seen = make_notifier(lambda _: Response(502), breaker=breaker)
+
+        with pytest.raises(NotifyError):
+            await notifier.send("first")
+        assert len(seen) == 3
+
+        with pytest.raises(NotifyError, match="circuit open") as info:
+            await notifier.send("second")
+
+        assert info.value.permanent is False
+        assert len(seen) == 3
+
+    @pytest.mark.asyncio
+    async def test_probe_makes_a_single_attempt(self) -> None:
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "telegram", failures=1, cooldown=60, clock=lambda: now[0]
+        )
+        notifier, seen = make_notifier(lambda _: Response(502), breaker=breaker)
+        with pytest.raises(NotifyError):
+            await notifier.send("first")
+        now[0] = 60
+
+        with pytest.raises(NotifyError, match="after 1 tries"):
+            await notifier.send("probe")
+
+        assert len(seen) == 4
+        assert breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_a_rejection_is_not_an_outage(self) -> None:
+        breaker = CircuitBreaker("telegram", failures=1)
+        notifier, _ = make_notifier(
+            lambda _: Response(400, text="Bad Request"), breaker=breaker
+        )
+
+        with pytest.raises(NotifyError):
+            await notifier.send("bad")
+
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_max_shares_the_contract(self) -> None:
+        breaker = CircuitBreaker("max", failures=1)
+        notifier, seen = make_max_notifier(
+            lambda _: Response(503), breaker=breaker
+        )
+        with pytest.raises(NotifyError):
+            await notifier.send("first")
+
+        with pytest.raises(NotifyError, match="circuit open"):
+            await notifier.send("second")
+
+        assert len(seen) == 3
+
+
+class TestDeadline:
+    @pytest.mark.asyncio
+    async def test_no_request_once_the_cycle_is_out_of_time(self) -> None:
+        breaker = CircuitBreaker("telegram", failures=1)
+        notifier, seen = make_notifier(
+            lambda _: Response(200, json={"ok": True}), breaker=breaker
+        )
+
+        with budget(0), pytest.raises(NotifyError, match="out of time") as info:
+            await notifier.send("late")
+
+        assert info.value.permanent is False
+        assert seen == []
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_no_retry_that_would_end_past_the_deadline(self) -> None:
+        notifier, seen = make_notifier(lambda _: Response(502), delay=30)
+
+        with budget(10), pytest.raises(NotifyError) as info:
+            await notifier.send("hello")
+
+        assert "after 1 tries" in str(info.value)
+        assert "no time left" in str(info.value)
+        assert info.value.permanent is False
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeout_is_cut_to_the_time_left(self) -> None:
+        notifier, seen = make_notifier(
+            lambda _: Response(200, json={"ok": True})
+        )
+
+        with budget(2):
+            await notifier.send("hello")
+
+        assert seen[0].extensions["timeout"]["read"] <= 2
+
+    @pytest.mark.asyncio
+    async def test_max_shares_the_contract(self) -> None:
+        notifier, seen = make_max_notifier(lambda _: Response(503))
+
+        with budget(0), pytest.raises(NotifyError, match="out of time"):
+            await notifier.send("late")
+
+        assert seen == []
+
+
+class TestMetering:
+    @pytest.mark.asyncio
+    async def test_calls_and_retries_are_metered(self) -> None:
+        responses = [Response(500), Response(200, json={"ok": True})]
+        notifier, _ = make_notifier(lambda _: responses.pop(0), tries=2)
+        retries = NOTIFY_RETRIES.value(channel="telegram")
+        sends = NOTIFY_SECONDS.count(
+            channel="telegram", method="send", outcome="ok"
+        )
+
+        await notifier.send("hi")
+
+        assert NOTIFY_RETRIES.value(channel="telegram") == retries + 1
+        assert NOTIFY_SECONDS.count(
+            channel="telegram", method="send", outcome="ok"
+        ) == sends + 1
+
+    @pytest.mark.asyncio
+    async def test_permanent_rejection_is_metered_apart(self) -> None:
+        notifier, _ = make_notifier(lambda _: Response(400), tries=1)
+        rejected = NOTIFY_SECONDS.count(
+            channel="telegram", method="edit", outcome="rejected"
+        )
+
+        with pytest.raises(NotifyError):
+            await notifier.edit(1, "x")
+
+        assert NOTIFY_SECONDS.count(
+            channel="telegram", method="edit", outcome="rejected"
+        ) == rejected + 1
+
+
 class TestMaxSend:
     @pytest.mark.asyncio
     async def test_sends_html_message_with_query_auth(self) -> None:
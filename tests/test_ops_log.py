@@ -0,0 +1,84 @@
+from logging import ERROR, INFO, WARNING, LogRecord
+from typing import Any, List
+from unittest.mock import patch
+
+import pytest
+from aiologging import AsyncTelegramHandler
+
+from ops_log import FOLDED, CoalescingTelegramHandler, fold_repeats
+
+
+def make_record(
+    msg: str, *args: Any, level: int = WARNING, exc_info: Any = None
+) -> LogRecord:
+    return LogRecord("log", level, __file__, 1, msg, args, exc_info)
+
+
+def make_handler(window: float = 60.0) -> CoalescingTelegramHandler:
+    return CoalescingTelegramHandler(
+        window=window, token="123:abc", chat_id=-100, backend="httpx"
+    )
+
+
+class TestFoldRepeats:
+    def test_repeats_collapse_into_the_first_occurrence(self) -> None:
+        before = FOLDED.value()
+        records = [
+            make_record("Delivery to %s failed", "telegram"),
+            make_record("Marker moved concurrently"),
+            make_record("Delivery to %s failed", "telegram"),
+            make_record("Delivery to %s failed", "telegram"),
+        ]
+
+        folded = fold_repeats(records)
+
+        assert [record.getMessage() for record in folded] == [
+            "Delivery to telegram failed ×3",
+            "Marker moved concurrently",
+        ]
+        assert FOLDED.value() == before + 2
+
+    def test_the_shared_record_is_left_untouched(self) -> None:
+        first = make_record("Delivery to %s failed", "telegram")
+
+        fold_repeats([first, make_record("Delivery to %s failed", "telegram")])
+
+        assert first.getMessage() == "Delivery to telegram failed"
+
+    def test_levels_and_exceptions_keep_records_apart(self) -> None:
+        try:
+            raise ValueError("boom")
+        except ValueError as err:
+            failure = (type(err), err, err.__traceback__)
+        records = [
+            make_record("Round failed", level=WARNING),
+            make_record("Round failed", level=ERROR),
+            make_record("Round failed", level=ERROR, exc_info=failure),
+        ]
+
+        assert fold_repeats(records) == records
+
+
+class TestCoalescingTelegramHandler:
+    @pytest.mark.asyncio
+    async def test_info_waits_and_an_error_ships_it_at_once(self) -> None:
+        handler = make_handler()
+        sent: List[List[str]] = []
+
+        async def flush(self: Any, records: Any = None) -> None:
+            sent.append([record.getMessage() for record in records])
+
+        try:
+            with patch.object(AsyncTelegramHandler, "flush", flush):
+                await handler.handle(make_record("Started", level=INFO))
+                await handler.handle(make_record("Started", level=INFO))
+                assert sent == []
+
+                await handler.handle(make_record("Service crashed", level=ERROR))
+        finally:
+            await handler.close()
+
+        assert sent == [["Started ×2", "Service crashed"]]
+
+    def test_window_is_the_flush_interval(self) -> None:
+        assert make_handler(window=7.5).flush_interval == 7.5
@@ -0,0 +1,326 @@
+from asyncio import Event, create_task, sleep, wait_for
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from lag import DELIVERED, LagTracker
+from models import Entry, LogItem
+from notify import NotifyError
+from outbox import DeliveryWorker, FileOutbox, MemoryOutbox
+from service import GateWatcher
+from state import MemoryStateStore
+from tests.conftest import (
+    BASE_LOG_ITEM_DATA,
+    SECOND_LOG_ITEM_DATA,
+    RecordingNotifier,
+    ScriptedPalgateClient,
+    StubEnricher,
+    make_response,
+)
+
+
+def make_item(data: dict[str, Any] = BASE_LOG_ITEM_DATA) -> Entry:
+    return Entry.from_log_item(LogItem.model_validate(data))
+
+
+class TestMemoryOutbox:
+    @pytest.mark.asyncio
+    async def test_entries_are_fifo_per_channel(self) -> None:
+        outbox = MemoryOutbox()
+
+        first = await outbox.enqueue("telegram", "one", (make_item(),))
+        await outbox.enqueue("telegram", "two", ())
+        await outbox.enqueue("max", "other", ())
+
+        assert outbox.peek("telegram") == first
+        assert outbox.pending("telegram") == 2
+        assert outbox.pending("max") == 1
+
+    @pytest.mark.asyncio
+    async def test_ack_drops_only_the_given_entry(self) -> None:
+        outbox = MemoryOutbox()
+        first = await outbox.enqueue("telegram", "one", ())
+        second = await outbox.enqueue("telegram", "two", ())
+
+        await outbox.ack("telegram", first.id)
+
+        assert outbox.peek("telegram") == second
+        await outbox.ack("telegram", first.id)  # acking twice is harmless
+        assert outbox.pending("telegram") == 1
+
+    @pytest.mark.asyncio
+    async def test_enqueue_wakes_a_waiting_worker(self) -> None:
+        outbox = MemoryOutbox()
+        stop = Event()
+        waiter = create_task(outbox.wait("telegram", stop, timeout=10))
+        await sleep(0.01)
+
+        await outbox.enqueue("telegram", "one", ())
+
+        await wait_for(waiter, timeout=1)
+
+
+class TestFileOutbox:
+    @pytest.mark.asyncio
+    async def test_pending_entries_survive_a_restart(
+        self, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "outbox.json"
+        outbox = FileOutbox(path)
+        entry = await outbox.enqueue("telegram", "hello", (make_item(),))
+
+        restarted = FileOutbox(path)
+
+        assert restarted.peek("telegram") == entry
+        assert Entry.from_dict(entry.items[0]) == make_item()
+        # New ids never collide with journaled ones.
+        later = await restarted.enqueue("telegram", "again", ())
+        assert later.id > entry.id
+
+    @pytest.mark.asyncio
+    async def test_acked_entries_are_gone_after_a_restart(
+        self, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "outbox.json"
+        outbox = FileOutbox(path)
+        entry = await outbox.enqueue("telegram", "hello", ())
+        await outbox.ack("telegram", entry.id)
+
+        assert FileOutbox(path).pending("telegram") == 0
+
+    def test_corrupt_journal_starts_empty(self, tmp_path: Path) -> None:
+        path = tmp_path / "outbox.json"
+        path.write_text("{not json")
+
+        assert FileOutbox(path).pending("telegram") == 0
+
+    def test_journal_of_the_wrong_shape_starts_empty(
+        self, tmp_path: Path
+    ) -> None:
+        path = tmp_path / "outbox.json"
+        path.write_text('{"channels": []}')
+
+        assert FileOutbox(path).pending("telegram") == 0
+
+
+    @pytest.mark.asyncio
+    async def test_an_unjournaled_entry_is_not_queued(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        outbox = FileOutbox(tmp_path / "outbox.json")
+        kept = await outbox.enqueue("telegram", "kept", ())
+
+        def full_disk(*_: Any) -> None:
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr("outbox.write_json_atomic", full_disk)
+        with pytest.raises(OSError):
+            await outbox.enqueue("telegram", "lost", ())
+
+        assert outbox.pending("telegram") == 1
+        assert outbox.peek("telegram") == kept
+
+
+class TestDeliveryWorker:
+    @pytest.mark.asyncio
+    async def test_delivers_acks_and_tracks_for_enrichment(self) -> None:
+        outbox = MemoryOutbox()
+        notifier = RecordingNotifier(name="telegram", message_id=5)
+        enricher = StubEnricher()
+        worker = DeliveryWorker(notifier, outbox, enricher)  # type: ignore[arg-type]
+        entry = await outbox.enqueue("telegram", "hello", (make_item(),))
+
+        assert await worker.deliver(entry) is True
+
+        assert notifier.sent == ["hello"]
+        assert outbox.pending("telegram") == 0
+        assert enricher.tracked == [("telegram", 5, (make_item(),))]
+
+    @pytest.mark.asyncio
+    async def test_confirmed_delivery_records_the_lag(self) -> None:
+        outbox = MemoryOutbox()
+        lag = LagTracker(clock=lambda: 1708675230.0)
+        worker = DeliveryWorker(
+            RecordingNotifier(name="telegram"), outbox, lag=lag
+        )
+        entry = await outbox.enqueue("telegram", "hello", (make_item(),))
+
+        await worker.deliver(entry)
+
+        (stats,) = lag.stats()
+        assert (stats.stage, stats.channel, stats.p50) == (
+            DELIVERED,
+            "telegram",
+            30,
+        )
+
+    @pytest.mark.asyncio
+    async def test_a_failed_track_still_acks_the_sent_entry(self) -> None:
+        class FailingEnricher(StubEnricher):
+            def track(
+                self, notifier: Any, message_id: int, items: Any
+            ) -> None:
+                raise ValueError("legacy journal item")
+
+        class CountingOutbox(MemoryOutbox):
+            def __init__(self) -> None:
+                super().__init__()
+                self.acked: list[int] = []
+
+            async def ack(self, channel: str, entry_id: int) -> None:
+                self.acked.append(entry_id)
+                await super().ack(channel, entry_id)
+
+        outbox = CountingOutbox()
+        notifier = RecordingNotifier(name="telegram", message_id=5)
+        worker = DeliveryWorker(
+            notifier,
+            outbox,
+            FailingEnricher(),  # type: ignore[arg-type]
+            retry_delay=0.01,
+            idle_timeout=0.01,
+        )
+        entry = await outbox.enqueue("telegram", "hello", (make_item(),))
+        stop = Event()
+
+        task = create_task(worker.run(stop))
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert notifier.sent == ["hello"]
+        assert outbox.acked == [entry.id]
+        assert outbox.pending("telegram") == 0
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_keeps_the_entry(self) -> None:
+        outbox = MemoryOutbox()
+        notifier = RecordingNotifier(name="telegram")
+        notifier.fail_with = NotifyError("telegram down")
+        worker = DeliveryWorker(notifier, outbox)
+        entry = await outbox.enqueue("telegram", "hello", ())
+
+        assert await worker.deliver(entry) is False
+
+        assert outbox.peek("telegram") == entry
+        assert worker.failures == 1
+
+    @pytest.mark.asyncio
+    async def test_permanent_rejection_drops_the_entry(self) -> None:
+        outbox = MemoryOutbox()
+        notifier = RecordingNotifier(name="telegram")
+        notifier.fail_with = NotifyError("bad message", permanent=True)
+        worker = DeliveryWorker(notifier, outbox)
+        entry = await outbox.enqueue("telegram", "hello", ())
+
+        assert await worker.deliver(entry) is True
+
+        assert outbox.pending("telegram") == 0
+
+    @pytest.mark.asyncio
+    async def test_run_drains_until_stopped(self) -> None:
+        outbox = MemoryOutbox()
+        notifier = RecordingNotifier(name="telegram")
+        worker = DeliveryWorker(notifier, outbox, idle_timeout=0.01)
+        await outbox.enqueue("telegram", "one", ())
+        await outbox.enqueue("telegram", "two", ())
+        stop = Event()
+
+        task = create_task(worker.run(stop))
+        await sleep(0.05)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert notifier.sent == ["one", "two"]
+
+    @pytest.mark.asyncio
+    async def test_run_retries_after_a_transient_failure(self) -> None:
+        outbox = MemoryOutbox()
+        notifier = RecordingNotifier(name="telegram")
+        notifier.fail_with = NotifyError("telegram down")
+        worker = DeliveryWorker(notifier, outbox, retry_delay=0.01)
+        await outbox.enqueue("telegram", "one", ())
+        stop = Event()
+
+        task = create_task(worker.run(stop))
+        await sleep(0.03)
+        notifier.fail_with = None
+        await sleep(0.1)
+        stop.set()
+        await wait_for(task, timeout=1)
+
+        assert notifier.sent == ["one"]
+
+
+class TestWatcherWithOutbox:
+    def make_watcher(
+        self, outbox: MemoryOutbox, store: MemoryStateStore
+    ) -> tuple[GateWatcher, RecordingNotifier]:
+        notifier = RecordingNotifier(name="telegram")
+        watcher = GateWatcher(
+            source="gate",
+            client=ScriptedPalgateClient(  # type: ignore[arg-type]
+                [
+                    make_response(BASE_LOG_ITEM_DATA),
+                    make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+                ]
+            ),
+            store=store,
+            notifiers=(notifier,),
+            cron_delay=0,
+            outbox=outbox,
+        )
+        return watcher, notifier
+
+    @pytest.mark.asyncio
+    async def test_poll_journals_the_batch_and_advances_the_marker(
+        self,
+    ) -> None:
+        outbox = MemoryOutbox()
+        store = MemoryStateStore()
+        watcher, notifier = self.make_watcher(outbox, store)
+
+        await watcher.poll_once()
+        assert await watcher.poll_once() is True
+
+        assert notifier.sent == []  # the worker delivers, not the poll
+        entry = outbox.peek("telegram")
+        assert entry is not None and "Jane Smith" in entry.text
+        assert await store.get_marker("gate", "telegram") == (
+            "1708675300:79009876543"
+        )
+        assert watcher.status().queued == {"telegram": 1}
+
+    @pytest.mark.asyncio
+    async def test_one_worker_per_channel(self) -> None:
+        watcher, _ = self.make_watcher(MemoryOutbox(), MemoryStateStore())
+
+        assert [worker.channel for worker in watcher.workers] == ["telegram"]
+
+    @pytest.mark.asyncio
+    async def test_a_channel_can_be_repointed_but_not_added(self) -> None:
+        watcher, _ = self.make_watcher(MemoryOutbox(), MemoryStateStore())
+        repointed = RecordingNotifier(name="telegram")
+
+        assert watcher.replace_notifiers((repointed,)) is True
+        assert watcher.replace_notifiers(
+            (repointed, RecordingNotifier(name="max"))
+        ) is False
+        assert watcher.status().channels == ("telegram",)
+
+        worker = watcher.workers[0]
+        assert worker._notifier is repointed
+
+    @pytest.mark.asyncio
+    async def test_no_workers_without_an_outbox(self) -> None:
+        watcher = GateWatcher(
+            source="gate",
+            client=ScriptedPalgateClient([]),  # type: ignore[arg-type]
+            store=MemoryStateStore(),
+            notifiers=(RecordingNotifier(name="telegram"),),
+            cron_delay=0,
+        )
+
+        assert watcher.workers == ()
+        assert watcher.status().queued == {}
@@ -1,13 +1,22 @@
+from asyncio import Event, create_task, sleep
 from typing import Callable, List, Tuple
 
 import pytest
 from httpx import AsyncClient, ConnectError, MockTransport, Request, Response
 from pylgate.types import TokenType
 
+from breaker import CircuitBreaker
+from deadline import budget
 from palgate import (
+    FETCH_RETRIES,
+    FETCH_SECONDS,
+    FETCH_UNCHANGED,
+    TOKEN_SECONDS,
+    TOKENS,
     AuthError,
     InvalidResponseError,
     PalgateClient,
+    TokenProvider,
     TransientFetchError,
 )
 from tests.conftest import (
@@ -28,7 +37,10 @@ VALID_PAYLOAD = {
 
 
 def make_client(
-    handler: Handler, tries: int = 3
+    handler: Handler,
+    tries: int = 3,
+    breaker: CircuitBreaker | None = None,
+    delay: float = 0,
 ) -> Tuple[PalgateClient, List[Request]]:
     seen: List[Request] = []
 
@@ -44,7 +56,8 @@ def make_client(
         user_id=12345,
         token_type=TokenType.SMS,
         tries=tries,
-        delay=0,
+        delay=delay,
+        breaker=breaker,
     )
     return client, seen
 
@@ -100,6 +113,20 @@ class TestRetries:
         assert response.status == "ok"
         assert len(seen) == 3
 
+    @pytest.mark.asyncio
+    async def test_attempts_and_retries_are_metered(self) -> None:
+        responses = [Response(503), Response(200, json=VALID_PAYLOAD)]
+        client, _ = make_client(lambda _: responses.pop(0), tries=3)
+        retries = FETCH_RETRIES.value()
+        failed = FETCH_SECONDS.count(outcome="5xx")
+        succeeded = FETCH_SECONDS.count(outcome="2xx")
+
+        await client.fetch_log()
+
+        assert FETCH_RETRIES.value() == retries + 1
+        assert FETCH_SECONDS.count(outcome="5xx") == failed + 1
+        assert FETCH_SECONDS.count(outcome="2xx") == succeeded + 1
+
     @pytest.mark.asyncio
     async def test_persistent_5xx_raises_after_all_tries(self) -> None:
         client, seen = make_client(lambda _: Response(500), tries=2)
@@ -141,6 +168,65 @@ class TestRetries:
         assert all("X-Bt-Token" in request.headers for request in seen)
 
 
+class TestUnchangedLog:
+    @pytest.mark.asyncio
+    async def test_validators_are_sent_back_and_304_reuses_the_response(
+        self,
+    ) -> None:
+        responses = [
+            Response(
+                200,
+                json=VALID_PAYLOAD,
+                headers={"ETag": '"v1"', "Last-Modified": "Mon, 1 Jan 2024"},
+            ),
+            Response(304),
+        ]
+        client, seen = make_client(lambda _: responses.pop(0))
+        not_modified = FETCH_UNCHANGED.value(reason="not_modified")
+
+        first = await client.fetch_log()
+        second = await client.fetch_log()
+
+        assert second is first
+        assert "If-None-Match" not in seen[0].headers
+        assert seen[1].headers["If-None-Match"] == '"v1"'
+        assert seen[1].headers["If-Modified-Since"] == "Mon, 1 Jan 2024"
+        assert FETCH_UNCHANGED.value(reason="not_modified") == not_modified + 1
+
+    @pytest.mark.asyncio
+    async def test_identical_body_is_not_parsed_again(self) -> None:
+        client, _ = make_client(lambda _: Response(200, json=VALID_PAYLOAD))
+        same_body = FETCH_UNCHANGED.value(reason="same_body")
+
+        first = await client.fetch_log()
+        second = await client.fetch_log()
+
+        assert second is first
+        assert FETCH_UNCHANGED.value(reason="same_body") == same_body + 1
+
+    @pytest.mark.asyncio
+    async def test_changed_body_is_parsed(self) -> None:
+        payloads = [
+            {**VALID_PAYLOAD, "log": [BASE_LOG_ITEM_DATA]},
+            VALID_PAYLOAD,
+        ]
+        client, _ = make_client(lambda _: Response(200, json=payloads.pop(0)))
+
+        first = await client.fetch_log()
+        second = await client.fetch_log()
+
+        assert second is not first
+        assert second.log is not None
+        assert len(second.log) == 2
+
+    @pytest.mark.asyncio
+    async def test_304_without_a_previous_response_is_invalid(self) -> None:
+        client, _ = make_client(lambda _: Response(304))
+
+        with pytest.raises(InvalidResponseError, match="304"):
+            await client.fetch_log()
+
+
 class TestAuthErrors:
     @pytest.mark.asyncio
     @pytest.mark.parametrize("status_code", [400, 401, 402, 403, 404])
@@ -154,3 +240,204 @@ class TestAuthErrors:
 
         assert exc_info.value.status_code == status_code
         assert len(seen) == 1
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_outage_opens_the_circuit(self) -> None:
+        breaker = CircuitBreaker("palgate", failures=2)
+        client, seen = make_client(
+            lambda _: Response(503), tries=2, breaker=breaker
+        )
+        for _ in range(2):
+            with pytest.raises(TransientFetchError):
+                await client.fetch_log()
+        assert len(seen) == 4
+
+        with pytest.raises(TransientFetchError, match="circuit open"):
+            await client.fetch_log()
+
+        assert len(seen) == 4
+
+    @pytest.mark.asyncio
+    async def test_transport_failures_count_too(self) -> None:
+        def handler(request: Request) -> Response:
+            raise ConnectError("down", request=request)
+
+        breaker = CircuitBreaker("palgate", failures=1)
+        client, _ = make_client(handler, tries=1, breaker=breaker)
+
+        with pytest.raises(TransientFetchError, match="transport"):
+            await client.fetch_log()
+
+        assert breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_a_successful_probe_closes_it(self) -> None:
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "palgate", failures=1, cooldown=30, clock=lambda: now[0]
+        )
+        responses = [Response(503), Response(200, json=VALID_PAYLOAD)]
+        client, seen = make_client(
+            lambda _: responses.pop(0), tries=1, breaker=breaker
+        )
+        with pytest.raises(TransientFetchError):
+            await client.fetch_log()
+        now[0] = 30
+
+        response = await client.fetch_log()
+
+        assert response.status == "ok"
+        assert breaker.state == "closed"
+        assert len(seen) == 2
+
+    @pytest.mark.asyncio
+    async def test_rejected_requests_leave_it_closed(self) -> None:
+        breaker = CircuitBreaker("palgate", failures=1)
+        client, _ = make_client(lambda _: Response(401), breaker=breaker)
+
+        with pytest.raises(AuthError):
+            await client.fetch_log()
+
+        assert breaker.state == "closed"
+
+
+class TestDeadline:
+    @pytest.mark.asyncio
+    async def test_no_request_once_the_cycle_is_out_of_time(self) -> None:
+        breaker = CircuitBreaker("palgate", failures=1)
+        client, seen = make_client(
+            lambda _: Response(200, json=VALID_PAYLOAD), breaker=breaker
+        )
+
+        with budget(0), pytest.raises(TransientFetchError, match="out of time"):
+            await client.fetch_log()
+
+        assert seen == []
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_no_retry_that_would_end_past_the_deadline(self) -> None:
+        client, seen = make_client(lambda _: Response(503), tries=3, delay=30)
+
+        with budget(10), pytest.raises(TransientFetchError, match="503"):
+            await client.fetch_log()
+
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_attempt_timeout_is_cut_to_the_time_left(self) -> None:
+        client, seen = make_client(lambda _: Response(200, json=VALID_PAYLOAD))
+
+        with budget(2):
+            await client.fetch_log()
+
+        assert seen[0].extensions["timeout"]["read"] <= 2
+
+
+class FakeClock:
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def stamps(monkeypatch: pytest.MonkeyPatch) -> List[int]:
+    """Timestamps of the tokens generated; each token is its timestamp."""
+    generated: List[int] = []
+
+    def fake_generate_token(*_: object, timestamp_ms: int) -> str:
+        generated.append(timestamp_ms)
+        return str(timestamp_ms)
+
+    monkeypatch.setattr("palgate.generate_token", fake_generate_token)
+    return generated
+
+
+def make_provider(slot: int, clock: FakeClock) -> TokenProvider:
+    return TokenProvider(
+        bytes.fromhex(SESSION_TOKEN_HEX),
+        12345,
+        TokenType.SMS,
+        slot=slot,
+        clock=clock,
+    )
+
+
+class TestTokenProvider:
+    def test_zero_slot_generates_a_token_per_request(
+        self, stamps: List[int]
+    ) -> None:
+        provider = make_provider(0, FakeClock(1000.7))
+
+        provider.current()
+        provider.current()
+
+        assert stamps == [1000, 1000]
+
+    def test_token_is_shared_within_its_slot(self, stamps: List[int]) -> None:
+        clock = FakeClock(1001.2)
+        provider = make_provider(2, clock)
+
+        first = provider.current()
+        clock.now = 1001.9
+        second = provider.current()
+        clock.now = 1002.1
+        third = provider.current()
+
+        assert first == second == "1000"
+        assert third == "1002"
+        assert stamps == [1000, 1002]
+
+    @pytest.mark.asyncio
+    async def test_run_prepares_the_upcoming_slot_in_advance(
+        self, stamps: List[int]
+    ) -> None:
+        clock = FakeClock(1000.0)
+        provider = make_provider(2, clock)
+        stop = Event()
+        task = create_task(provider.run(stop))
+        await sleep(0)
+        ready_before = TOKENS.value(source="ready")
+        inline_before = TOKENS.value(source="inline")
+
+        clock.now = 1002.5
+        token = provider.current()
+        stop.set()
+        await task
+
+        assert token == "1002"
+        assert stamps == [1000, 1002]
+        assert TOKENS.value(source="ready") == ready_before + 1
+        assert TOKENS.value(source="inline") == inline_before
+
+    @pytest.mark.asyncio
+    async def test_client_requests_use_the_provider(
+        self, stamps: List[int]
+    ) -> None:
+        responses = [Response(500), Response(200, json=VALID_PAYLOAD)]
+        seen: List[Request] = []
+
+        def handler(request: Request) -> Response:
+            seen.append(request)
+            return responses.pop(0)
+
+        async with AsyncClient(transport=MockTransport(handler)) as http:
+            client = PalgateClient(
+                http=http,
+                url="https://api.test/log",
+                session_token=bytes.fromhex(SESSION_TOKEN_HEX),
+                user_id=12345,
+                token_type=TokenType.SMS,
+                delay=0,
+                tokens=make_provider(2, FakeClock(1001.0)),
+            )
+            await client.fetch_log()
+
+        # The retry lands in the same slot and reuses its token.
+        assert [r.headers["X-Bt-Token"] for r in seen] == ["1000", "1000"]
+        assert stamps == [1000]
+        assert TOKEN_SECONDS.count() > 0
@@ -0,0 +1,80 @@
+from json import dumps as json_dumps
+from typing import Any, Dict
+
+import pytest
+from pydantic import ValidationError
+
+from models import LazyLog, LogItem
+from parsing import PARSE_SECONDS, LogParseError, LogParser, compact_log
+from tests.conftest import BASE_LOG_ITEM_DATA, SECOND_LOG_ITEM_DATA
+
+
+def body(*items: Dict[str, Any], status: str = "ok") -> bytes:
+    return json_dumps(
+        {"log": list(items), "err": False, "msg": "", "status": status}
+    ).encode()
+
+
+class TestInline:
+    @pytest.mark.asyncio
+    async def test_small_bodies_are_parsed_inline(self) -> None:
+        parser = LogParser(workers=2, threshold=10**6)
+        inline = PARSE_SECONDS.count(path="inline")
+
+        response = await parser.parse(
+            body(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA)
+        )
+
+        assert response.log is not None
+        assert response.log[0].userId == SECOND_LOG_ITEM_DATA["userId"]
+        assert PARSE_SECONDS.count(path="inline") == inline + 1
+
+    @pytest.mark.asyncio
+    async def test_errors_name_the_stage(self) -> None:
+        parser = LogParser()
+
+        with pytest.raises(LogParseError, match="JSON decode error"):
+            await parser.parse(b"not json")
+        with pytest.raises(LogParseError, match="Model validation error"):
+            await parser.parse(body(BASE_LOG_ITEM_DATA, status="error"))
+
+
+class TestCompactLog:
+    def test_entries_round_trip_through_tuples(self) -> None:
+        err, msg, status, entries = compact_log(
+            body(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA)
+        )
+
+        assert (err, status) == (False, "ok")
+        assert all(isinstance(entry, tuple) for entry in entries)
+
+    def test_malformed_entry_is_passed_through_raw(self) -> None:
+        malformed = {**BASE_LOG_ITEM_DATA, "time": "not a time"}
+
+        _, _, _, entries = compact_log(body(SECOND_LOG_ITEM_DATA, malformed))
+
+        assert isinstance(entries[0], tuple)
+        assert entries[1] == malformed
+
+
+class TestPool:
+    @pytest.mark.asyncio
+    async def test_large_bodies_are_parsed_in_a_worker(self) -> None:
+        parser = LogParser(workers=1, threshold=0)
+        malformed = {**BASE_LOG_ITEM_DATA, "time": "not a time"}
+        pool = PARSE_SECONDS.count(path="pool")
+        try:
+            response = await parser.parse(
+                body(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA, malformed)
+            )
+            with pytest.raises(LogParseError, match="JSON decode error"):
+                await parser.parse(b"not json")
+        finally:
+            parser.shutdown()
+
+        assert PARSE_SECONDS.count(path="pool") == pool + 2
+        assert isinstance(response.log, LazyLog)
+        assert response.log[0] == LogItem.model_validate(SECOND_LOG_ITEM_DATA)
+        # Still lazy: the bad entry only fails once it is read.
+        with pytest.raises(ValidationError):
+            response.log[2]
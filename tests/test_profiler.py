@@ -0,0 +1,48 @@
+from asyncio import create_task, sleep
+from time import perf_counter
+
+import pytest
+
+from profiler import profile_loop
+
+HOARD: list[bytes] = []
+
+
+def spin(seconds: float) -> None:
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        pass
+
+
+async def busy_job() -> None:
+    for _ in range(5):
+        spin(0.05)
+        HOARD.append(bytes(64 * 1024))
+        await sleep(0.01)
+
+
+class TestProfileLoop:
+    @pytest.mark.asyncio
+    async def test_attributes_samples_to_the_busy_code(self) -> None:
+        job = create_task(busy_job())
+
+        profile = await profile_loop(0.4, interval=0.002)
+        await job
+        HOARD.clear()
+
+        assert profile.samples > 0
+        assert profile.top_self[0].name.startswith("spin (test_profiler.py")
+        assert any(
+            stat.name.startswith("busy_job") for stat in profile.top_total
+        )
+        assert any(
+            stat.site.startswith("test_profiler.py")
+            for stat in profile.allocations
+        )
+
+    @pytest.mark.asyncio
+    async def test_waiting_for_io_counts_as_idle(self) -> None:
+        profile = await profile_loop(0.1, interval=0.002)
+
+        assert profile.samples > 0
+        assert profile.busy < 0.5
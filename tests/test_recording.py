@@ -0,0 +1,150 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from httpx import (
+    AsyncBaseTransport,
+    AsyncClient,
+    MockTransport,
+    Request,
+    Response,
+)
+from pylgate.types import TokenType
+
+from disk_io import DiskExecutor
+from palgate import PalgateClient
+from recording import CaptureWriter, Frame, ReplayTransport, read_capture
+from tests.conftest import (
+    BASE_LOG_ITEM_DATA,
+    SECOND_LOG_ITEM_DATA,
+    SESSION_TOKEN_HEX,
+)
+
+
+def body(*items: Dict[str, Any]) -> str:
+    return Response(
+        200, json={"log": list(items), "err": False, "msg": "", "status": "ok"}
+    ).text
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_client(
+    transport: AsyncBaseTransport, recorder: CaptureWriter | None = None
+) -> PalgateClient:
+    return PalgateClient(
+        http=AsyncClient(transport=transport),
+        url="https://api.test/log",
+        session_token=bytes.fromhex(SESSION_TOKEN_HEX),
+        user_id=12345,
+        token_type=TokenType.SMS,
+        delay=0,
+        recorder=recorder,
+    )
+
+
+class TestCapture:
+    @pytest.mark.asyncio
+    async def test_client_records_every_response(self, tmp_path: Path) -> None:
+        responses = [Response(503), Response(200, text=body(BASE_LOG_ITEM_DATA))]
+        disk = DiskExecutor()
+        path = tmp_path / "capture.jsonl.gz"
+        client = make_client(
+            MockTransport(lambda request: responses.pop(0)),
+            CaptureWriter(path, disk=disk, clock=lambda: 1000.0),
+        )
+
+        await client.fetch_log()
+        disk.flush()
+
+        frames = list(read_capture(path))
+        assert [frame.status for frame in frames] == [503, 200]
+        assert frames[1].body == body(BASE_LOG_ITEM_DATA)
+        assert frames[1].at == 1000.0
+
+    def test_unwritable_capture_is_only_logged(
+        self, tmp_path: Path, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        disk = DiskExecutor()
+        writer = CaptureWriter(tmp_path, disk=disk)  # a directory
+
+        writer.record(200, "{}", 0.1)
+        writer.record(200, "{}", 0.1)
+        disk.flush()
+
+        errors = [r for r in caplog.records if "capture" in r.message]
+        assert len(errors) == 1
+
+
+    def test_frames_are_encoded_in_the_disk_job(self, tmp_path: Path) -> None:
+        jobs: List[tuple[Any, ...]] = []
+
+        class QueueingDisk(DiskExecutor):
+            def submit(self, job: Any, *args: Any) -> Any:
+                jobs.append(args)
+
+        writer = CaptureWriter(
+            tmp_path / "capture.jsonl.gz", disk=QueueingDisk(), clock=lambda: 5.0
+        )
+
+        writer.record(200, "{}", 0.1)
+
+        assert jobs == [(Frame(5.0, 200, "{}", 0.1),)]
+
+
+class TestReplayTransport:
+    @pytest.mark.asyncio
+    async def test_serves_the_frame_current_on_the_virtual_clock(
+        self,
+    ) -> None:
+        clock = Clock()
+        transport = ReplayTransport(
+            [
+                Frame(100.0, 200, body(BASE_LOG_ITEM_DATA), 0),
+                Frame(160.0, 200, body(SECOND_LOG_ITEM_DATA), 0),
+            ],
+            speed=60,
+            clock=clock,
+        )
+        client = make_client(transport)
+
+        first = await client.fetch_log()
+        clock.now = 0.5  # 30 s of capture time
+        still_first = await client.fetch_log()
+        clock.now = 1.0  # 60 s: the second frame is due
+        second = await client.fetch_log()
+
+        assert first.log and first.log[0].sn == BASE_LOG_ITEM_DATA["sn"]
+        assert still_first.log == first.log
+        assert transport.now() == 160.0
+        assert second.log and second.log[0].sn == SECOND_LOG_ITEM_DATA["sn"]
+        assert transport.exhausted
+
+    @pytest.mark.asyncio
+    async def test_step_mode_serves_one_frame_per_request(self) -> None:
+        transport = ReplayTransport(
+            [
+                Frame(100.0, 503, "", 0),
+                Frame(500.0, 200, body(BASE_LOG_ITEM_DATA), 0),
+            ],
+            speed=None,
+        )
+        http = AsyncClient(transport=transport)
+        request = Request("GET", "https://api.test/log")
+
+        statuses = [
+            (await http.send(request)).status_code for _ in range(3)
+        ]
+
+        assert statuses == [503, 200, 200]
+        assert transport.exhausted and transport.served == 3
+
+    def test_empty_capture_is_refused(self) -> None:
+        with pytest.raises(ValueError):
+            ReplayTransport([])
@@ -0,0 +1,226 @@
+from typing import Any, Callable, List, Sequence
+
+from pydantic import ValidationError
+
+from config import Settings
+from enrich import Enricher
+from notify import Notifier
+from outbox import MemoryOutbox
+from reload import RELOADS, ReloadReport, SettingsReloader
+from resolver import CachingResolver, ProfileCache, RateLimiter
+from service import GateWatcher
+from state import MemoryStateStore
+from tests.conftest import RecordingNotifier, ScriptedPalgateClient
+
+
+class NoResolver:
+    async def resolve(self, phone: str) -> None:
+        return None
+
+
+def make_notifiers(settings: Settings) -> Sequence[Notifier]:
+    notifiers: List[Notifier] = [RecordingNotifier(name="telegram")]
+    if settings.MAX_API_TOKEN:
+        notifiers.append(RecordingNotifier(name="max"))
+    return notifiers
+
+
+def changed(settings: Settings, **values: Any) -> Settings:
+    return Settings(**{**settings.model_dump(), **values})
+
+
+def make_reloader(
+    settings: Settings,
+    loaded: List[Any],
+    outbox: MemoryOutbox | None = None,
+    enricher: Enricher | None = None,
+    notifiers: Callable[[Settings], Sequence[Notifier]] = make_notifiers,
+) -> tuple[SettingsReloader, GateWatcher]:
+    watcher = GateWatcher(
+        source="gate",
+        client=ScriptedPalgateClient([]),  # type: ignore[arg-type]
+        store=MemoryStateStore(),
+        notifiers=make_notifiers(settings),
+        cron_delay=settings.CRON_DELAY,
+        outbox=outbox,
+    )
+
+    def load() -> Settings:
+        result = loaded.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        assert isinstance(result, Settings)
+        return result
+
+    reloader = SettingsReloader(
+        settings, watcher, notifiers, enricher, load=load
+    )
+    return reloader, watcher
+
+
+def make_enricher() -> Enricher:
+    resolver = CachingResolver(
+        raw=NoResolver(),
+        cache=ProfileCache(positive_ttl=100, negative_ttl=10),
+        limiter=RateLimiter(min_interval=5, per_hour=20, per_day=150),
+    )
+    return Enricher(resolver, poll_interval=5)
+
+
+def invalid_settings(settings: Settings) -> ValidationError:
+    try:
+        changed(settings, CRON_DELAY=-1, SESSION_TOKEN="secret!")
+    except ValidationError as err:
+        return err
+    raise AssertionError("settings were accepted")
+
+
+class TestSettingsReloader:
+    def test_nothing_changed(self, settings: Settings) -> None:
+        reloader, _ = make_reloader(settings, [settings])
+
+        report = reloader.reload()
+
+        assert report == ReloadReport()
+        assert report.describe() == "Settings reloaded, nothing changed"
+
+    def test_watcher_timing_is_applied(self, settings: Settings) -> None:
+        new = changed(settings, CRON_DELAY=15, MAX_BACKOFF=30)
+        reloader, watcher = make_reloader(settings, [new])
+
+        report = reloader.reload()
+
+        assert report.applied == ("CRON_DELAY", "MAX_BACKOFF")
+        assert report.restart == ()
+        assert watcher._cron_delay == 15
+        assert watcher._max_backoff == 30
+        assert reloader.settings.CRON_DELAY == 15
+
+    def test_an_added_channel_is_applied(self, settings: Settings) -> None:
+        new = changed(settings, MAX_API_TOKEN="max-token", MAX_CHAT_ID=7)
+        reloader, watcher = make_reloader(settings, [new])
+
+        report = reloader.reload()
+
+        assert report.applied == ("MAX_API_TOKEN", "MAX_CHAT_ID")
+        assert watcher.status().channels == ("telegram", "max")
+
+    def test_channels_are_built_without_the_other_changes(
+        self, settings: Settings
+    ) -> None:
+        built: List[Settings] = []
+
+        def notifiers(settings: Settings) -> Sequence[Notifier]:
+            built.append(settings)
+            return make_notifiers(settings)
+
+        new = changed(
+            settings, MAX_API_TOKEN="max-token", TELEGRAM_API_TOKEN="new-token"
+        )
+        reloader, _ = make_reloader(settings, [new], notifiers=notifiers)
+
+        report = reloader.reload()
+
+        assert report.applied == ("MAX_API_TOKEN",)
+        assert report.restart == ("TELEGRAM_API_TOKEN",)
+        (used,) = built
+        assert used.MAX_API_TOKEN == "max-token"
+        assert used.TELEGRAM_API_TOKEN == settings.TELEGRAM_API_TOKEN
+
+    def test_an_added_channel_needs_a_restart_with_an_outbox(
+        self, settings: Settings
+    ) -> None:
+        new = changed(settings, MAX_API_TOKEN="max-token")
+        reloader, watcher = make_reloader(
+            settings, [new, new], outbox=MemoryOutbox()
+        )
+
+        assert reloader.reload().restart == ("MAX_API_TOKEN",)
+        assert watcher.status().channels == ("telegram",)
+        # Still not in effect, so still reported.
+        assert reloader.reload().restart == ("MAX_API_TOKEN",)
+
+    def test_resolver_knobs_are_applied(self, settings: Settings) -> None:
+        enricher = make_enricher()
+        new = changed(
+            settings,
+            RESOLVE_MIN_INTERVAL=60,
+            RESOLVE_NEGATIVE_TTL=1,
+            RESOLVE_POLL_INTERVAL=30,
+        )
+        reloader, _ = make_reloader(settings, [new], enricher=enricher)
+
+        report = reloader.reload()
+
+        assert report.applied == (
+            "RESOLVE_MIN_INTERVAL",
+            "RESOLVE_NEGATIVE_TTL",
+            "RESOLVE_POLL_INTERVAL",
+        )
+        limiter = enricher.resolver.limiter
+        assert limiter.try_acquire(now=0) is True
+        assert limiter.try_acquire(now=30) is False
+        cache = enricher.resolver.cache
+        cache.put("79001", None, now=0)
+        assert cache.lookup("79001", now=2) is None
+        assert enricher.poll_interval == 30
+
+    def test_resolver_knobs_need_a_restart_without_enrichment(
+        self, settings: Settings
+    ) -> None:
+        new = changed(settings, RESOLVE_PER_DAY=10)
+        reloader, _ = make_reloader(settings, [new])
+
+        assert reloader.reload().restart == ("RESOLVE_PER_DAY",)
+
+    def test_the_rest_needs_a_restart(self, settings: Settings) -> None:
+        new = changed(settings, CRON_DELAY=15, DEVICE_ID="other")
+        reloader, _ = make_reloader(settings, [new])
+
+        report = reloader.reload()
+
+        assert report.applied == ("CRON_DELAY",)
+        assert report.restart == ("DEVICE_ID",)
+        assert reloader.settings.DEVICE_ID == "test_device"
+        assert report.describe() == (
+            "Settings reloaded; applied: CRON_DELAY; "
+            "need a restart: DEVICE_ID"
+        )
+
+    def test_invalid_settings_change_nothing(self, settings: Settings) -> None:
+        before = RELOADS.value(outcome="invalid")
+        reloader, watcher = make_reloader(
+            settings, [invalid_settings(settings)]
+        )
+
+        report = reloader.reload()
+
+        assert report.error is not None
+        assert "CRON_DELAY" in report.error
+        assert "SESSION_TOKEN" in report.error
+        assert "secret!" not in report.describe()
+        assert watcher._cron_delay == settings.CRON_DELAY
+        assert reloader.settings is settings
+        assert RELOADS.value(outcome="invalid") == before + 1
+
+    def test_unreadable_file_changes_nothing(self, settings: Settings) -> None:
+        reloader, _ = make_reloader(settings, [OSError("disk gone")])
+
+        report = reloader.reload()
+
+        assert report.describe() == "Settings not reloaded: cannot read: disk gone"
+
+    def test_any_load_error_is_a_failed_reload(
+        self, settings: Settings
+    ) -> None:
+        before = RELOADS.value(outcome="invalid")
+        reloader, _ = make_reloader(settings, [ValueError("line 3: secret")])
+
+        report = reloader.reload()
+
+        assert report.describe() == (
+            "Settings not reloaded: cannot load: ValueError"
+        )
+        assert "secret" not in report.describe()
+        assert reloader.settings is settings
+        assert RELOADS.value(outcome="invalid") == before + 1
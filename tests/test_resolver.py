@@ -129,6 +129,33 @@ class TestProfileCache:
         assert cache.lookup("79001", now=0) is None
         assert cache.clear() == 0
 
+    def test_version_moves_only_when_a_lookup_could_change(self) -> None:
+        cache = ProfileCache(positive_ttl=100, negative_ttl=10)
+        versions = [cache.version]
+        cache.put("79001", PROFILE, now=0)
+        versions.append(cache.version)
+        cache.put("79001", PROFILE, now=5)  # same profile, only extended
+        assert cache.version == versions[-1]
+        cache.put("79001", Profile(user_id=1, username="renamed"), now=5)
+        versions.append(cache.version)
+        assert cache.lookup("79001", now=200) is None  # expired
+        versions.append(cache.version)
+        cache.clear()
+        versions.append(cache.version)
+        assert len(set(versions)) == len(versions)
+
+
+    def test_new_ttls_apply_to_later_puts_only(self) -> None:
+        cache = ProfileCache(positive_ttl=100, negative_ttl=10)
+        cache.put("79001", PROFILE, now=0)
+        cache.set_ttls(positive_ttl=1000, negative_ttl=1)
+        cache.put("79002", PROFILE, now=0)
+        cache.put("79003", None, now=0)
+
+        assert cache.lookup("79001", now=101) is None
+        assert cache.lookup("79002", now=101) is not None
+        assert cache.lookup("79003", now=2) is None
+
 
 class TestRateLimiter:
     def test_spacing_blocks_back_to_back(self) -> None:
@@ -176,6 +203,19 @@ class TestRateLimiter:
         assert restored.cooldown_remaining(now=1) == pytest.approx(54)
 
 
+    def test_new_limits_count_the_calls_already_made(self) -> None:
+        limiter = RateLimiter(min_interval=0, per_hour=100, per_day=100)
+        assert limiter.try_acquire(now=0) is True
+        assert limiter.try_acquire(now=10) is True
+
+        limiter.set_limits(min_interval=60, per_hour=2, per_day=100)
+
+        assert limiter.try_acquire(now=70) is False  # hourly cap reached
+        limiter.set_limits(min_interval=60, per_hour=3, per_day=100)
+        assert limiter.try_acquire(now=30) is False  # spacing
+        assert limiter.try_acquire(now=70) is True
+
+
 class TestCachingResolver:
     @pytest.mark.asyncio
     async def test_cache_hit_skips_raw(self) -> None:
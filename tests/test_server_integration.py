@@ -9,8 +9,9 @@ validation — nothing on the client side is faked except the delivery channel
 pylgate tokens embed the current timestamp (a token is valid for roughly five
 seconds) and the mock server validates tokens by exact match against the ones
 it generated at startup. To keep the tests deterministic, token generation is
-pinned to a fixed timestamp on both sides through the public ``timestamp_ms``
-parameter of ``pylgate.token_generator.generate_token``.
+pinned to a fixed timestamp: on the server through the public ``timestamp_ms``
+parameter of ``pylgate.token_generator.generate_token``, on the client through
+the clock of its ``TokenProvider``.
 
 Both projects define top-level modules named ``models``, so the server modules
 are imported under a temporary ``sys.path``/``sys.modules`` and never leak into
@@ -42,7 +43,12 @@ from werkzeug.serving import make_server
 
 from models import LogItem
 from notify import NotifyError
-from palgate import AuthError, InvalidResponseError, PalgateClient
+from palgate import (
+    AuthError,
+    InvalidResponseError,
+    PalgateClient,
+    TokenProvider,
+)
 from service import GateWatcher, item_key
 from state import MemoryStateStore
 from tests.conftest import RecordingNotifier
@@ -175,7 +181,7 @@ def mock_server() -> Iterator[MockServer]:
 
 @pytest_asyncio.fixture
 async def make_harness(
-    mock_server: MockServer, monkeypatch: pytest.MonkeyPatch
+    mock_server: MockServer,
 ) -> Iterator[Callable[..., Harness]]:
     """Factory for GateWatcher stacks pointed at the live mock server."""
     clients: List[AsyncClient] = []
@@ -190,12 +196,6 @@ async def make_harness(
         client_ts: int = FROZEN_TS,
         tries: int = 1,
     ) -> Harness:
-        # Pin the client-side token to the same (or a deliberately
-        # different) time window as the server.
-        monkeypatch.setattr(
-            "palgate.generate_token",
-            partial(generate_token, timestamp_ms=client_ts),
-        )
         http = AsyncClient()
         clients.append(http)
         palgate = PalgateClient(
@@ -206,6 +206,14 @@ async def make_harness(
             token_type=token_type,
             tries=tries,
             delay=0,
+            # Pin the client-side token to the same (or a deliberately
+            # different) time window as the server.
+            tokens=TokenProvider(
+                bytes.fromhex(session_token),
+                user_id,
+                token_type,
+                clock=lambda: client_ts,
+            ),
         )
         store = MemoryStateStore()
         notifier = RecordingNotifier(name="telegram")
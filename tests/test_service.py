@@ -5,10 +5,12 @@ from typing import Any, List, Sequence
 
 import pytest
 
-from models import Item, LogItem
+from deadline import remaining
+from lag import DELIVERED, FETCHED, LagTracker
+from models import Entry, LogItem
 from notify import NotifyError
-from palgate import AuthError, TransientFetchError
-from service import GateWatcher, item_key
+from palgate import AuthError, InvalidResponseError, TransientFetchError
+from service import POLL_SECONDS, GateWatcher, item_key
 from state import MemoryStateStore
 from tests.conftest import (
     BASE_LOG_ITEM_DATA,
@@ -29,6 +31,9 @@ def make_watcher(
     alert_after: int = 10,
     cron_delay: float = 0,
     enricher: Any = None,
+    message_limit: int = 4096,
+    lag: LagTracker | None = None,
+    cycle_budget: float = 45,
 ) -> tuple[GateWatcher, ScriptedPalgateClient, RecordingNotifier]:
     client = ScriptedPalgateClient(script)
     notifier = RecordingNotifier(name="telegram")
@@ -42,6 +47,9 @@ def make_watcher(
         alert_after=alert_after,
         heartbeat_path=heartbeat_path,
         enricher=enricher,
+        message_limit=message_limit,
+        lag=lag,
+        cycle_budget=cycle_budget,
     )
     return watcher, client, notifier
 
@@ -81,6 +89,35 @@ class TestFirstPoll:
         assert marker == "1708675200:79001234567"
 
 
+class TestReconfigure:
+    @pytest.mark.asyncio
+    async def test_an_added_channel_is_primed_on_an_unchanged_log(
+        self,
+    ) -> None:
+        store = MemoryStateStore()
+        response = make_response(BASE_LOG_ITEM_DATA)
+        watcher, _, notifier = make_watcher([response, response], store=store)
+        assert await watcher.poll_once() is True
+        added = RecordingNotifier(name="max")
+
+        assert watcher.replace_notifiers((notifier, added)) is True
+        assert await watcher.poll_once() is True
+
+        assert added.sent == []
+        assert await store.get_marker("gate", "max") == (
+            "1708675200:79001234567"
+        )
+        assert watcher.status().channels == ("telegram", "max")
+
+    def test_new_timing_drives_the_backoff(self) -> None:
+        watcher, _, _ = make_watcher([], cron_delay=60)
+
+        watcher.reconfigure(cron_delay=10, max_backoff=15, alert_after=3)
+
+        assert 10 <= watcher._backoff(1) <= 12.5
+        assert 15 <= watcher._backoff(5) <= 18.75
+
+
 class TestDelivery:
     @pytest.mark.asyncio
     async def test_no_new_items_means_no_sends(self) -> None:
@@ -92,6 +129,52 @@ class TestDelivery:
 
         assert notifier.sent == []
 
+    @pytest.mark.asyncio
+    async def test_unchanged_response_skips_the_fan_out(self) -> None:
+        store = MemoryStateStore()
+        response = make_response(BASE_LOG_ITEM_DATA)
+        watcher, _, _ = make_watcher([response, response], store=store)
+        await watcher.poll_once()
+        unchanged = POLL_SECONDS.count(outcome="unchanged")
+        # A fan-out would find a rewound marker and deliver the entry.
+        await store.advance(
+            "gate", "telegram", "1708675200:79001234567", "0:gone"
+        )
+
+        assert await watcher.poll_once() is True
+
+        assert POLL_SECONDS.count(outcome="unchanged") == unchanged + 1
+        assert await store.get_marker("gate", "telegram") == "0:gone"
+
+    @pytest.mark.asyncio
+    async def test_entries_below_the_marker_are_not_validated(self) -> None:
+        malformed = {**BASE_LOG_ITEM_DATA, "time": "not a time"}
+        head = make_response(BASE_LOG_ITEM_DATA)
+        page = make_response(
+            SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA, malformed
+        )
+        watcher, _, notifier = make_watcher([head, page])
+
+        await watcher.poll_once()
+        assert await watcher.poll_once() is True
+
+        assert len(notifier.sent) == 1
+        assert page.log is not None and page.log.validated == 2
+
+    @pytest.mark.asyncio
+    async def test_malformed_new_entry_is_an_invalid_response(self) -> None:
+        malformed = {**SECOND_LOG_ITEM_DATA, "time": "not a time"}
+        page = make_response(malformed, BASE_LOG_ITEM_DATA)
+        watcher, _, notifier = make_watcher(
+            [make_response(BASE_LOG_ITEM_DATA), page]
+        )
+        await watcher.poll_once()
+
+        with pytest.raises(InvalidResponseError, match="validation"):
+            await watcher.poll_once()
+
+        assert notifier.sent == []
+
     @pytest.mark.asyncio
     async def test_new_item_is_delivered_and_marker_advances(self) -> None:
         store = MemoryStateStore()
@@ -214,6 +297,245 @@ class TestDelivery:
         )
 
 
+class TestChunking:
+    # Each rendered test entry is well under 100 chars, two are not.
+    LIMIT = 100
+
+    def catch_up_script(self) -> List[Any]:
+        return [
+            make_response(BASE_LOG_ITEM_DATA),
+            make_response(
+                THIRD_LOG_ITEM_DATA, SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA
+            ),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_oversized_batch_is_split_on_line_boundaries(self) -> None:
+        watcher, _, notifier = make_watcher(
+            self.catch_up_script(), message_limit=self.LIMIT
+        )
+
+        await watcher.poll_once()
+        assert await watcher.poll_once() is True
+
+        assert len(notifier.sent) == 2
+        assert "Jane Smith" in notifier.sent[0]
+        assert "Bob Johnson" in notifier.sent[1]
+        assert all(len(text) <= self.LIMIT for text in notifier.sent)
+
+    @pytest.mark.asyncio
+    async def test_small_batch_stays_one_message(self) -> None:
+        watcher, _, notifier = make_watcher(self.catch_up_script())
+
+        await watcher.poll_once()
+        await watcher.poll_once()
+
+        assert len(notifier.sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_marker_advances_per_landed_chunk(self) -> None:
+        store = MemoryStateStore()
+        watcher, _, notifier = make_watcher(
+            self.catch_up_script(), store=store, message_limit=self.LIMIT
+        )
+        await watcher.poll_once()
+        sends = 0
+        original_send = notifier.send
+
+        async def fail_second_send(text: str) -> int | None:
+            nonlocal sends
+            sends += 1
+            if sends == 2:
+                raise NotifyError("telegram down")
+            return await original_send(text)
+
+        notifier.send = fail_second_send  # type: ignore[method-assign]
+
+        assert await watcher.poll_once() is False
+
+        # Only the landed chunk moved the marker; the next cycle resumes
+        # with Bob instead of resending Jane.
+        assert await store.get_marker("gate", "telegram") == (
+            "1708675300:79009876543"
+        )
+
+    @pytest.mark.asyncio
+    async def test_permanently_rejected_chunk_does_not_drop_the_rest(
+        self,
+    ) -> None:
+        store = MemoryStateStore()
+        watcher, _, notifier = make_watcher(
+            self.catch_up_script(), store=store, message_limit=self.LIMIT
+        )
+        await watcher.poll_once()
+        original_send = notifier.send
+
+        async def reject_jane(text: str) -> int | None:
+            if "Jane Smith" in text:
+                raise NotifyError("bad message", permanent=True)
+            return await original_send(text)
+
+        notifier.send = reject_jane  # type: ignore[method-assign]
+
+        assert await watcher.poll_once() is True
+
+        assert len(notifier.sent) == 1
+        assert "Bob Johnson" in notifier.sent[0]
+        assert await store.get_marker("gate", "telegram") == (
+            "1708675400:79001111111"
+        )
+
+    @pytest.mark.asyncio
+    async def test_every_chunk_is_tracked_for_enrichment(self) -> None:
+        enricher = StubEnricher()
+        notifier = RecordingNotifier(name="telegram", message_id=7)
+        watcher, _, _ = make_watcher(
+            self.catch_up_script(),
+            notifiers=(notifier,),
+            enricher=enricher,
+            message_limit=self.LIMIT + len("ENRICHED:"),
+        )
+
+        await watcher.poll_once()
+        await watcher.poll_once()
+
+        assert [len(items) for _, _, items in enricher.tracked] == [1, 1]
+
+
+class SlowNotifier(RecordingNotifier):
+    """Takes ``seconds`` per send and records the cycle time left."""
+
+    def __init__(self, name: str, seconds: float) -> None:
+        super().__init__(name=name)
+        self.seconds = seconds
+        self.time_left: List[float | None] = []
+
+    async def send(self, text: str) -> int | None:
+        self.time_left.append(remaining())
+        await sleep(self.seconds)
+        return await super().send(text)
+
+
+class TestCycleDeadline:
+    @pytest.mark.asyncio
+    async def test_sends_run_under_the_cycle_budget(self) -> None:
+        notifier = SlowNotifier("telegram", seconds=0)
+        watcher, _, _ = make_watcher(
+            [
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+            notifiers=(notifier,),
+            cycle_budget=30,
+        )
+        await watcher.poll_once()
+
+        await watcher.poll_once()
+
+        left = notifier.time_left[0]
+        assert left is not None and 0 < left <= 30
+
+    @pytest.mark.asyncio
+    async def test_channels_past_the_deadline_catch_up_next_cycle(
+        self,
+    ) -> None:
+        store = MemoryStateStore()
+        slow = SlowNotifier("telegram", seconds=0.05)
+        late = RecordingNotifier(name="max")
+        watcher, _, _ = make_watcher(
+            [
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+            notifiers=(slow, late),
+            store=store,
+            cycle_budget=0.01,
+        )
+        await watcher.poll_once()
+        out_of_time = POLL_SECONDS.count(outcome="out_of_time")
+
+        assert await watcher.poll_once() is False
+
+        assert len(slow.sent) == 1
+        assert late.sent == []
+        assert POLL_SECONDS.count(outcome="out_of_time") == out_of_time + 1
+        assert await store.get_marker("gate", "telegram") == (
+            "1708675300:79009876543"
+        )
+        assert await store.get_marker("gate", "max") == "1708675200:79001234567"
+
+        assert await watcher.poll_once() is True
+
+        assert len(slow.sent) == 1
+        assert len(late.sent) == 1
+
+
+class TestLag:
+    @pytest.mark.asyncio
+    async def test_fetch_and_delivery_lag_are_recorded(self) -> None:
+        # SECOND_LOG_ITEM_DATA happened at 1708675300; we "see" it 40s later.
+        lag = LagTracker(clock=lambda: 1708675340.0)
+        watcher, _, _ = make_watcher(
+            [
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+            lag=lag,
+        )
+
+        await watcher.poll_once()  # priming records nothing
+        assert watcher.status().lag == ()
+        await watcher.poll_once()
+
+        fetched, delivered = watcher.status().lag
+        assert (fetched.stage, fetched.channel, fetched.p50) == (
+            FETCHED,
+            "telegram",
+            40,
+        )
+        assert (delivered.stage, delivered.samples) == (DELIVERED, 1)
+
+    @pytest.mark.asyncio
+    async def test_failed_send_records_no_delivery(self) -> None:
+        lag = LagTracker(clock=lambda: 1708675340.0)
+        watcher, _, notifier = make_watcher(
+            [
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+            lag=lag,
+        )
+        notifier.fail_with = NotifyError("telegram down")
+
+        await watcher.poll_once()
+        await watcher.poll_once()
+
+        assert [stats.stage for stats in watcher.status().lag] == [FETCHED]
+
+
+    @pytest.mark.asyncio
+    async def test_a_retried_entry_records_its_fetch_lag_once(self) -> None:
+        now = [1708675340.0]
+        lag = LagTracker(clock=lambda: now[0])
+        watcher, _, notifier = make_watcher(
+            [
+                make_response(BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+                make_response(SECOND_LOG_ITEM_DATA, BASE_LOG_ITEM_DATA),
+            ],
+            lag=lag,
+        )
+        notifier.fail_with = NotifyError("telegram down")
+
+        await watcher.poll_once()
+        await watcher.poll_once()
+        now[0] += 60
+        await watcher.poll_once()
+
+        (fetched,) = watcher.status().lag
+        assert (fetched.samples, fetched.p99) == (1, 40)
+
 class TestRunLoop:
     @pytest.mark.asyncio
     async def test_loop_exits_when_stop_is_already_set(self) -> None:
@@ -515,7 +837,7 @@ class TestSendBatch:
         watcher, _, _ = make_watcher(
             [], notifiers=(notifier,), enricher=enricher
         )
-        item = Item.model_validate(BASE_LOG_ITEM_DATA)
+        item = Entry.from_log_item(LogItem.model_validate(BASE_LOG_ITEM_DATA))
 
         await watcher.send_batch(notifier, (item,))
 
@@ -527,7 +849,7 @@ class TestSendBatch:
         notifier = RecordingNotifier(name="prestable")
         watcher, _, _ = make_watcher([], notifiers=(notifier,))
         items = tuple(
-            Item.model_validate(data)
+            Entry.from_log_item(LogItem.model_validate(data))
             for data in (BASE_LOG_ITEM_DATA, SECOND_LOG_ITEM_DATA)
         )
 
@@ -542,7 +864,7 @@ class TestSendBatch:
         watcher, _, _ = make_watcher(
             [], notifiers=(notifier,), store=store
         )
-        item = Item.model_validate(BASE_LOG_ITEM_DATA)
+        item = Entry.from_log_item(LogItem.model_validate(BASE_LOG_ITEM_DATA))
 
         await watcher.send_batch(notifier, (item,))
 
@@ -553,7 +875,7 @@ class TestSendBatch:
         notifier = RecordingNotifier(name="prestable")
         notifier.fail_with = NotifyError("chat is gone")
         watcher, _, _ = make_watcher([], notifiers=(notifier,))
-        item = Item.model_validate(BASE_LOG_ITEM_DATA)
+        item = Entry.from_log_item(LogItem.model_validate(BASE_LOG_ITEM_DATA))
 
         with pytest.raises(NotifyError):
             await watcher.send_batch(notifier, (item,))
@@ -0,0 +1,27 @@
+import pytest
+
+from perf.soak import format_report, parse_args, soak
+
+
+class TestSoak:
+    @pytest.mark.asyncio
+    async def test_short_run_delivers_every_entry_once(self) -> None:
+        args = parse_args(
+            [
+                "--entries", "20",
+                "--rate", "50",
+                "--cron-delay", "0.1",
+                "--gate-latency", "0.01",
+                "--bot-latency", "0.01",
+                "--gate-errors", "0.2",
+                "--report-every", "10",
+                "--drain", "10",
+            ]
+        )
+
+        report = await soak(args)
+
+        assert report.generated == 20
+        assert report.delivered == report.generated
+        assert report.duplicates == 0 and report.lost == 0
+        assert "lost: 0" in format_report(report)